@@ -57,9 +57,14 @@ if __name__ == "__main__":
             "protobuf": ["protobuf"],
             "yaml": ["PyYAML"],
             "avro": ["avro-python3"],
+            "fastavro": ["fastavro"],
             "msgpack": ["msgpack-python"],
             "snappy": ["python-snappy"],
-            "brotli": ["brotli"],
+            "brotli": ["brotli>=1.2"],
+            "zstd": ["zstandard"],
+            "lz4": ["lz4"],
+            "orjson": ["orjson"],
+            "numpy": ["numpy"],
         },
         classifiers=[
             "Development Status :: 4 - Beta",
@@ -1,12 +1,30 @@
 """ Optional AMQP functionality """
-from . import utils
-
-try:
-    import aio_pika
-    from . import consumer
-    from . import producer
-    from . import requester
-    from . import responder
-except ImportError:
-    # AMQP functionality is considered optional
-    pass  # noqa
+import importlib
+import sys
+
+# The AMQP submodules, and the aio_pika and yarl packages that they depend
+# on, are only imported when they are first accessed. This keeps importing
+# gestalt.amq cheap for applications that don't use it.
+__all__ = ["bridge", "consumer", "producer", "requester", "responder", "utils"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ is not supported so import eagerly
+    from . import utils
+
+    try:
+        import aio_pika
+        from . import bridge
+        from . import consumer
+        from . import producer
+        from . import requester
+        from . import responder
+    except ImportError:
+        # AMQP functionality is considered optional
+        pass  # noqa
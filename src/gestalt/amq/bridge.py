@@ -0,0 +1,259 @@
+"""
+This module contains a bridge that moves messages between AMQP and a stream
+or datagram endpoint.
+"""
+
+import asyncio
+import logging
+
+from aio_pika import IncomingMessage
+from gestalt.amq import utils
+from gestalt.amq.producer import Producer
+from gestalt.serialization import CONTENT_TYPE_DATA, LazyMessage
+
+from asyncio import AbstractEventLoop
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class Bridge:
+    """ A Bridge forwards messages between AMQP and a stream or datagram
+    endpoint.
+
+    Messages received by a :class:`gestalt.amq.consumer.Consumer` are
+    forwarded to the peers of the endpoint and messages received by the
+    endpoint are published using a :class:`gestalt.amq.producer.Producer`.
+
+    Payloads are kept in their wire encoding when the AMQP content type
+    matches the content type the endpoint uses for the message type, so
+    that messages are not decoded and re-encoded on their way through the
+    bridge. Routing keys are mapped to
+    endpoint message type identifiers and back again.
+
+    Messages are forwarded in batches. Backpressure is applied in both
+    directions. When the endpoint's peers are slow to read, the AMQP message
+    handler blocks which delays message acknowledgements and lets the
+    consumer's prefetch count throttle the broker. When the broker is slow
+    to accept messages, the bridge stops reading from stream peers. Datagram
+    endpoints can not be paused so messages are dropped instead.
+
+    The bridge installs itself as the endpoint's message handler. The
+    consumer should be created with the bridge's :meth:`on_amqp_message`
+    method as its message handler and with lazy_decode enabled.
+    """
+
+    def __init__(
+        self,
+        endpoint,
+        producer: Producer = None,
+        routing_keys: Dict[str, int] = None,
+        batch_size: int = 100,
+        max_pending: int = 1000,
+        max_decompressed_size: Optional[int] = utils.MAX_DECOMPRESSED_SIZE,
+        loop: AbstractEventLoop = None,
+    ) -> None:
+        """
+        :param endpoint: A stream or datagram endpoint to forward messages
+          to and from. A datagram endpoint must be created with a remote
+          address so that it can send messages.
+
+        :param producer: An optional producer used to publish messages
+          received by the endpoint. If not specified then messages only flow
+          from AMQP to the endpoint.
+
+        :param routing_keys: An optional dict that maps AMQP routing keys to
+          endpoint message type identifiers. Messages whose routing key is not
+          in the map use the type identifier passed in their headers.
+          Messages received by the endpoint are published using the routing
+          key mapped to their type identifier, or the producer's default
+          routing key.
+
+        :param batch_size: The maximum number of messages forwarded in each
+          batch. Default value is 100.
+
+        :param max_pending: The maximum number of messages that can be
+          waiting to be forwarded in each direction before backpressure is
+          applied. Default value is 1000.
+
+        :param max_decompressed_size: The maximum size, in bytes, of a
+          decompressed AMQP message payload. Use None to remove the limit.
+
+        :param loop: The event loop to run in.
+        """
+        self.loop = loop or asyncio.get_event_loop()
+        self.endpoint = endpoint
+        self.producer = producer
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_decompressed_size = max_decompressed_size
+        self.dropped = 0
+
+        routing_keys = routing_keys or {}
+        self._type_ids = dict(routing_keys)  # type: Dict[str, int]
+        self._routing_keys = {v: k for k, v in routing_keys.items()}
+
+        # Messages moving from AMQP to the endpoint. This queue is bounded so
+        # that the AMQP message handler blocks when it is full.
+        self._to_endpoint = asyncio.Queue(
+            maxsize=max_pending
+        )  # type: asyncio.Queue[Tuple[bytes, int]]
+
+        # Messages moving from the endpoint to AMQP. This queue is not
+        # bounded because endpoint message handlers can not block. Instead,
+        # reading from the endpoint is paused once the queue is full.
+        self._to_amqp = asyncio.Queue()  # type: asyncio.Queue[Tuple[bytes, Any]]
+        self._reading_paused = False
+        self._can_pause = hasattr(endpoint, "pause_reading")
+
+        self._tasks = []  # type: List[asyncio.Task]
+
+        # Keep payloads received by the endpoint in their wire encoding
+        self.endpoint.lazy_decode = True
+        self.endpoint.message_handler = self.on_endpoint_message
+
+    async def start(self) -> None:
+        """ Start forwarding messages """
+        if self._tasks:
+            # Already started
+            return
+
+        self._tasks.append(self.loop.create_task(self._forward_to_endpoint()))
+        if self.producer is not None:
+            self._tasks.append(self.loop.create_task(self._forward_to_amqp()))
+
+    async def stop(self) -> None:
+        """ Stop forwarding messages """
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+        if self._reading_paused:
+            self._reading_paused = False
+            self.endpoint.resume_reading()
+
+    async def on_amqp_message(self, payload: Any, message: IncomingMessage) -> None:
+        """ Forward a message received from AMQP to the endpoint.
+
+        This method is intended to be used as a consumer's message handler.
+        It waits while the queue of messages bound for the endpoint is full
+        which delays acknowledgement of the AMQP message.
+
+        :param payload: The message payload. This is expected to be a
+          :class:`gestalt.serialization.LazyMessage`.
+
+        :param message: The AMQP message.
+        """
+        routing_key = message.routing_key
+        type_identifier = self._type_ids.get(routing_key) if routing_key else None
+        if type_identifier is None:
+            try:
+                type_identifier = int(message.headers.get("x-type-id") or 0)
+            except (TypeError, ValueError):
+                logger.error(
+                    f"Discarding AMQP message with an invalid x-type-id header: "
+                    f"{message.headers.get('x-type-id')!r}"
+                )
+                return
+
+        codec = self.endpoint.codec_for(type_identifier)
+        content_type = message.content_type or CONTENT_TYPE_DATA
+        if isinstance(payload, LazyMessage) and content_type == codec.content_type:
+            # The payload is already in the endpoint's wire encoding
+            data = utils.decompress_message(message, self.max_decompressed_size)
+        else:
+            if isinstance(payload, LazyMessage):
+                payload = payload.data
+            data = codec.encode(payload, type_identifier=type_identifier)
+
+        await self._to_endpoint.put((data, type_identifier))
+
+    def on_endpoint_message(
+        self, ep, data: Any, type_identifier: int = None, **kwargs
+    ) -> None:
+        """ Queue a message received by the endpoint for publishing.
+
+        :param ep: The endpoint that received the message.
+
+        :param data: The message payload.
+
+        :param type_identifier: The message type identifier, if the endpoint
+          protocol provides one.
+        """
+        if self.producer is None:
+            return
+
+        if self._to_amqp.qsize() >= self.max_pending:
+            if not self._can_pause:
+                self.dropped += 1
+                logger.warning("Bridge is full, dropping endpoint message")
+                return
+            if not self._reading_paused:
+                self._reading_paused = True
+                self.endpoint.pause_reading()
+
+        if isinstance(data, LazyMessage):
+            # Don't hold on to pooled receive buffers while messages wait.
+            # Zero length MTI datagrams carry an empty str payload.
+            raw = data.raw or b""
+            data = raw if isinstance(raw, bytes) else bytes(raw)
+        else:
+            codec = self.endpoint.codec_for(type_identifier)
+            data = codec.encode(data, type_identifier=type_identifier)
+
+        self._to_amqp.put_nowait((data, type_identifier))
+
+    async def _get_batch(self, queue: asyncio.Queue) -> List[Tuple[bytes, Any]]:
+        """ Wait for a message then take any others that are already queued,
+        up to the batch size.
+        """
+        batch = [await queue.get()]
+        while len(batch) < self.batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _forward_to_endpoint(self) -> None:
+        """ Send batches of AMQP messages to the endpoint """
+        while True:
+            batch = await self._get_batch(self._to_endpoint)
+
+            # Wait for slow peers to catch up before sending more messages
+            await self.endpoint.drain()
+
+            for data, type_identifier in batch:
+                self.endpoint.send_encoded(data, type_identifier=type_identifier)
+
+    async def _forward_to_amqp(self) -> None:
+        """ Publish batches of endpoint messages """
+        assert self.producer is not None
+
+        while True:
+            batch = await self._get_batch(self._to_amqp)
+
+            publishers = []
+            for data, type_identifier in batch:
+                codec = self.endpoint.codec_for(type_identifier)
+                publishers.append(
+                    self.producer.publish_encoded(
+                        data,
+                        codec.content_type,
+                        content_encoding=codec.content_encoding,
+                        routing_key=self._routing_keys.get(type_identifier),
+                        type_identifier=type_identifier,
+                    )
+                )
+
+            results = await asyncio.gather(*publishers, return_exceptions=True,)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Error publishing bridged message: {result}")
+
+            if self._reading_paused and self._to_amqp.qsize() <= self.max_pending // 2:
+                self._reading_paused = False
+                self.endpoint.resume_reading()
@@ -38,6 +38,8 @@ class Consumer:
         reconnect_interval: float = 1.0,
         prefetch_count: int = 1,
         on_message: MessageHandlerType = None,
+        max_decompressed_size: Optional[int] = utils.MAX_DECOMPRESSED_SIZE,
+        lazy_decode: bool = False,
         loop: AbstractEventLoop = None,
     ) -> None:
         """
@@ -67,6 +69,18 @@ class Consumer:
           deserialized) and a IncomingMessage object which provides
           the handler function with access to message headers.
 
+        :param max_decompressed_size: The maximum size, in bytes, of a
+          decompressed message payload. Messages that exceed this size are
+          rejected without being fully decompressed. Use None to remove the
+          limit.
+
+        :param lazy_decode: When set to True the on_message handler is passed
+          a :class:`gestalt.serialization.LazyMessage` instead of the payload.
+          The payload is only decompressed and decoded, in the event loop,
+          when the data attribute is first accessed. This is useful for
+          handlers that route messages using headers without using the
+          payload. Default value is False.
+
         :param loop: The event loop to run in.
         """
         self.loop = loop or asyncio.get_event_loop()
@@ -74,6 +88,8 @@ class Consumer:
         self.exchange_name = exchange_name
         self.exchange_type = exchange_type
         self.routing_key = routing_key
+        self.max_decompressed_size = max_decompressed_size
+        self.lazy_decode = lazy_decode
 
         self.reconnect_interval = reconnect_interval
         self.prefetch_count = prefetch_count
@@ -164,7 +180,23 @@ class Consumer:
         async with message.process():
             if self._on_message_handler:
                 try:
-                    payload = utils.decode_message(message)
+                    if self.lazy_decode:
+                        payload = utils.lazy_decode_message(
+                            message, self.max_decompressed_size
+                        )
+                    elif message.headers.get("x-compression-blocks"):
+                        # Decode large block compressed payloads in an
+                        # executor so the event loop is not blocked.
+                        payload = await self.loop.run_in_executor(
+                            None,
+                            utils.decode_message,
+                            message,
+                            self.max_decompressed_size,
+                        )
+                    else:
+                        payload = utils.decode_message(
+                            message, self.max_decompressed_size
+                        )
                 except Exception:
                     logger.exception("Problem in message decode function")
                     return
@@ -9,6 +9,7 @@ import time
 from aio_pika import ExchangeType, Message, connect_robust
 from aio_pika.exceptions import AMQPError
 from gestalt.amq import utils
+from gestalt.serialization import registry as serialization_registry
 
 from aio_pika import Channel, Connection, Exchange
 from asyncio import AbstractEventLoop
@@ -31,6 +32,9 @@ class Producer:
         reconnect_interval: float = 1.0,
         serialization: str = None,
         compression: str = None,
+        compression_dict_id: int = None,
+        compression_preset: str = None,
+        compression_block_threshold: int = None,
         loop: AbstractEventLoop = None,
     ) -> None:
         """
@@ -57,7 +61,24 @@ class Producer:
         :param compression: An optional string specifying the compression
           strategy to use. It can be provided using the convenience name or
           the mime-type. This strategy will be applied if no compression is
-          explicitly specified when publishing a message.
+          explicitly specified when publishing a message. Use auto to let
+          the compression registry select a compressor by sampling the
+          payloads being published.
+
+        :param compression_dict_id: An optional integer that identifies a
+          registered compression dictionary to use with the default
+          compression strategy. Only used by compression strategies that
+          support dictionaries (e.g. zstd).
+
+        :param compression_preset: An optional preset name (e.g. fast,
+          balanced, max) that selects the compression options to use. If not
+          specified then the compressor's configured options are used.
+
+        :param compression_block_threshold: An optional payload size, in
+          bytes, above which payloads are split into blocks that are
+          compressed in parallel in an executor, so that compressing large
+          payloads does not block the event loop. Smaller payloads are
+          compressed directly.
 
         :param loop: The event loop to run in. Defaults to the currently
           running event loop.
@@ -68,7 +89,11 @@ class Producer:
         self.exchange_type = exchange_type
         self.routing_key = routing_key
         self.serialization = serialization
+        self.codec = serialization_registry.bind(serialization)
         self.compression = compression
+        self.compression_dict_id = compression_dict_id
+        self.compression_preset = compression_preset
+        self.compression_block_threshold = compression_block_threshold
 
         self.reconnect_interval = reconnect_interval
         self.connection = None  # type: Optional[Connection]
@@ -124,6 +149,8 @@ class Producer:
         compression: str = None,
         headers: Dict = None,
         type_identifier: int = None,
+        compression_dict_id: int = None,
+        compression_preset: str = None,
     ):
         """ Publish a message.
 
@@ -148,6 +175,16 @@ class Producer:
           registered message. This parameter is only needed for some
           serialization methods that do not code in type awareness, such
           as Avro and Protobuf.
+
+        :param compression_dict_id: An optional integer that identifies a
+          registered compression dictionary. If not specified then the
+          default dictionary provided to the class initializer is used when
+          the default compression strategy is used.
+
+        :param compression_preset: An optional preset name (e.g. fast,
+          balanced, max) that selects the compression options to use. If not
+          specified then the default preset provided to the class initializer
+          is used.
         """
         if self.connection is None:
             logger.error("Producer does not have a connection")
@@ -155,23 +192,128 @@ class Producer:
 
         routing_key = routing_key if routing_key else self.routing_key
 
-        serialization = content_type if content_type else self.serialization
+        if compression_dict_id is None and not compression:
+            compression_dict_id = self.compression_dict_id
         compression = compression if compression else self.compression
+        compression_preset = (
+            compression_preset if compression_preset else self.compression_preset
+        )
 
         headers = {}
 
         try:
             payload, content_type, content_encoding = utils.encode_payload(
                 data,
-                content_type=serialization,
-                compression=compression,
+                content_type=content_type,
                 headers=headers,
                 type_identifier=type_identifier,
+                codec=None if content_type else self.codec,
             )
+            if compression:
+                # Payloads above the block threshold are compressed off the
+                # event loop.
+                payload = await utils.compress_payload_async(
+                    payload,
+                    compression,
+                    headers=headers,
+                    compression_dict_id=compression_dict_id,
+                    compression_preset=compression_preset,
+                    compression_block_threshold=self.compression_block_threshold,
+                )
         except Exception:
             logger.exception("Error encoding payload")
             return
 
+        await self._publish(
+            payload, routing_key, content_type, content_encoding, headers
+        )
+
+    async def publish_encoded(
+        self,
+        payload: bytes,
+        content_type: str,
+        content_encoding: str = None,
+        routing_key: str = None,
+        type_identifier: int = None,
+        compression: str = None,
+        compression_dict_id: int = None,
+        compression_preset: str = None,
+    ):
+        """ Publish a message payload that has already been serialized.
+
+        This avoids decoding and re-encoding payloads that are already in
+        their wire encoding, such as when bridging messages from another
+        transport. The payload is still compressed if a compression strategy
+        is in effect.
+
+        :param payload: The serialized message payload.
+
+        :param content_type: A string defining the serialization content type
+          of the payload.
+
+        :param content_encoding: A string defining the content encoding of
+          the payload.
+
+        :param routing-key: A routing key to use when publishing the message.
+          If not specified then the default routing key provided to the class
+          initializer is used.
+
+        :param type_identifier: An integer that uniquely identifies the
+          registered message type of the payload. If specified it is passed
+          in the message headers so that consumers can decode the payload.
+
+        :param compression: The name of the compression strategy to use. If
+          not specified then the default compression strategy is used.
+
+        :param compression_dict_id: An optional integer that identifies a
+          registered compression dictionary.
+
+        :param compression_preset: An optional preset name (e.g. fast,
+          balanced, max) that selects the compression options to use.
+        """
+        if self.connection is None:
+            logger.error("Producer does not have a connection")
+            return
+
+        routing_key = routing_key if routing_key else self.routing_key
+
+        if compression_dict_id is None and not compression:
+            compression_dict_id = self.compression_dict_id
+        compression = compression if compression else self.compression
+        compression_preset = (
+            compression_preset if compression_preset else self.compression_preset
+        )
+
+        headers = {}  # type: Dict[str, Any]
+        if type_identifier is not None:
+            headers["x-type-id"] = type_identifier
+
+        if compression:
+            try:
+                payload = await utils.compress_payload_async(
+                    payload,
+                    compression,
+                    headers=headers,
+                    compression_dict_id=compression_dict_id,
+                    compression_preset=compression_preset,
+                    compression_block_threshold=self.compression_block_threshold,
+                )
+            except Exception:
+                logger.exception("Error compressing payload")
+                return
+
+        await self._publish(
+            payload, routing_key, content_type, content_encoding, headers
+        )
+
+    async def _publish(
+        self,
+        payload: bytes,
+        routing_key: str,
+        content_type: Optional[str],
+        content_encoding: Optional[str],
+        headers: Dict,
+    ):
         assert self.exchange is not None
         await self.exchange.publish(
             Message(
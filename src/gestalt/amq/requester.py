@@ -12,6 +12,7 @@ from aio_pika import ExchangeType, connect_robust
 from aio_pika.message import DeliveryMode, IncomingMessage, Message, ReturnedMessage
 from aio_pika.exceptions import AMQPError, DeliveryError
 from gestalt.amq import utils
+from gestalt.serialization import registry as serialization_registry
 
 from asyncio import AbstractEventLoop
 from aio_pika import Connection, Channel, Exchange, Queue
@@ -49,6 +50,8 @@ class Requester:
         prefetch_count: int = 1,
         serialization: str = None,
         compression: str = None,
+        compression_preset: str = None,
+        max_decompressed_size: Optional[int] = utils.MAX_DECOMPRESSED_SIZE,
         dlx_name: str = "rpc.dlx",
         loop: AbstractEventLoop = None,
     ) -> None:
@@ -82,6 +85,15 @@ class Requester:
           the mime-type. This strategy will be applied if no compression is
           explicitly specified when sending a message.
 
+        :param compression_preset: An optional preset name (e.g. fast,
+          balanced, max) that selects the compression options to use. If not
+          specified then the compressor's configured options are used.
+
+        :param max_decompressed_size: The maximum size, in bytes, of a
+          decompressed message payload. Messages that exceed this size are
+          rejected without being fully decompressed. Use None to remove the
+          limit.
+
         :param dlx_name: The name of a Dead Letter Exchange used by a service
           provider as the destination for sending unhandled messages. The
           same exchange name must be used by client and server as the client
@@ -96,7 +108,10 @@ class Requester:
         self.exchange_type = exchange_type
         self.service_name = service_name
         self.serialization = serialization
+        self.codec = serialization_registry.bind(serialization)
         self.compression = compression
+        self.compression_preset = compression_preset
+        self.max_decompressed_size = max_decompressed_size
 
         self.reconnect_interval = reconnect_interval
         self.prefetch_count = prefetch_count
@@ -256,9 +271,10 @@ class Requester:
         # An exception may be raised here if the message can not be serialized.
         payload, content_type, content_encoding = utils.encode_payload(
             data,
-            content_type=self.serialization,
+            codec=self.codec,
             compression=self.compression,
             headers=headers,
+            compression_preset=self.compression_preset,
         )
 
         assert self.response_queue is not None
@@ -325,7 +341,7 @@ class Requester:
             return
 
         try:
-            payload = utils.decode_message(message)
+            payload = utils.decode_message(message, self.max_decompressed_size)
         except Exception as e:
             logger.error(f"Failed to deserialize response on message: {message}")
             f.set_exception(e)
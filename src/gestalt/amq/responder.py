@@ -11,6 +11,7 @@ import time
 from aio_pika import ExchangeType, IncomingMessage, Message, connect_robust
 from aio_pika.exceptions import AMQPError
 from gestalt.amq import utils
+from gestalt.serialization import registry as serialization_registry
 
 from asyncio import AbstractEventLoop
 from aio_pika import Connection, Channel, Exchange, Queue
@@ -41,6 +42,8 @@ class Responder:
         prefetch_count: int = 1,
         serialization: str = None,
         compression: str = None,
+        compression_preset: str = None,
+        max_decompressed_size: Optional[int] = utils.MAX_DECOMPRESSED_SIZE,
         dlx_name: str = "rpc.dlx",
         on_request: Optional[MessageHandlerType] = None,
         loop: AbstractEventLoop = None,
@@ -74,6 +77,15 @@ class Responder:
           the mime-type. This strategy will be applied if no compression is
           explicitly specified when sending a message.
 
+        :param compression_preset: An optional preset name (e.g. fast,
+          balanced, max) that selects the compression options to use. If not
+          specified then the compressor's configured options are used.
+
+        :param max_decompressed_size: The maximum size, in bytes, of a
+          decompressed message payload. Messages that exceed this size are
+          rejected without being fully decompressed. Use None to remove the
+          limit.
+
         :param dlx_name: The name of a Dead Letter Exchange used by a service
           provider as the destination for sending unhandled messages. The
           same exchange name must be used by client and server as the client
@@ -96,7 +108,10 @@ class Responder:
         self.exchange_type = exchange_type
         self.service_name = service_name
         self.serialization = serialization
+        self.codec = serialization_registry.bind(serialization)
         self.compression = compression
+        self.compression_preset = compression_preset
+        self.max_decompressed_size = max_decompressed_size
         if on_request is None:
             raise Exception("A response handler must be provided")
         self._request_handler = on_request  # type: MessageHandlerType
@@ -194,7 +209,7 @@ class Responder:
             return
 
         try:
-            payload = utils.decode_message(message)
+            payload = utils.decode_message(message, self.max_decompressed_size)
         except Exception:
             logger.exception("Problem in message decode function")
             await message.reject(requeue=False)
@@ -215,9 +230,10 @@ class Responder:
         try:
             payload, content_type, content_encoding = utils.encode_payload(
                 response,
-                content_type=self.serialization,
+                codec=self.codec,
                 compression=self.compression,
                 headers=headers,
+                compression_preset=self.compression_preset,
             )
         except Exception:
             logger.exception("Error encoding response payload")
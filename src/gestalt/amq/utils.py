@@ -1,15 +1,28 @@
 import enum
+import functools
 import os
-from gestalt.compression import compress, decompress
+from gestalt.compression import (
+    compress,
+    compress_blocks,
+    compress_blocks_async,
+    decompress,
+    decompress_blocks,
+)
 from gestalt.serialization import (
+    bound_codec,
     dumps,
-    loads,
     registry,
-    CONTENT_TYPE_PROTOBUF,
+    LazyMessage,
     CONTENT_TYPE_AVRO,
+    CONTENT_TYPE_DATA,
+    CONTENT_TYPE_PROTOBUF,
 )
 from yarl import URL
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+# Limit the size of decompressed payloads as a precaution against
+# decompression bombs.
+MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
 
 
 def build_amqp_url(
@@ -89,6 +102,10 @@ def encode_payload(
     compression: str = None,
     headers: dict = None,
     type_identifier: int = None,
+    compression_dict_id: int = None,
+    compression_preset: str = None,
+    compression_block_threshold: int = None,
+    codec: bound_codec = None,
 ) -> Tuple[bytes, Optional[str], str]:
     """ Prepare a message payload.
 
@@ -101,7 +118,8 @@ def encode_payload(
     :param compression: An optional string specifying the compression strategy
       to use. It can be provided using the convenience name or the mime-type.
       If compression is defined then headers must also be supplied as
-      compression is passed as an attribute in message headers.
+      compression is passed as an attribute in message headers. The value
+      auto selects a compressor based on measurements of recent payloads.
 
     :param headers: A dict of headers that will be associated with the
       message.
@@ -109,11 +127,33 @@ def encode_payload(
     :param type_identifier: An integer that uniquely identifies a
       registered message.
 
+    :param compression_dict_id: An optional integer that identifies a
+      registered compression dictionary. Only used by compression strategies
+      that support dictionaries (e.g. zstd). The identifier is passed as an
+      attribute in message headers.
+
+    :param compression_preset: An optional preset name (e.g. fast, balanced,
+      max) that selects the compression options to use. If not specified
+      then the compressor's configured options are used.
+
+    :param compression_block_threshold: An optional payload size, in bytes,
+      above which the payload is split into blocks that are compressed in
+      parallel. The use of block compression is passed as an attribute in
+      message headers. If not specified then block compression is not used.
+
+    :param codec: An optional serialization codec, obtained from
+      ``registry.bind``, to use instead of resolving the content type. This
+      avoids serialization registry lookups for every message.
+
     :returns: A three-item tuple containing the serialized data as bytes
       a string specifying the content type (e.g., `application/json`) and
       a string specifying the content encoding, (e.g. `utf-8`).
 
     """
+    if codec is None:
+        codec = registry.bind(content_type)
+    content_type = codec.content_type
+
     # Some content-types require additional information to be passed to
     # help decode the message payload. This is achieved by adding
     # information to the message headers.
@@ -122,10 +162,9 @@ def encode_payload(
     # being decoded (referred to as a symbol). The symbol id is added to
     # the headers so that it can be used on the receiving side.
     if content_type == CONTENT_TYPE_PROTOBUF:
-        serializer = registry.get_serializer(CONTENT_TYPE_PROTOBUF)
         if not isinstance(headers, dict):
             raise Exception("Headers must be supplied when using protobuf")
-        headers["x-type-id"] = serializer.registry.get_id_for_object(data)
+        headers["x-type-id"] = codec.serializer.registry.get_id_for_object(data)
 
     # Avro decoders require awareness of the schema that describes the object.
     # This information is added to the headers so that it can be used on the
@@ -137,34 +176,189 @@ def encode_payload(
             raise Exception("Headers must be supplied when using Avro")
         headers["x-type-id"] = type_identifier
 
-    serialization_name = registry.type_to_name[content_type]
-
     try:
-        content_type, content_encoding, payload = dumps(
-            data, serialization_name, type_identifier=type_identifier
-        )
+        if codec.name is None:
+            # The best guess encoding may change the content type
+            content_type, content_encoding, payload = dumps(data)
+        else:
+            content_encoding = codec.content_encoding
+            payload = codec.encode(data, type_identifier=type_identifier)
     except Exception as exc:
         raise Exception(f"Error serializing payload to {content_type}: {exc}") from None
 
     if compression:
-        if not isinstance(headers, dict):
-            raise Exception("Headers must be supplied when using compression")
-        try:
-            headers["compression"], payload = compress(payload, compression)
-        except Exception as exc:
-            raise Exception(
-                f"Error compressing payload using {compression}: {exc}"
-            ) from None
+        payload = compress_payload(
+            payload,
+            compression,
+            headers=headers,
+            compression_dict_id=compression_dict_id,
+            compression_preset=compression_preset,
+            compression_block_threshold=compression_block_threshold,
+        )
 
     return payload, content_type, content_encoding
 
 
+def compress_payload(
+    payload: bytes,
+    compression: str,
+    *,
+    headers: dict = None,
+    compression_dict_id: int = None,
+    compression_preset: str = None,
+    compression_block_threshold: int = None,
+) -> bytes:
+    """ Compress an already serialized message payload.
+
+    The attributes needed to decompress the payload are added to the message
+    headers.
+
+    :param payload: The serialized message payload to compress.
+
+    :param compression: A string specifying the compression strategy to use.
+      It can be provided using the convenience name or the mime-type. The
+      value auto selects a compressor based on measurements of recent
+      payloads.
+
+    :param headers: A dict of headers that will be associated with the
+      message.
+
+    :param compression_dict_id: An optional integer that identifies a
+      registered compression dictionary.
+
+    :param compression_preset: An optional preset name (e.g. fast, balanced,
+      max) that selects the compression options to use.
+
+    :param compression_block_threshold: An optional payload size, in bytes,
+      above which the payload is split into blocks that are compressed in
+      parallel.
+
+    :returns: The compressed payload.
+    """
+    if not isinstance(headers, dict):
+        raise Exception("Headers must be supplied when using compression")
+    kwargs = _compression_options(headers, compression_dict_id, compression_preset)
+    try:
+        if use_blocks(payload, compression_block_threshold):
+            headers["x-compression-blocks"] = True
+            headers["compression"], compressed = compress_blocks(
+                payload, compression, **kwargs
+            )
+        else:
+            headers["compression"], compressed = compress(
+                payload, compression, **kwargs
+            )
+    except Exception as exc:
+        raise Exception(
+            f"Error compressing payload using {compression}: {exc}"
+        ) from None
+
+    return _uncompressed_if_declined(headers, payload, compressed)
+
+
+async def compress_payload_async(
+    payload: bytes,
+    compression: str,
+    *,
+    headers: dict = None,
+    compression_dict_id: int = None,
+    compression_preset: str = None,
+    compression_block_threshold: int = None,
+) -> bytes:
+    """ Compress an already serialized message payload without blocking the
+    event loop.
+
+    Payloads larger than the block threshold are compressed as parallel
+    blocks in an executor. Smaller payloads are cheap to compress and are
+    compressed directly. The parameters are the same as `compress_payload`.
+
+    :returns: The compressed payload.
+    """
+    if not use_blocks(payload, compression_block_threshold):
+        return compress_payload(
+            payload,
+            compression,
+            headers=headers,
+            compression_dict_id=compression_dict_id,
+            compression_preset=compression_preset,
+        )
+
+    if not isinstance(headers, dict):
+        raise Exception("Headers must be supplied when using compression")
+    kwargs = _compression_options(headers, compression_dict_id, compression_preset)
+    try:
+        headers["x-compression-blocks"] = True
+        headers["compression"], compressed = await compress_blocks_async(
+            payload, compression, **kwargs
+        )
+    except Exception as exc:
+        raise Exception(
+            f"Error compressing payload using {compression}: {exc}"
+        ) from None
+
+    return _uncompressed_if_declined(headers, payload, compressed)
+
+
+def use_blocks(payload: bytes, compression_block_threshold: Optional[int]) -> bool:
+    """ Return True if a payload is large enough to use block compression.
+
+    :param payload: The serialized message payload.
+
+    :param compression_block_threshold: The payload size, in bytes, above
+      which block compression is used. None disables block compression.
+    """
+    return (
+        compression_block_threshold is not None
+        and len(payload) > compression_block_threshold
+    )
+
+
+def _uncompressed_if_declined(
+    headers: dict, payload: bytes, compressed: bytes
+) -> bytes:
+    """ Return the payload to send once it has been compressed.
+
+    When automatic compression chose not to compress the payload it is sent
+    as is, without the compression headers. A block container of
+    uncompressed blocks would otherwise be delivered to the receiver.
+
+    :param headers: The message headers, updated in place.
+
+    :param payload: The serialized message payload.
+
+    :param compressed: The compressed payload.
+    """
+    if headers["compression"] is not None:
+        return compressed
+    del headers["compression"]
+    headers.pop("x-compression-blocks", None)
+    return payload
+
+
+def _compression_options(
+    headers: dict, compression_dict_id: Optional[int], compression_preset: Optional[str]
+) -> Dict[str, Any]:
+    """ Return the compressor options for a payload and add the attributes
+    needed to decompress it to the message headers.
+    """
+    kwargs = {}  # type: Dict[str, Any]
+    if compression_dict_id is not None:
+        headers["x-compression-dict-id"] = compression_dict_id
+        kwargs["dict_id"] = compression_dict_id
+    if compression_preset is not None:
+        kwargs["preset"] = compression_preset
+    return kwargs
+
+
 def decode_payload(
     data: bytes,
     compression: Optional[str] = None,
     content_type: Optional[str] = None,
     content_encoding: Optional[str] = None,
     type_identifier: Optional[int] = None,
+    compression_dict_id: Optional[int] = None,
+    compression_blocks: bool = False,
+    max_length: Optional[int] = MAX_DECOMPRESSED_SIZE,
 ) -> Any:
     """ Decode a message payload
 
@@ -177,20 +371,35 @@ def decode_payload(
 
     :param type_identifier: An integer that uniquely identifies a
       registered message.
+
+    :param compression_dict_id: An optional integer that identifies a
+      registered compression dictionary.
+
+    :param compression_blocks: A flag indicating that the payload was
+      compressed as parallel blocks. Defaults to False.
+
+    :param max_length: The maximum size, in bytes, of the decompressed
+      payload. Decompression is aborted as soon as this size is exceeded.
+      Defaults to MAX_DECOMPRESSED_SIZE. Use None to remove the limit.
     """
 
     if compression:
+        kwargs = {"max_length": max_length}  # type: Dict[str, Any]
+        if compression_dict_id is not None:
+            kwargs["dict_id"] = compression_dict_id
         try:
-            _mime_type, data = decompress(data, compression)
+            if compression_blocks:
+                _mime_type, data = decompress_blocks(data, compression, **kwargs)
+            else:
+                _mime_type, data = decompress(data, compression, **kwargs)
         except Exception as exc:
             raise Exception(
                 f"Error decompressing payload using {compression}: {exc}"
             ) from None
 
     try:
-        payload = loads(
-            data, content_type, content_encoding, type_identifier=type_identifier
-        )
+        codec = registry.bind(content_type or CONTENT_TYPE_DATA)
+        payload = codec.decode(data, type_identifier=type_identifier) if data else data
     except Exception as exc:
         raise Exception(
             f"Error decoding payload with content-type={content_type}: {exc}"
@@ -199,10 +408,13 @@ def decode_payload(
     return payload
 
 
-def decode_message(message):
+def decode_message(message, max_length: Optional[int] = MAX_DECOMPRESSED_SIZE):
     """ Decode a message payload.
 
     :param message: An aio_pika.IncomingMessage object.
+
+    :param max_length: The maximum size, in bytes, of the decompressed
+      payload.
     """
     payload = decode_payload(
         message.body,
@@ -210,5 +422,57 @@ def decode_message(message):
         message.content_type,
         message.content_encoding,
         type_identifier=message.headers.get("x-type-id"),
+        compression_dict_id=message.headers.get("x-compression-dict-id"),
+        compression_blocks=bool(message.headers.get("x-compression-blocks")),
+        max_length=max_length,
     )
     return payload
+
+
+def decompress_message(
+    message, max_length: Optional[int] = MAX_DECOMPRESSED_SIZE
+) -> bytes:
+    """ Return a message payload in its serialized wire encoding.
+
+    The payload is decompressed, if necessary, but is not decoded.
+
+    :param message: An aio_pika.IncomingMessage object.
+
+    :param max_length: The maximum size, in bytes, of the decompressed
+      payload.
+    """
+    headers = message.headers
+    return decode_payload(
+        message.body,
+        headers.get("compression"),
+        CONTENT_TYPE_DATA,
+        compression_dict_id=headers.get("x-compression-dict-id"),
+        compression_blocks=bool(headers.get("x-compression-blocks")),
+        max_length=max_length,
+    )
+
+
+def lazy_decode_message(
+    message, max_length: Optional[int] = MAX_DECOMPRESSED_SIZE
+) -> LazyMessage:
+    """ Return a message that is only decompressed and decoded when its data
+    attribute is first accessed.
+
+    :param message: An aio_pika.IncomingMessage object.
+
+    :param max_length: The maximum size, in bytes, of the decompressed
+      payload.
+    """
+    headers = message.headers
+    decode = functools.partial(
+        decode_payload,
+        compression=headers.get("compression"),
+        content_type=message.content_type,
+        content_encoding=message.content_encoding,
+        compression_dict_id=headers.get("x-compression-dict-id"),
+        compression_blocks=bool(headers.get("x-compression-blocks")),
+        max_length=max_length,
+    )
+    return LazyMessage(
+        message.body, decode, type_identifier=headers.get("x-type-id"), metadata=headers
+    )
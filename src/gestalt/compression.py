@@ -1,9 +1,26 @@
 """ This module contains compression utilities. """
 
 import abc
+import asyncio
+import functools
+import os
+import struct
+import threading
+import time
 import zlib
-from collections import namedtuple
-from typing import Any, Callable, Dict, Optional, Tuple, Union
+from collections import deque, namedtuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 try:
     import bz2
@@ -33,7 +50,24 @@ try:
 except ImportError:
     have_snappy = False
 
-CodecType = Callable[[bytes], bytes]
+try:
+    import zstandard
+
+    have_zstd = True
+except ImportError:
+    have_zstd = False
+
+try:
+    import lz4.frame
+
+    have_lz4 = True
+except ImportError:
+    have_lz4 = False
+
+# The buffer types accepted as input by compressors and decompressors
+BytesLike = Union[bytes, bytearray, memoryview]
+
+CodecType = Callable[[BytesLike], bytes]
 
 COMPRESSION_NONE = "none"
 COMPRESSION_GZIP = "applications/x-gzip"
@@ -43,24 +77,577 @@ COMPRESSION_BROTLI = "applications/x-brotli"
 COMPRESSION_SNAPPY = "application/x-snappy"
 COMPRESSION_ZLIB = "application/zlib"
 COMPRESSION_DEFLATE = "application/deflate"
+COMPRESSION_ZSTD = "application/zstd"
+COMPRESSION_LZ4 = "application/x-lz4"
+
+# Automatic compression selects one of the registered compressors based on
+# measurements taken from a sample of the payloads being sent.
+COMPRESSION_AUTO = "auto"
+
+OBJECTIVE_SAVED_PER_MS = "saved_per_ms"
+OBJECTIVE_RATIO = "ratio"
+
+PRESET_FAST = "fast"
+PRESET_BALANCED = "balanced"
+PRESET_MAX = "max"
+
+# Block compression splits large payloads into independent blocks that are
+# compressed concurrently. The blocks are combined into a container that
+# starts with a header containing a magic value, the number of blocks and
+# the compressed length of each block.
+#
+# .. code-block:: console
+#
+#     +-------+-------------+---------------------+-----------------+
+#     | Magic | Block_Count | Block_Lengths       |  BLOCKS ....    |
+#     | 4s    |   uint32    | uint32 * Block_Count|                 |
+#     +-------+-------------+---------------------+-----------------+
+#
+BLOCK_MAGIC = b"GBLK"
+BLOCK_HEADER_FORMAT = "<4sI"
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER_FORMAT)
+BLOCK_SIZE = 2 ** 21
+
+# The blocks of a container are decompressed concurrently and share the
+# maximum decompressed length. Each decompression library call then produces
+# at most this many bytes so that the blocks in progress can't together
+# exceed the maximum length by more than a few chunks.
+BLOCK_OUTPUT_CHUNK = 2 ** 18
 
 
 codec = namedtuple("codec", ("content_type", "compressor"))
 
+# The result of benchmarking a compressor on sampled payloads. Times are in
+# milliseconds.
+codec_sample = namedtuple(
+    "codec_sample",
+    ("name", "size", "compressed_size", "compress_time", "decompress_time"),
+)
+
+
+def saved_per_ms(sample: codec_sample) -> float:
+    """ Score a codec by the number of bytes saved per millisecond spent
+    compressing and decompressing.
+    """
+    elapsed = max(sample.compress_time + sample.decompress_time, 1e-3)
+    return (sample.size - sample.compressed_size) / elapsed
+
+
+def compression_ratio(sample: codec_sample) -> float:
+    """ Score a codec by its compression ratio, ignoring the time taken. """
+    return sample.size / max(sample.compressed_size, 1)
+
+
+OBJECTIVES = {
+    OBJECTIVE_SAVED_PER_MS: saved_per_ms,
+    OBJECTIVE_RATIO: compression_ratio,
+}  # type: Dict[str, Callable[[codec_sample], float]]
+
 
 class ICompressor(abc.ABC):
     """
     This class represents the base interface for a compressor.
+
+    Compressors that can be tuned declare the options they use by default
+    and a set of named presets (fast, balanced, max) that map to the options
+    appropriate for that compression method. Options can be changed for all
+    uses of a compressor using :meth:`configure` or supplied to individual
+    calls of :meth:`compress`.
     """
 
+    # The compression options used when no others are specified.
+    default_options = {}  # type: Dict[str, Any]
+
+    # A map of preset names to the compression options they represent.
+    presets = {
+        PRESET_FAST: {},
+        PRESET_BALANCED: {},
+        PRESET_MAX: {},
+    }  # type: Dict[str, Dict[str, Any]]
+
+    def __init__(self, preset: str = None, **options) -> None:
+        """
+        :param preset: An optional preset name (e.g. fast, balanced, max)
+          specifying the default compression options to use.
+
+        :param options: Optional compression settings (e.g. level) that
+          override the defaults.
+        """
+        self.options = dict(self.default_options)
+        self.configure(preset, **options)
+
+    def configure(self, preset: str = None, **options) -> None:
+        """ Change the default options used by this compressor.
+
+        :param preset: An optional preset name (e.g. fast, balanced, max).
+
+        :param options: Optional compression settings (e.g. level) that
+          override the preset settings.
+        """
+        self.options = self.get_options(preset, **options)
+
+    def get_options(self, preset: str = None, **options) -> Dict[str, Any]:
+        """ Return the compression options to use for a compress operation.
+
+        The default options are updated with the preset options and then with
+        any explicitly supplied options. Options with a value of None are
+        ignored.
+
+        :param preset: An optional preset name (e.g. fast, balanced, max).
+
+        :param options: Optional compression settings (e.g. level).
+
+        Raises:
+            Exception: If the preset is not recognised.
+        """
+        result = dict(self.options)
+        if preset is not None:
+            if preset not in self.presets:
+                raise Exception(f"Invalid compression preset '{preset}'")
+            result.update(self.presets[preset])
+        result.update({k: v for k, v in options.items() if v is not None})
+        return result
+
     @abc.abstractmethod  # pragma: no branch
-    def compress(self, data):
+    def compress(self, data, **kwargs):
         """ Returns compressed data """
 
     @abc.abstractmethod  # pragma: no branch
-    def decompress(self, data):
+    def decompress(self, data, **kwargs):
         """ Returns decompressed data """
 
+    def compressobj(self, **kwargs) -> "StreamCompressor":
+        """ Returns an incremental compressor.
+
+        The default implementation buffers all the data and compresses it
+        when the stream is flushed. Compressors that support incremental
+        compression should override this method.
+
+        :param kwargs: Compression options (e.g. preset, level) that are
+          passed to the compress method.
+        """
+        return BufferedStreamCompressor(functools.partial(self.compress, **kwargs))
+
+    def decompressobj(self, max_length: int = None, **kwargs) -> "StreamDecompressor":
+        """ Returns an incremental decompressor.
+
+        The default implementation buffers all the data and decompresses it
+        when the stream is flushed. This means the maximum length can only be
+        checked after decompression. Compressors that support incremental
+        decompression should override this method so that decompression can
+        be aborted as soon as the limit is exceeded.
+
+        :param max_length: An optional maximum number of decompressed bytes.
+        """
+        return BufferedStreamDecompressor(
+            functools.partial(self.decompress, **kwargs), max_length=max_length
+        )
+
+
+class StreamCompressor(abc.ABC):
+    """
+    This class represents the interface for an incremental compressor.
+
+    Data is passed to :meth:`feed` as it becomes available and any compressed
+    output that is ready is returned. After all the data has been fed in,
+    :meth:`flush` must be called to obtain the remaining compressed output.
+    The object can't be used after it has been flushed.
+    """
+
+    @abc.abstractmethod  # pragma: no branch
+    def feed(self, data) -> bytes:
+        """ Compress a chunk of data and return any available output """
+
+    @abc.abstractmethod  # pragma: no branch
+    def flush(self) -> bytes:
+        """ Return the remaining compressed data """
+
+
+class StreamDecompressor(abc.ABC):
+    """
+    This class represents the interface for an incremental decompressor.
+
+    Compressed data is passed to :meth:`feed` as it becomes available and any
+    decompressed output that is ready is returned. After all the data has
+    been fed in, :meth:`flush` must be called to obtain any remaining output.
+
+    An optional maximum length limits the total number of decompressed bytes
+    the decompressor will produce. An exception is raised as soon as the
+    limit is exceeded which protects receivers from decompression bombs.
+
+    The blocks of a block container are decompressed concurrently. Their
+    decompressors share an allowance, set in the allowance attribute, that
+    limits their total output.
+    """
+
+    def __init__(self, max_length: int = None) -> None:
+        """
+        :param max_length: An optional maximum number of decompressed bytes.
+          If not specified then the output size is not limited.
+        """
+        self.max_length = max_length
+        self.length = 0
+        self.allowance = None  # type: Optional[_Allowance]
+        self._reserved = 0
+
+    @abc.abstractmethod  # pragma: no branch
+    def feed(self, data) -> bytes:
+        """ Decompress a chunk of data and return any available output """
+
+    @abc.abstractmethod  # pragma: no branch
+    def flush(self) -> bytes:
+        """ Return any remaining decompressed data """
+
+    def _limit(self, unlimited: int) -> int:
+        """ Return the output size limit to request from a library call.
+
+        One more byte than the remaining allowance is requested so that
+        exceeding the limit can be detected.
+
+        :param unlimited: The value the library uses to represent no limit.
+        """
+        if self.max_length is None:
+            return unlimited
+        limit = self.max_length - self.length + 1
+        if self.allowance is not None:
+            limit = min(limit, BLOCK_OUTPUT_CHUNK)
+        return limit
+
+    def _account(self, data: bytes) -> bytes:
+        """ Add decompressed output to the running total.
+
+        Raises:
+            Exception: If the total exceeds the maximum length.
+        """
+        self.length += len(data)
+        if self.max_length is not None and self.length > self.max_length:
+            self._exceeded()
+        if self.allowance is not None:
+            reserved = min(self._reserved, len(data))
+            self._reserved -= reserved
+            self.allowance.take(len(data) - reserved)
+        return data
+
+    def _reserve(self, length: int) -> None:
+        """ Check a decompressed length that is known before decompression,
+        e.g. from a header, and deduct it from the shared allowance.
+
+        Raises:
+            Exception: If the length exceeds the maximum length or the
+              shared allowance.
+        """
+        if self.max_length is not None and length > self.max_length - self.length:
+            self._exceeded()
+        if self.allowance is not None:
+            self.allowance.take(length)
+            self._reserved += length
+
+    def _exceeded(self) -> None:
+        raise Exception(
+            f"Decompressed data exceeds maximum length of {self.max_length} bytes"
+        )
+
+
+class BufferedStreamCompressor(StreamCompressor):
+    """ Buffer all the data and compress it when the stream is flushed. """
+
+    def __init__(self, compress: CodecType) -> None:
+        self._compress = compress
+        self._buffer = bytearray()
+
+    def feed(self, data) -> bytes:
+        self._buffer.extend(data)
+        return b""
+
+    def flush(self) -> bytes:
+        data = self._compress(self._buffer)
+        self._buffer = bytearray()
+        return data
+
+
+class BufferedStreamDecompressor(StreamDecompressor):
+    """ Buffer all the data and decompress it when the stream is flushed. """
+
+    def __init__(self, decompress: CodecType, max_length: int = None) -> None:
+        super().__init__(max_length=max_length)
+        self._decompress = decompress
+        self._buffer = bytearray()
+
+    def feed(self, data) -> bytes:
+        self._buffer.extend(data)
+        return b""
+
+    def flush(self) -> bytes:
+        data = self._decompress(self._buffer)
+        self._buffer = bytearray()
+        return self._account(data)
+
+
+class ObjectStreamCompressor(StreamCompressor):
+    """ Adapt a library compression object to the StreamCompressor interface.
+
+    Many compression libraries provide objects with a compress (or process)
+    method and a flush (or finish) method. This class wraps those methods.
+    """
+
+    def __init__(
+        self, compress: CodecType, flush: Callable[[], bytes], header: bytes = b""
+    ) -> None:
+        """
+        :param compress: A function that compresses a chunk of data.
+
+        :param flush: A function that returns the remaining compressed data.
+
+        :param header: Optional bytes to emit before the first output.
+        """
+        self._compress = compress
+        self._flush = flush
+        self._header = header
+
+    def feed(self, data) -> bytes:
+        data = self._header + self._compress(data)
+        self._header = b""
+        return data
+
+    def flush(self) -> bytes:
+        data = self._header + self._flush()
+        self._header = b""
+        return data
+
+
+class PassthroughStreamDecompressor(StreamDecompressor):
+    """ Return data unchanged while enforcing the maximum length. """
+
+    def feed(self, data) -> bytes:
+        return self._account(bytes(data))
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class MaxLengthStreamDecompressor(StreamDecompressor):
+    """ Adapt a bz2, lzma or lz4 frame decompressor object.
+
+    These objects accept a max_length argument and buffer any input that
+    could not be processed without exceeding it. This bounds the memory used
+    by each call.
+    """
+
+    def __init__(self, obj, max_length: int = None) -> None:
+        super().__init__(max_length=max_length)
+        self._obj = obj
+
+    def feed(self, data) -> bytes:
+        chunks = [self._account(self._obj.decompress(data, self._limit(-1)))]
+        while not self._obj.eof and not self._obj.needs_input:
+            chunks.append(self._account(self._obj.decompress(b"", self._limit(-1))))
+        return b"".join(chunks)
+
+    def flush(self) -> bytes:
+        if not self._obj.eof:
+            raise Exception("Compressed data ended before the end-of-stream marker")
+        return b""
+
+
+class ZlibStreamDecompressor(StreamDecompressor):
+    """ Adapt a zlib decompressor object to the StreamDecompressor interface.
+
+    The zlib decompressor accepts a max_length argument and keeps any input
+    that could not be processed in its unconsumed_tail attribute. This
+    bounds the memory used by each call.
+    """
+
+    def __init__(self, wbits: int, max_length: int = None) -> None:
+        super().__init__(max_length=max_length)
+        self._obj = zlib.decompressobj(wbits)
+
+    def feed(self, data) -> bytes:
+        chunks = []
+        while data:
+            chunks.append(self._account(self._obj.decompress(data, self._limit(0))))
+            data = self._obj.unconsumed_tail
+        return b"".join(chunks)
+
+    def flush(self) -> bytes:
+        data = self._account(self._obj.flush())
+        if not self._obj.eof:
+            raise Exception("Compressed data ended before the end-of-stream marker")
+        return data
+
+
+class CodecSelector:
+    """ Select a compressor based on measurements of the actual payloads.
+
+    Every ``sample_interval`` payloads the candidate compressors are
+    benchmarked on (the first ``sample_size`` bytes of) the payload. The
+    compressed size and the time taken to compress and decompress are
+    accumulated over the last ``window`` samples and the compressor with the
+    best objective score is selected for the following payloads.
+
+    Payloads smaller than ``min_size`` are not compressed. If no compressor
+    saves at least ``min_saving`` (a fraction of the sampled size) then the
+    payloads are considered incompressible and are not compressed until the
+    next sample shows otherwise.
+    """
+
+    def __init__(
+        self,
+        registry: "CompressorRegistry",
+        candidates: List[str] = None,
+        objective: Union[str, Callable[[codec_sample], float]] = OBJECTIVE_SAVED_PER_MS,
+        sample_interval: int = 100,
+        sample_size: int = 2 ** 16,
+        window: int = 8,
+        min_size: int = 256,
+        min_saving: float = 0.05,
+    ) -> None:
+        """
+        :param registry: The registry holding the candidate compressors.
+
+        :param candidates: An optional list of compressor names or mime-types
+          to choose from. Defaults to all registered compressors.
+
+        :param objective: The name of an objective (e.g. saved_per_ms, ratio)
+          or a function that scores a codec_sample. Higher scores are better.
+
+        :param sample_interval: The number of payloads between samples.
+
+        :param sample_size: The maximum number of bytes of a payload that are
+          used when benchmarking the compressors.
+
+        :param window: The number of recent samples used to select a
+          compressor.
+
+        :param min_size: Payloads smaller than this are not compressed.
+
+        :param min_saving: The minimum fraction of bytes a compressor must
+          save for payloads to be considered compressible.
+        """
+        if isinstance(objective, str):
+            if objective not in OBJECTIVES:
+                raise Exception(f"Invalid compression objective '{objective}'")
+            objective = OBJECTIVES[objective]
+        self.registry = registry
+        self.candidates = candidates
+        self.objective = objective
+        self.sample_interval = sample_interval
+        self.sample_size = sample_size
+        self.min_size = min_size
+        self.min_saving = min_saving
+        self.selected = None  # type: Optional[str]
+        self._samples = deque(maxlen=window)  # type: deque
+        self._countdown = 0
+        self._counters = dict(
+            payloads=0, samples=0, skipped_small=0, skipped_incompressible=0
+        )  # type: Dict[str, int]
+        self._selections = {}  # type: Dict[Optional[str], int]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ Return statistics describing the automatic selection.
+
+        The statistics include the currently selected compressor, counts of
+        payloads, samples and skipped payloads, the number of times each
+        compressor was used and the most recent measurements (sizes and times
+        in milliseconds) for each candidate.
+        """
+        stats = dict(self._counters)  # type: Dict[str, Any]
+        stats["selected"] = self.selected
+        stats["selections"] = dict(self._selections)
+        stats["codecs"] = {
+            name: dict(sample._asdict(), score=self.objective(sample))
+            for name, sample in self._aggregate().items()
+        }
+        return stats
+
+    def select(self, data, **kwargs) -> Optional[str]:
+        """ Return the name of the compressor to use for a payload.
+
+        :param data: The payload that is about to be compressed.
+
+        :param kwargs: Compression options (e.g. preset) to use when
+          benchmarking the compressors.
+
+        :returns: A compressor name or None if the payload should not be
+          compressed.
+        """
+        self._counters["payloads"] += 1
+        if len(data) < self.min_size:
+            self._counters["skipped_small"] += 1
+            return None
+
+        if self._countdown <= 0:
+            self._countdown = self.sample_interval
+            self._sample(data, **kwargs)
+        self._countdown -= 1
+
+        if self.selected is None:
+            self._counters["skipped_incompressible"] += 1
+        return self.selected
+
+    def record(self, name: Optional[str]) -> None:
+        """ Count the use of a compressor for a payload. """
+        self._selections[name] = self._selections.get(name, 0) + 1
+
+    def reset(self) -> None:
+        """ Discard all measurements and statistics. """
+        self.selected = None
+        self._samples.clear()
+        self._countdown = 0
+        for key in self._counters:
+            self._counters[key] = 0
+        self._selections.clear()
+
+    def _sample(self, data, **kwargs) -> None:
+        """ Benchmark the candidate compressors and update the selection. """
+        self._counters["samples"] += 1
+        view = memoryview(data)[: self.sample_size]
+        names = self.candidates
+        if names is None:
+            names = [name for name in self.registry.compressors if name is not None]
+
+        samples = {}
+        for name_or_type in names:
+            compressor = self.registry.get_compressor(name_or_type)
+            t0 = time.perf_counter()
+            payload = compressor.compress(view, **kwargs)
+            t1 = time.perf_counter()
+            compressor.decompress(payload, **kwargs)
+            t2 = time.perf_counter()
+            name, _content_type = self.registry._resolve(name_or_type)
+            samples[name] = codec_sample(
+                name, len(view), len(payload), (t1 - t0) * 1e3, (t2 - t1) * 1e3
+            )
+        self._samples.append(samples)
+
+        best, best_score = None, None
+        for name, sample in self._aggregate().items():
+            if sample.size - sample.compressed_size < self.min_saving * sample.size:
+                continue
+            score = self.objective(sample)
+            if best_score is None or score > best_score:
+                best, best_score = name, score
+        self.selected = best
+
+    def _aggregate(self) -> Dict[str, codec_sample]:
+        """ Sum the measurements for each compressor over the window. """
+        totals = {}  # type: Dict[str, codec_sample]
+        for samples in self._samples:
+            for name, sample in samples.items():
+                total = totals.get(name)
+                totals[name] = (
+                    sample
+                    if total is None
+                    else codec_sample(
+                        name,
+                        total.size + sample.size,
+                        total.compressed_size + sample.compressed_size,
+                        total.compress_time + sample.compress_time,
+                        total.decompress_time + sample.decompress_time,
+                    )
+                )
+        return totals
+
 
 class CompressorRegistry:
     """ This registry keeps track of compression strategies.
@@ -74,6 +661,8 @@ class CompressorRegistry:
         self._default_codec = None  # type: Optional[str]
         self.type_to_name = {}  # type: Dict[Optional[str], Optional[str]]
         self.name_to_type = {}  # type: Dict[Optional[str], Optional[str]]
+        self._executor = None  # type: Optional[Executor]
+        self.selector = CodecSelector(self)
 
     def register(
         self,
@@ -102,6 +691,26 @@ class CompressorRegistry:
         self.type_to_name[content_type] = name
         self.name_to_type[name] = content_type
 
+    def configure(
+        self, name_or_type: Optional[str], preset: str = None, **options
+    ) -> None:
+        """ Change the default options of a specific compressor.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. The value may be the alias name (e.g. zlib)
+          or the mime-type (e.g. application/zlib).
+
+        :param preset: An optional preset name (e.g. fast, balanced, max).
+
+        :param options: Optional compression settings (e.g. level, strategy)
+          that override the preset settings.
+
+        Raises:
+            Exception: If the compression method or preset requested is not
+              available.
+        """
+        self.get_compressor(name_or_type).configure(preset, **options)
+
     def set_default(self, name_or_type: Optional[str]) -> None:
         """ Set the default compression method used by this library.
 
@@ -119,7 +728,7 @@ class CompressorRegistry:
         """ Return a dict of the available compressors (codecs) """
         return self._compressors
 
-    def get_compressor(self, name_or_type: str):
+    def get_compressor(self, name_or_type: Optional[str]):
         """ Return a specific compressor.
 
         :param name_or_type: The convenience name or the mime-type for the
@@ -145,7 +754,7 @@ class CompressorRegistry:
         return self._compressors[name]
 
     def compress(
-        self, data: Any, name_or_type: Optional[str] = None
+        self, data: Any, name_or_type: Optional[str] = None, **kwargs
     ) -> Tuple[Optional[str], bytes]:
         """ Compress some data.
 
@@ -155,7 +764,26 @@ class CompressorRegistry:
 
         :param name_or_type: The convenience name or the mime-type for the
           compression strategy. The value may be the alias name (e.g. zlib)
-          or the mime-type (e.g. application/zlib). Defaults to none.
+          or the mime-type (e.g. application/zlib). Defaults to none. If the
+          value is auto then the compressor is chosen by the registry's
+          selector and the returned mime-type identifies the choice. Payloads
+          that would not get smaller are returned uncompressed.
+
+        Keywords:
+
+          :param preset: A preset name (e.g. fast, balanced, max) that selects
+            the compression options to use for this call.
+
+          :param level: A compression level that overrides the configured
+            level. The range of valid values depends on the compressor.
+
+          :param strategy: A compression strategy that overrides the
+            configured strategy. Only used by compressors that support
+            strategies (e.g. zlib, brotli).
+
+          :param dict_id: An integer that identifies a registered compression
+            dictionary. Only used by compressors that support dictionaries
+            (e.g. zstd).
 
         :returns: A tuple containing a string specifying the compression mime-type
           (e.g. `application/gzip`) and a bytes object representing the compressed data.
@@ -163,12 +791,14 @@ class CompressorRegistry:
         Raises:
             Exception: If the compression method requested is not available.
         """
+        if name_or_type == COMPRESSION_AUTO:
+            return self._compress_auto(data, **kwargs)
         name, content_type = self._resolve(name_or_type)
-        payload = self._compressors[name].compressor.compress(data)
+        payload = self._compressors[name].compressor.compress(data, **kwargs)
         return content_type, payload
 
     def decompress(
-        self, data: bytes, name_or_type: Optional[str] = None, **kwargs
+        self, data: BytesLike, name_or_type: Optional[str] = None, **kwargs
     ) -> Tuple[Optional[str], bytes]:
         """ Decompress some data.
 
@@ -181,16 +811,298 @@ class CompressorRegistry:
           compression strategy. The value may be the alias name (e.g. zlib)
           or the mime-type (e.g. application/zlib). Defaults to none.
 
+        Keywords:
+
+          :param dict_id: An integer that identifies a registered compression
+            dictionary. Only used by compressors that support dictionaries
+            (e.g. zstd).
+
+          :param max_length: The maximum number of decompressed bytes. If the
+            decompressed data would exceed this size then decompression is
+            aborted and an exception is raised. Defaults to no limit.
+
         Raises:
-            Exception: If the decompression method requested is not available.
+            Exception: If the decompression method requested is not available
+              or if the decompressed data exceeds the maximum length.
 
         Returns:
             Any: Decompressed data.
         """
         name, content_type = self._resolve(name_or_type)
-        payload = self._compressors[name].compressor.decompress(data)
+        payload = _decompress(self._compressors[name].compressor, data, **kwargs)
         return content_type, payload
 
+    def compressobj(
+        self, name_or_type: Optional[str] = None, **kwargs
+    ) -> Tuple[Optional[str], StreamCompressor]:
+        """ Create an incremental compressor.
+
+        Data is passed to the compressor's ``feed`` method in chunks and the
+        available compressed output is returned. The ``flush`` method must be
+        called at the end of the stream to obtain the remaining output. The
+        concatenated output can be decompressed using `decompress`.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+
+        :param kwargs: Compression options (e.g. preset, level, dict_id) as
+          accepted by `compress`.
+
+        :returns: A tuple containing a string specifying the compression
+          mime-type and a StreamCompressor object.
+        """
+        name, content_type = self._resolve(name_or_type)
+        return content_type, self._compressors[name].compressor.compressobj(**kwargs)
+
+    def decompressobj(
+        self, name_or_type: Optional[str] = None, max_length: int = None, **kwargs
+    ) -> Tuple[Optional[str], StreamDecompressor]:
+        """ Create an incremental decompressor.
+
+        Compressed data is passed to the decompressor's ``feed`` method in
+        chunks and the available decompressed output is returned. The
+        ``flush`` method must be called at the end of the stream.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+
+        :param max_length: The maximum number of decompressed bytes. An
+          exception is raised as soon as the decompressed output exceeds this
+          size. Defaults to no limit.
+
+        :param kwargs: Decompression options (e.g. dict_id) as accepted by
+          `decompress`.
+
+        :returns: A tuple containing a string specifying the compression
+          mime-type and a StreamDecompressor object.
+        """
+        name, content_type = self._resolve(name_or_type)
+        decompressor = self._compressors[name].compressor.decompressobj(
+            max_length=max_length, **kwargs
+        )
+        return content_type, decompressor
+
+    async def compress_stream(
+        self, chunks: AsyncIterable[bytes], name_or_type: Optional[str] = None, **kwargs
+    ) -> AsyncIterator[bytes]:
+        """ Compress an asynchronous stream of data.
+
+        This is an asynchronous generator that yields compressed chunks as
+        they become available. Empty chunks are not yielded.
+
+        :param chunks: An asynchronous iterable that provides the data to
+          compress.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+        """
+        _content_type, compressor = self.compressobj(name_or_type, **kwargs)
+        async for chunk in chunks:
+            data = compressor.feed(chunk)
+            if data:
+                yield data
+        data = compressor.flush()
+        if data:
+            yield data
+
+    async def decompress_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        name_or_type: Optional[str] = None,
+        max_length: int = None,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """ Decompress an asynchronous stream of data.
+
+        This is an asynchronous generator that yields decompressed chunks as
+        they become available. Empty chunks are not yielded.
+
+        :param chunks: An asynchronous iterable that provides the compressed
+          data.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+
+        :param max_length: The maximum number of decompressed bytes. An
+          exception is raised as soon as the decompressed output exceeds this
+          size. Defaults to no limit.
+        """
+        _content_type, decompressor = self.decompressobj(
+            name_or_type, max_length=max_length, **kwargs
+        )
+        async for chunk in chunks:
+            data = decompressor.feed(chunk)
+            if data:
+                yield data
+        data = decompressor.flush()
+        if data:
+            yield data
+
+    def compress_blocks(
+        self,
+        data: BytesLike,
+        name_or_type: Optional[str] = None,
+        block_size: int = BLOCK_SIZE,
+        executor: Executor = None,
+        **kwargs,
+    ) -> Tuple[Optional[str], bytes]:
+        """ Compress some data as independent blocks in parallel.
+
+        The data is split into blocks which are compressed concurrently in a
+        thread pool. Most compression libraries (e.g. zlib, bz2, lzma, zstd)
+        release the GIL while compressing so this makes use of multiple cores
+        for large payloads. The compressed blocks are combined into a
+        container that must be decompressed using `decompress_blocks`.
+
+        :param data: The message data to compress.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+
+        :param block_size: The number of uncompressed bytes in each block.
+
+        :param executor: An optional executor to compress blocks in. Defaults
+          to a thread pool owned by the registry.
+
+        :returns: A tuple containing a string specifying the compression
+          mime-type and a bytes object containing the block container.
+        """
+        if name_or_type == COMPRESSION_AUTO:
+            name_or_type = self._select(data, **kwargs)
+        name, content_type = self._resolve(name_or_type)
+        func = functools.partial(self._compressors[name].compressor.compress, **kwargs)
+        executor = executor or self._get_executor()
+        blocks = list(executor.map(func, _split_blocks(data, block_size)))
+        return content_type, _pack_blocks(blocks)
+
+    def decompress_blocks(
+        self,
+        data: BytesLike,
+        name_or_type: Optional[str] = None,
+        executor: Executor = None,
+        **kwargs,
+    ) -> Tuple[Optional[str], bytes]:
+        """ Decompress a block container in parallel.
+
+        :param data: A block container created by `compress_blocks`.
+
+        :param name_or_type: The convenience name or the mime-type for the
+          compression strategy. Defaults to none.
+
+        :param executor: An optional executor to decompress blocks in.
+          Defaults to a thread pool owned by the registry.
+
+        Keywords:
+
+          :param max_length: The maximum number of decompressed bytes. The
+            blocks share this allowance, which is reduced as each block is
+            decompressed, and decompression is aborted as soon as it has been
+            used up. Defaults to no limit.
+
+        Raises:
+            Exception: If the data is not a valid block container or if the
+              decompressed data exceeds the maximum length.
+        """
+        name, content_type = self._resolve(name_or_type)
+        max_length = kwargs.pop("max_length", None)
+        blocks = _unpack_blocks(data, max_length)
+        func = functools.partial(
+            _decompress_block,
+            self._compressors[name].compressor,
+            allowance=_Allowance(max_length),
+            **kwargs,
+        )
+        executor = executor or self._get_executor()
+        return content_type, b"".join(executor.map(func, blocks))
+
+    async def compress_blocks_async(
+        self,
+        data: BytesLike,
+        name_or_type: Optional[str] = None,
+        block_size: int = BLOCK_SIZE,
+        executor: Executor = None,
+        loop: asyncio.AbstractEventLoop = None,
+        **kwargs,
+    ) -> Tuple[Optional[str], bytes]:
+        """ Compress some data as independent blocks without blocking the
+        event loop.
+
+        This is the awaitable equivalent of `compress_blocks`.
+        """
+        if name_or_type == COMPRESSION_AUTO:
+            name_or_type = self._select(data, **kwargs)
+        name, content_type = self._resolve(name_or_type)
+        func = self._compressors[name].compressor.compress
+        loop = loop or asyncio.get_event_loop()
+        executor = executor or self._get_executor()
+        blocks = await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, functools.partial(func, block, **kwargs))
+                for block in _split_blocks(data, block_size)
+            ]
+        )
+        return content_type, _pack_blocks(blocks)
+
+    async def decompress_blocks_async(
+        self,
+        data: BytesLike,
+        name_or_type: Optional[str] = None,
+        executor: Executor = None,
+        loop: asyncio.AbstractEventLoop = None,
+        **kwargs,
+    ) -> Tuple[Optional[str], bytes]:
+        """ Decompress a block container without blocking the event loop.
+
+        This is the awaitable equivalent of `decompress_blocks`.
+        """
+        name, content_type = self._resolve(name_or_type)
+        max_length = kwargs.pop("max_length", None)
+        blocks = _unpack_blocks(data, max_length)
+        func = functools.partial(
+            _decompress_block,
+            self._compressors[name].compressor,
+            allowance=_Allowance(max_length),
+            **kwargs,
+        )
+        loop = loop or asyncio.get_event_loop()
+        executor = executor or self._get_executor()
+        decompressed = await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, functools.partial(func, block))
+                for block in blocks
+            ]
+        )
+        return content_type, b"".join(decompressed)
+
+    def _compress_auto(self, data, **kwargs) -> Tuple[Optional[str], bytes]:
+        """ Compress data using the compressor chosen by the selector. """
+        name = self.selector.select(data, **kwargs)
+        if name is not None:
+            content_type, payload = self.compress(data, name, **kwargs)
+            if len(payload) < len(data):
+                self.selector.record(name)
+                return content_type, payload
+        self.selector.record(None)
+        return self.compress(data, None)
+
+    def _select(self, data, **kwargs) -> Optional[str]:
+        """ Return the name of the compressor chosen by the selector. """
+        name = self.selector.select(data, **kwargs)
+        self.selector.record(name)
+        return name
+
+    def _get_executor(self) -> Executor:
+        """ Return the thread pool used for block compression.
+
+        The pool is created on first use so that users who never compress
+        large payloads do not pay for it.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="gestalt-compress"
+            )
+        return self._executor
+
     def _resolve(
         self, name_or_type: Optional[str]
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -215,22 +1127,171 @@ class CompressorRegistry:
         return name, content_type
 
 
+def _is_buffer(data) -> bool:
+    """ Return True if data supports the buffer protocol (e.g. bytes,
+    bytearray, memoryview).
+    """
+    try:
+        memoryview(data)
+    except TypeError:
+        return False
+    return True
+
+
+def _decompress(
+    compressor: ICompressor, data: BytesLike, max_length: int = None, **kwargs
+) -> bytes:
+    """ Decompress data, using an incremental decompressor when the size of
+    the output is limited so that decompression is aborted early.
+    """
+    if max_length is None:
+        return compressor.decompress(data, **kwargs)
+    decompressor = compressor.decompressobj(max_length=max_length, **kwargs)
+    return decompressor.feed(data) + decompressor.flush()
+
+
+class _Allowance:
+    """ The number of decompressed bytes that the blocks of a container may
+    still produce. It is shared by blocks decompressed in different threads.
+    """
+
+    def __init__(self, max_length: int = None) -> None:
+        """
+        :param max_length: An optional maximum number of decompressed bytes.
+          If not specified then the output size is not limited.
+        """
+        self.max_length = max_length
+        self.remaining = max_length
+        self._lock = threading.Lock()
+
+    def take(self, length: int) -> None:
+        """ Deduct a number of decompressed bytes from the allowance.
+
+        Raises:
+            Exception: If the allowance is exceeded.
+        """
+        if self.remaining is None:
+            return
+        with self._lock:
+            self.remaining -= length
+            exceeded = self.remaining < 0
+        if exceeded:
+            self._exceeded()
+
+    def check(self) -> None:
+        """ Check that further output can be produced. Every block
+        decompresses to at least one byte so no block is decompressed once
+        the allowance has been used up.
+
+        Raises:
+            Exception: If the allowance has been used up.
+        """
+        if self.remaining is not None and self.remaining <= 0:
+            self._exceeded()
+
+    def _exceeded(self) -> None:
+        raise Exception(
+            f"Decompressed data exceeds maximum length of {self.max_length} bytes"
+        )
+
+
+def _decompress_block(
+    compressor: ICompressor, data: BytesLike, allowance: _Allowance, **kwargs
+) -> bytes:
+    """ Decompress a block of a container, deducting its output from the
+    allowance shared by the container's blocks as it is produced.
+
+    Raises:
+        Exception: If the allowance has been used up, before the block is
+          decompressed, or if the block's output exceeds it.
+    """
+    if allowance.remaining is None:
+        return compressor.decompress(data, **kwargs)
+
+    allowance.check()
+    decompressor = compressor.decompressobj(max_length=allowance.remaining, **kwargs)
+    decompressor.allowance = allowance
+    return decompressor.feed(data) + decompressor.flush()
+
+
+def _split_blocks(data: BytesLike, block_size: int) -> List[memoryview]:
+    """ Split data into blocks of (at most) block_size bytes. """
+    if block_size <= 0:
+        raise Exception(f"Invalid block size {block_size}")
+    view = memoryview(data)
+    return [view[i : i + block_size] for i in range(0, len(view), block_size)]
+
+
+def _pack_blocks(blocks: List[bytes]) -> bytes:
+    """ Combine compressed blocks into a block container. """
+    header = struct.pack(BLOCK_HEADER_FORMAT, BLOCK_MAGIC, len(blocks))
+    lengths = struct.pack(f"<{len(blocks)}I", *[len(block) for block in blocks])
+    return b"".join([header, lengths] + blocks)
+
+
+def _unpack_blocks(data: BytesLike, max_length: int = None) -> List[memoryview]:
+    """ Extract the compressed blocks from a block container.
+
+    :param max_length: An optional maximum number of decompressed bytes.
+      Every block decompresses to at least one byte so a container with more
+      blocks than this is rejected.
+
+    Raises:
+        Exception: If the data is not a valid block container.
+    """
+    if len(data) < BLOCK_HEADER_SIZE:
+        raise Exception("Invalid block container, too short")
+
+    magic, count = struct.unpack(BLOCK_HEADER_FORMAT, data[:BLOCK_HEADER_SIZE])
+    if magic != BLOCK_MAGIC:
+        raise Exception("Invalid block container, bad magic value")
+
+    if max_length is not None and count > max_length:
+        raise Exception(
+            f"Invalid block container, {count} blocks exceed maximum length of "
+            f"{max_length} bytes"
+        )
+
+    offset = BLOCK_HEADER_SIZE + 4 * count
+    if len(data) < offset:
+        raise Exception("Invalid block container, truncated header")
+    lengths = struct.unpack(f"<{count}I", data[BLOCK_HEADER_SIZE:offset])
+
+    if offset + sum(lengths) != len(data):
+        raise Exception("Invalid block container, length mismatch")
+
+    view = memoryview(data)
+    blocks = []
+    for length in lengths:
+        blocks.append(view[offset : offset + length])
+        offset += length
+    return blocks
+
+
 def register_none(reg: CompressorRegistry):
     """ The compression you have when you don't want compression. """
 
     class NoneCompressor(ICompressor):
-        def compress(self, data):
+        def compress(self, data, **kwargs):
             """
             Return data as a bytes object.
             """
-            if not isinstance(data, bytes):
-                raise Exception(f"Can only compress bytes, got {type(data)}")
+            if not _is_buffer(data):
+                raise Exception(
+                    f"Can only compress bytes-like objects, got {type(data)}"
+                )
 
             return data
 
-        def decompress(self, data):
+        def decompress(self, data, **kwargs):
             return data
 
+        def compressobj(self, **kwargs):
+            return ObjectStreamCompressor(bytes, lambda: b"")
+
+        def decompressobj(self, max_length: int = None, **kwargs):
+            return PassthroughStreamDecompressor(max_length=max_length)
+
     compressor = NoneCompressor()
     reg.register(None, compressor, None)
 
@@ -239,7 +1300,21 @@ def register_zlib(reg: CompressorRegistry):
     """ Register a compressor/decompressor for zlib compression. """
 
     class ZlibCompressor(ICompressor):
-        def compress(self, data):
+        default_options = {"level": 9, "strategy": zlib.Z_DEFAULT_STRATEGY}
+        presets = {
+            PRESET_FAST: {"level": 1},
+            PRESET_BALANCED: {"level": 6},
+            PRESET_MAX: {"level": 9},
+        }
+
+        def compress(
+            self,
+            data,
+            preset: str = None,
+            level: int = None,
+            strategy: int = None,
+            **kwargs,
+        ):  # pylint: disable=arguments-differ
             """ Create a RFC 1950 data format (zlib) compressor and compress
             some data.
 
@@ -248,14 +1323,21 @@ def register_zlib(reg: CompressorRegistry):
 
             :return: data as a bytes object.
             """
-            if not isinstance(data, bytes):
-                raise Exception("Can only compress bytes, got {}".format(type(data)))
-
-            compressor = zlib.compressobj(level=9, wbits=zlib.MAX_WBITS)
+            if not _is_buffer(data):
+                raise Exception(
+                    "Can only compress bytes-like objects, got {}".format(type(data))
+                )
+
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=zlib.MAX_WBITS,
+                strategy=options["strategy"],
+            )
             data = compressor.compress(data) + compressor.flush()
             return data
 
-        def decompress(self, data):
+        def decompress(self, data, **kwargs):
             """ Create a RFC 1950 data format (zlib) decompressor and
             decompress some data.
 
@@ -268,6 +1350,22 @@ def register_zlib(reg: CompressorRegistry):
             data = decompressor.decompress(data) + decompressor.flush()
             return data
 
+        def compressobj(
+            self, preset: str = None, level: int = None, strategy: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Create an incremental RFC 1950 data format (zlib) compressor. """
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=zlib.MAX_WBITS,
+                strategy=options["strategy"],
+            )
+            return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+        def decompressobj(self, max_length: int = None, **kwargs):
+            """ Create an incremental RFC 1950 data format (zlib) decompressor. """
+            return ZlibStreamDecompressor(zlib.MAX_WBITS, max_length=max_length)
+
     compressor = ZlibCompressor()
     reg.register("zlib", compressor, COMPRESSION_ZLIB)
 
@@ -276,7 +1374,21 @@ def register_deflate(reg: CompressorRegistry):
     """ Register a compressor/decompressor for deflate compression. """
 
     class DeflateCompressor(ICompressor):
-        def compress(self, data):
+        default_options = {"level": 9, "strategy": zlib.Z_DEFAULT_STRATEGY}
+        presets = {
+            PRESET_FAST: {"level": 1},
+            PRESET_BALANCED: {"level": 6},
+            PRESET_MAX: {"level": 9},
+        }
+
+        def compress(
+            self,
+            data,
+            preset: str = None,
+            level: int = None,
+            strategy: int = None,
+            **kwargs,
+        ):  # pylint: disable=arguments-differ
             """ Create a RFC 1951 data format (deflate) compressor and compress
             some data.
 
@@ -285,14 +1397,21 @@ def register_deflate(reg: CompressorRegistry):
 
             :return: data as a bytes object.
             """
-            if not isinstance(data, bytes):
-                raise Exception("Can only compress bytes, got {}".format(type(data)))
-
-            compressor = zlib.compressobj(level=9, wbits=-zlib.MAX_WBITS)
+            if not _is_buffer(data):
+                raise Exception(
+                    "Can only compress bytes-like objects, got {}".format(type(data))
+                )
+
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=-zlib.MAX_WBITS,
+                strategy=options["strategy"],
+            )
             data = compressor.compress(data) + compressor.flush()
             return data
 
-        def decompress(self, data):
+        def decompress(self, data, **kwargs):
             """ Create a RFC 1951 data format (deflate) decompressor and
             decompress some data.
 
@@ -305,6 +1424,22 @@ def register_deflate(reg: CompressorRegistry):
             data = decompressor.decompress(data) + decompressor.flush()
             return data
 
+        def compressobj(
+            self, preset: str = None, level: int = None, strategy: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Create an incremental RFC 1951 data format (deflate) compressor. """
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=-zlib.MAX_WBITS,
+                strategy=options["strategy"],
+            )
+            return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+        def decompressobj(self, max_length: int = None, **kwargs):
+            """ Create an incremental RFC 1951 data format (deflate) decompressor. """
+            return ZlibStreamDecompressor(-zlib.MAX_WBITS, max_length=max_length)
+
     compressor = DeflateCompressor()
     reg.register("deflate", compressor, COMPRESSION_DEFLATE)
 
@@ -313,7 +1448,21 @@ def register_gzip(reg: CompressorRegistry):
     """ Register a compressor/decompressor for gzip compression. """
 
     class GzipCompressor(ICompressor):
-        def compress(self, data):
+        default_options = {"level": 9, "strategy": zlib.Z_DEFAULT_STRATEGY}
+        presets = {
+            PRESET_FAST: {"level": 1},
+            PRESET_BALANCED: {"level": 6},
+            PRESET_MAX: {"level": 9},
+        }
+
+        def compress(
+            self,
+            data,
+            preset: str = None,
+            level: int = None,
+            strategy: int = None,
+            **kwargs,
+        ):  # pylint: disable=arguments-differ
             """ Create a RFC 1952 data format (gzip) compressor and compress
             some data.
 
@@ -322,14 +1471,21 @@ def register_gzip(reg: CompressorRegistry):
 
             :return: data as a bytes object.
             """
-            if not isinstance(data, bytes):
-                raise Exception(f"Can only compress bytes, got {type(data)}")
-
-            compressor = zlib.compressobj(level=9, wbits=zlib.MAX_WBITS | 16)
+            if not _is_buffer(data):
+                raise Exception(
+                    f"Can only compress bytes-like objects, got {type(data)}"
+                )
+
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=zlib.MAX_WBITS | 16,
+                strategy=options["strategy"],
+            )
             data = compressor.compress(data) + compressor.flush()
             return data
 
-        def decompress(self, data):
+        def decompress(self, data, **kwargs):
             """ Create a RFC 1952 data format (gzip) decompressor and
             decompress some data.
 
@@ -342,6 +1498,22 @@ def register_gzip(reg: CompressorRegistry):
             data = decompressor.decompress(data) + decompressor.flush()
             return data
 
+        def compressobj(
+            self, preset: str = None, level: int = None, strategy: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Create an incremental RFC 1952 data format (gzip) compressor. """
+            options = self.get_options(preset, level=level, strategy=strategy)
+            compressor = zlib.compressobj(
+                level=options["level"],
+                wbits=zlib.MAX_WBITS | 16,
+                strategy=options["strategy"],
+            )
+            return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+        def decompressobj(self, max_length: int = None, **kwargs):
+            """ Create an incremental RFC 1952 data format (gzip) decompressor. """
+            return ZlibStreamDecompressor(zlib.MAX_WBITS | 16, max_length=max_length)
+
     compressor = GzipCompressor()
     reg.register("gzip", compressor, COMPRESSION_GZIP)
 
@@ -352,7 +1524,16 @@ def register_bz2(reg: CompressorRegistry):
     if have_bz2:
 
         class Bz2Compressor(ICompressor):
-            def compress(self, data):
+            default_options = {"level": 9}
+            presets = {
+                PRESET_FAST: {"level": 1},
+                PRESET_BALANCED: {"level": 5},
+                PRESET_MAX: {"level": 9},
+            }
+
+            def compress(
+                self, data, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
                 """ Create a bz2 compressor and compress some data.
 
                 After calling flush the compressor can't be used again. Hence,
@@ -360,14 +1541,17 @@ def register_bz2(reg: CompressorRegistry):
 
                 :return: data as a bytes object.
                 """
-                if not isinstance(data, bytes):
-                    raise Exception(f"Can only compress bytes, got {type(data)}")
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
 
-                compressor = bz2.BZ2Compressor()
+                options = self.get_options(preset, level=level)
+                compressor = bz2.BZ2Compressor(options["level"])
                 data = compressor.compress(data) + compressor.flush()
                 return data
 
-            def decompress(self, data):
+            def decompress(self, data, **kwargs):
                 """ Create a bz2 decompressor and decompress some data.
 
                 :return: data as a bytes object.
@@ -376,6 +1560,20 @@ def register_bz2(reg: CompressorRegistry):
                 data = decompressor.decompress(data)
                 return data
 
+            def compressobj(
+                self, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental bz2 compressor. """
+                options = self.get_options(preset, level=level)
+                compressor = bz2.BZ2Compressor(options["level"])
+                return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+            def decompressobj(self, max_length: int = None, **kwargs):
+                """ Create an incremental bz2 decompressor. """
+                return MaxLengthStreamDecompressor(
+                    bz2.BZ2Decompressor(), max_length=max_length
+                )
+
         compressor = Bz2Compressor()
         reg.register("bzip2", compressor, COMPRESSION_BZ2)
 
@@ -386,7 +1584,16 @@ def register_lzma(reg: CompressorRegistry):
     if have_lzma:
 
         class LzmaCompressor(ICompressor):
-            def compress(self, data):
+            default_options = {"level": lzma.PRESET_DEFAULT}
+            presets = {
+                PRESET_FAST: {"level": 0},
+                PRESET_BALANCED: {"level": 3},
+                PRESET_MAX: {"level": 9},
+            }
+
+            def compress(
+                self, data, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
                 """ Create a lzma compressor and compress some data.
 
                 After calling flush the compressor can't be used again. Hence,
@@ -394,14 +1601,17 @@ def register_lzma(reg: CompressorRegistry):
 
                 :return: data as a bytes object.
                 """
-                if not isinstance(data, bytes):
-                    raise Exception(f"Can only compress bytes, got {type(data)}")
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
 
-                compressor = lzma.LZMACompressor()
+                options = self.get_options(preset, level=level)
+                compressor = lzma.LZMACompressor(preset=options["level"])
                 data = compressor.compress(data) + compressor.flush()
                 return data
 
-            def decompress(self, data):
+            def decompress(self, data, **kwargs):
                 """ Create a lzma decompressor and decompress some data.
 
                 :return: data as a bytes object.
@@ -410,6 +1620,20 @@ def register_lzma(reg: CompressorRegistry):
                 data = decompressor.decompress(data)
                 return data
 
+            def compressobj(
+                self, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental lzma compressor. """
+                options = self.get_options(preset, level=level)
+                compressor = lzma.LZMACompressor(preset=options["level"])
+                return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+            def decompressobj(self, max_length: int = None, **kwargs):
+                """ Create an incremental lzma decompressor. """
+                return MaxLengthStreamDecompressor(
+                    lzma.LZMADecompressor(), max_length=max_length
+                )
+
         compressor = LzmaCompressor()
         reg.register("lzma", compressor, COMPRESSION_LZMA)
 
@@ -420,23 +1644,96 @@ def register_brotli(reg: CompressorRegistry):
     if have_brotli:
 
         class BrotliCompressor(ICompressor):
-            def compress(self, data):
+            default_options = {"level": 11, "strategy": brotli.MODE_GENERIC}
+            presets = {
+                PRESET_FAST: {"level": 1},
+                PRESET_BALANCED: {"level": 5},
+                PRESET_MAX: {"level": 11},
+            }
+
+            def compress(
+                self,
+                data,
+                preset: str = None,
+                level: int = None,
+                strategy: int = None,
+                **kwargs,
+            ):  # pylint: disable=arguments-differ
                 """ Compress data using a brotli compressor.
 
                 :return: data as a bytes object.
                 """
-                if not isinstance(data, bytes):
-                    raise Exception(f"Can only compress bytes, got {type(data)}")
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
 
-                return brotli.compress(data)
+                options = self.get_options(preset, level=level, strategy=strategy)
+                return brotli.compress(
+                    data, mode=options["strategy"], quality=options["level"]
+                )
 
-            def decompress(self, data):
+            def decompress(self, data, **kwargs):
                 """ Decompress data using a brotli decompressor.
 
                 :return: data as a bytes object.
                 """
                 return brotli.decompress(data)
 
+            def compressobj(
+                self,
+                preset: str = None,
+                level: int = None,
+                strategy: int = None,
+                **kwargs,
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental brotli compressor. """
+                options = self.get_options(preset, level=level, strategy=strategy)
+                compressor = brotli.Compressor(
+                    mode=options["strategy"], quality=options["level"]
+                )
+                return ObjectStreamCompressor(compressor.process, compressor.finish)
+
+            def decompressobj(self, max_length: int = None, **kwargs):
+                """ Create an incremental brotli decompressor. """
+                return BrotliStreamDecompressor(max_length=max_length)
+
+        class BrotliStreamDecompressor(StreamDecompressor):
+            """ Adapt a brotli decompressor object.
+
+            The decompressor's output buffer limit stops each call once the
+            remaining allowance has been produced. Any further output is
+            collected by calls with empty input until the decompressor can
+            accept more data. This bounds the memory used by each call.
+            """
+
+            def __init__(self, max_length: int = None) -> None:
+                super().__init__(max_length=max_length)
+                self._obj = brotli.Decompressor()
+
+            def feed(self, data) -> bytes:
+                if self.max_length is None:
+                    return self._account(self._obj.process(data))
+
+                obj = self._obj
+                chunks = [
+                    self._account(obj.process(data, output_buffer_limit=self._limit(0)))
+                ]
+                while not obj.can_accept_more_data():
+                    chunks.append(
+                        self._account(
+                            obj.process(b"", output_buffer_limit=self._limit(0))
+                        )
+                    )
+                return b"".join(chunks)
+
+            def flush(self) -> bytes:
+                if not self._obj.is_finished():
+                    raise Exception(
+                        "Compressed data ended before the end-of-stream marker"
+                    )
+                return b""
+
         compressor = BrotliCompressor()
         reg.register("brotli", compressor, COMPRESSION_BROTLI)
 
@@ -446,28 +1743,393 @@ def register_snappy(reg: CompressorRegistry):
 
     if have_snappy:
 
+        class SnappyStreamDecompressor(BufferedStreamDecompressor):
+            """ Buffer snappy data and check the uncompressed length early.
+
+            The uncompressed length is stored as a varint at the start of the
+            snappy data so oversized data is rejected before decompression.
+            """
+
+            def __init__(self, max_length: int = None):
+                super().__init__(snappy.uncompress, max_length=max_length)
+                self._checked = False
+
+            def feed(self, data) -> bytes:
+                super().feed(data)
+                if self.max_length is not None and not self._checked:
+                    length, shift = 0, 0
+                    for byte in self._buffer[:10]:
+                        length |= (byte & 0x7F) << shift
+                        if not byte & 0x80:
+                            self._checked = True
+                            self._reserve(length)
+                            break
+                        shift += 7
+                return b""
+
         class SnappyCompressor(ICompressor):
-            def compress(self, data):
+            def compress(self, data, **kwargs):
                 """ Compress data using a snappy compressor.
 
                 :return: data as a bytes object.
                 """
-                if not isinstance(data, bytes):
-                    raise Exception(f"Can only compress bytes, got {type(data)}")
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
 
                 return snappy.compress(data)
 
-            def decompress(self, data):
+            def decompress(self, data, **kwargs):
                 """ Decompress data using a snappy decompressor.
 
                 :return: data as a bytes object.
                 """
                 return snappy.uncompress(data)
 
+            def decompressobj(self, max_length: int = None, **kwargs):
+                """ Create an incremental snappy decompressor.
+
+                The snappy format does not support incremental decompression
+                so the data is buffered until the stream is flushed.
+                """
+                return SnappyStreamDecompressor(max_length=max_length)
+
         compressor = SnappyCompressor()
         reg.register("snappy", compressor, COMPRESSION_SNAPPY)
 
 
+def register_zstd(reg: CompressorRegistry, dictionary_registry=None):
+    """ Register a compressor/decompressor for Zstandard compression.
+
+    Zstandard supports compressing with a pre-shared dictionary which gives
+    a large improvement in compression ratio for small messages that share
+    common content (e.g. JSON keys). Dictionaries are trained from sample
+    payloads and registered with an identifier. The dictionary identifier
+    is written into each zstd frame header so the receiving side can select
+    the matching dictionary automatically.
+    """
+
+    if have_zstd:
+
+        class DictionaryRegistry:
+            def __init__(self) -> None:
+                self.id2dict = {}  # type: Dict[int, zstandard.ZstdCompressionDict]
+                self._id = 0
+
+            def register_dictionary(self, obj, dict_id: int = None) -> int:
+                """
+                :param obj: A dictionary to register. This may be a
+                  zstandard.ZstdCompressionDict or the bytes of a dictionary.
+
+                :param dict_id: An optional dictionary identifier to use for
+                  the dictionary. If not specified then the identifier embedded
+                  in the dictionary is used. If the dictionary has no embedded
+                  identifier (e.g. raw content dictionaries) then a number will
+                  be automatically assigned.
+                """
+                if isinstance(obj, zstandard.ZstdCompressionDict):
+                    dictionary = obj
+                else:
+                    dictionary = zstandard.ZstdCompressionDict(obj)
+
+                if dict_id is None:
+                    dict_id = dictionary.dict_id()
+                    if not dict_id:
+                        self._id += 1
+                        dict_id = self._id
+
+                self.id2dict[dict_id] = dictionary
+                return dict_id
+
+            def train_dictionary(
+                self, samples, dict_size: int = 16384, dict_id: int = None
+            ) -> int:
+                """ Train a dictionary from sample payloads and register it.
+
+                :param samples: A list of bytes objects that are representative
+                  of the payloads that will be compressed.
+
+                :param dict_size: The target size of the dictionary in bytes.
+
+                :param dict_id: An optional dictionary identifier to embed in
+                  the dictionary. If not specified then a number will be
+                  automatically assigned.
+                """
+                if dict_id is None:
+                    self._id += 1
+                    dict_id = self._id
+
+                dictionary = zstandard.train_dictionary(
+                    dict_size, list(samples), dict_id=dict_id
+                )
+                return self.register_dictionary(dictionary, dict_id=dict_id)
+
+            def get_dictionary_by_id(self, dict_id: int):
+                try:
+                    return self.id2dict[dict_id]
+                except KeyError:
+                    raise Exception(f"Unknown zstd dictionary '{dict_id}'") from None
+
+        class ZstdCompressor(ICompressor):
+            default_options = {"level": 3}
+            presets = {
+                PRESET_FAST: {"level": 1},
+                PRESET_BALANCED: {"level": 3},
+                PRESET_MAX: {"level": 19},
+            }
+
+            def __init__(self, dictionary_registry=None, **kwargs):
+                """
+                :param dictionary_registry: A registry populated with the
+                  dictionaries that will be used.
+                """
+                super().__init__(**kwargs)
+                self.registry = (
+                    dictionary_registry if dictionary_registry else DictionaryRegistry()
+                )
+
+            def compress(
+                self,
+                data,
+                *,
+                preset: str = None,
+                level: int = None,
+                dict_id: int = None,
+                **kwargs,
+            ):  # pylint: disable=arguments-differ
+                """ Compress data using a zstd compressor.
+
+                :param dict_id: An optional integer identifying a registered
+                  dictionary to compress the data with.
+
+                :return: data as a bytes object.
+                """
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
+
+                dict_data = (
+                    self.registry.get_dictionary_by_id(dict_id) if dict_id else None
+                )
+                options = self.get_options(preset, level=level)
+                compressor = zstandard.ZstdCompressor(
+                    level=options["level"], dict_data=dict_data
+                )
+                return compressor.compress(data)
+
+            def decompress(
+                self, data, *, dict_id: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Decompress data using a zstd decompressor.
+
+                :param dict_id: An optional integer identifying a registered
+                  dictionary to decompress the data with. If not specified
+                  then the dictionary identifier in the zstd frame header is
+                  used.
+
+                :return: data as a bytes object.
+                """
+                params = zstandard.get_frame_parameters(data)
+                if not dict_id:
+                    dict_id = params.dict_id
+                dict_data = (
+                    self.registry.get_dictionary_by_id(dict_id) if dict_id else None
+                )
+                decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+                if params.content_size == zstandard.CONTENTSIZE_UNKNOWN:
+                    # Frames produced by a streaming compressor do not record
+                    # the content size.
+                    return decompressor.decompressobj().decompress(data)
+                return decompressor.decompress(data)
+
+            def compressobj(
+                self,
+                *,
+                preset: str = None,
+                level: int = None,
+                dict_id: int = None,
+                **kwargs,
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental zstd compressor.
+
+                :param dict_id: An optional integer identifying a registered
+                  dictionary to compress the data with.
+                """
+                dict_data = (
+                    self.registry.get_dictionary_by_id(dict_id) if dict_id else None
+                )
+                options = self.get_options(preset, level=level)
+                compressor = zstandard.ZstdCompressor(
+                    level=options["level"], dict_data=dict_data
+                ).compressobj()
+                return ObjectStreamCompressor(compressor.compress, compressor.flush)
+
+            def decompressobj(
+                self, max_length: int = None, *, dict_id: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental zstd decompressor.
+
+                :param dict_id: An optional integer identifying a registered
+                  dictionary to decompress the data with. If not specified
+                  then the dictionary identifier in the zstd frame header is
+                  used.
+                """
+                return ZstdStreamDecompressor(
+                    self.registry, dict_id=dict_id, max_length=max_length
+                )
+
+        class ZstdStreamDecompressor(StreamDecompressor):
+            """ Incrementally decompress a zstd frame.
+
+            Input is buffered until the frame header is available. The header
+            identifies the dictionary to use and, when present, the content
+            size which allows oversized frames to be rejected before any
+            decompression takes place.
+
+            The zstd decompressor object has no output size limit so, when a
+            maximum length is set, input is passed to it in slices. A zstd
+            block needs at least four compressed bytes and produces at most
+            128 KiB, so each slice is sized to produce no more than the
+            remaining allowance plus one block.
+            """
+
+            # The maximum size of a zstd frame header
+            header_size_max = 18
+
+            # The maximum decompressed size of a zstd block and the minimum
+            # number of compressed bytes that can produce it.
+            block_size_max = 128 * 1024
+            block_input_min = 4
+
+            def __init__(
+                self, dictionary_registry, dict_id: int = None, max_length: int = None
+            ) -> None:
+                super().__init__(max_length=max_length)
+                self.registry = dictionary_registry
+                self.dict_id = dict_id
+                self._header = bytearray()  # type: Optional[bytearray]
+                self._obj = None  # type: Any
+
+            def feed(self, data) -> bytes:
+                if self._header is not None:
+                    self._header.extend(data)
+                    if not self._start(self._header):
+                        # Wait for more of the frame header
+                        return b""
+                    data, self._header = bytes(self._header), None
+
+                if self.max_length is None:
+                    return self._account(self._obj.decompress(data))
+
+                view = memoryview(data)
+                chunks = []
+                start = 0
+                while start < len(view):
+                    blocks = max(1, (self._limit(0) - 1) // self.block_size_max)
+                    end = start + blocks * self.block_input_min
+                    chunks.append(self._account(self._obj.decompress(view[start:end])))
+                    start = end
+                return b"".join(chunks)
+
+            def flush(self) -> bytes:
+                if self._header is not None:
+                    raise Exception("Compressed data ended before the frame header")
+                if not self._obj.eof:
+                    raise Exception(
+                        "Compressed data ended before the end-of-stream marker"
+                    )
+                return b""
+
+            def _start(self, header: bytearray) -> bool:
+                """ Create the decompressor once the frame header is available.
+
+                :returns: False if more of the frame header is needed.
+                """
+                try:
+                    params = zstandard.get_frame_parameters(bytes(header))
+                except zstandard.ZstdError:
+                    if len(header) < self.header_size_max:
+                        return False
+                    raise
+
+                if (
+                    self.max_length is not None
+                    and params.content_size != zstandard.CONTENTSIZE_UNKNOWN
+                ):
+                    self._reserve(params.content_size)
+
+                dict_id = self.dict_id or params.dict_id
+                dict_data = (
+                    self.registry.get_dictionary_by_id(dict_id) if dict_id else None
+                )
+                self._obj = zstandard.ZstdDecompressor(
+                    dict_data=dict_data
+                ).decompressobj()
+                return True
+
+        compressor = ZstdCompressor(dictionary_registry=dictionary_registry)
+        reg.register("zstd", compressor, COMPRESSION_ZSTD)
+
+
+def register_lz4(reg: CompressorRegistry):
+    """ Register a compressor/decompressor for lz4 compression. """
+
+    if have_lz4:
+
+        class Lz4Compressor(ICompressor):
+            default_options = {"level": lz4.frame.COMPRESSIONLEVEL_MIN}
+            presets = {
+                PRESET_FAST: {"level": lz4.frame.COMPRESSIONLEVEL_MIN},
+                PRESET_BALANCED: {"level": lz4.frame.COMPRESSIONLEVEL_MINHC},
+                PRESET_MAX: {"level": lz4.frame.COMPRESSIONLEVEL_MAX},
+            }
+
+            def compress(
+                self, data, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Compress data using a lz4 frame compressor.
+
+                :return: data as a bytes object.
+                """
+                if not _is_buffer(data):
+                    raise Exception(
+                        f"Can only compress bytes-like objects, got {type(data)}"
+                    )
+
+                options = self.get_options(preset, level=level)
+                return lz4.frame.compress(data, compression_level=options["level"])
+
+            def decompress(self, data, **kwargs):
+                """ Decompress data using a lz4 frame decompressor.
+
+                :return: data as a bytes object.
+                """
+                return lz4.frame.decompress(data)
+
+            def compressobj(
+                self, preset: str = None, level: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Create an incremental lz4 frame compressor. """
+                options = self.get_options(preset, level=level)
+                compressor = lz4.frame.LZ4FrameCompressor(
+                    compression_level=options["level"]
+                )
+                return ObjectStreamCompressor(
+                    compressor.compress, compressor.flush, header=compressor.begin()
+                )
+
+            def decompressobj(self, max_length: int = None, **kwargs):
+                """ Create an incremental lz4 frame decompressor. """
+                return MaxLengthStreamDecompressor(
+                    lz4.frame.LZ4FrameDecompressor(), max_length=max_length
+                )
+
+        compressor = Lz4Compressor()
+        reg.register("lz4", compressor, COMPRESSION_LZ4)
+
+
 def initialize(reg: CompressorRegistry):
     """ Register compression methods and set a default """
     register_none(reg)
@@ -478,6 +2140,8 @@ def initialize(reg: CompressorRegistry):
     register_lzma(reg)
     register_brotli(reg)
     register_snappy(reg)
+    register_zstd(reg)
+    register_lz4(reg)
 
     reg.set_default(None)
 
@@ -488,4 +2152,20 @@ compress = registry.compress
 
 decompress = registry.decompress
 
+compressobj = registry.compressobj
+
+decompressobj = registry.decompressobj
+
+compress_stream = registry.compress_stream
+
+decompress_stream = registry.decompress_stream
+
+compress_blocks = registry.compress_blocks
+
+decompress_blocks = registry.decompress_blocks
+
+compress_blocks_async = registry.compress_blocks_async
+
+decompress_blocks_async = registry.decompress_blocks_async
+
 initialize(registry)
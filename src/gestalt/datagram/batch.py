@@ -0,0 +1,677 @@
+"""
+Batched datagram socket I/O.
+
+The asyncio datagram transport reads one datagram per readiness callback and
+makes one system call for every datagram sent. At high packet rates this
+per-packet overhead dominates. The batched transport in this module reads
+every datagram that is waiting on the socket when it becomes readable and
+passes them to the protocol together. Sending several datagrams at once
+writes them using a single system call where possible.
+
+On Linux the ``recvmmsg`` and ``sendmmsg`` system calls, which the socket
+module does not expose, are called through ctypes. Elsewhere the socket is
+read and written using a loop of non-blocking ``recvfrom`` and ``sendto``
+calls, which still avoids a trip through the event loop for each datagram.
+"""
+
+import asyncio
+import collections
+import ctypes
+import ctypes.util
+import logging
+import os
+import socket
+import struct
+import sys
+
+from gestalt.datagram.protocols.base import BaseDatagramProtocol
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+# The largest datagram payload that can be received
+MAX_DATAGRAM_SIZE = 65535
+
+# The number of datagrams read from, or written to, a socket in a single
+# system call.
+DEFAULT_BATCH_SIZE = 64
+
+# Limits passed to sendmmsg and recvmmsg in a single call (UIO_MAXIOV)
+MAX_BATCH_SIZE = 1024
+
+SOCKADDR_STORAGE_SIZE = 128
+MSG_TRUNC = 0x20
+
+# Limit on the number of cached socket addresses
+MAX_CACHED_ADDRESSES = 1024
+
+# A received datagram's data, which is a memoryview in zero copy mode, and
+# source address
+Datagram = Tuple[Union[bytes, memoryview], Any]
+
+# The buffer types that can be sent as a datagram
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _send_iovec(ctypes.Structure):
+    # A c_char_p base lets bytes objects be assigned directly. The structure
+    # then points at, and holds a reference to, the bytes without copying it.
+    _fields_ = [("iov_base", ctypes.c_char_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.c_void_p),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr), ("msg_len", ctypes.c_uint)]
+
+
+have_mmsg = False
+if sys.platform.startswith("linux"):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _recvmmsg = _libc.recvmmsg
+        _recvmmsg.argtypes = [
+            ctypes.c_int,
+            ctypes.POINTER(_mmsghdr),
+            ctypes.c_uint,
+            ctypes.c_int,
+            ctypes.c_void_p,
+        ]
+        _recvmmsg.restype = ctypes.c_int
+        _sendmmsg = _libc.sendmmsg
+        _sendmmsg.argtypes = [
+            ctypes.c_int,
+            ctypes.POINTER(_mmsghdr),
+            ctypes.c_uint,
+            ctypes.c_int,
+        ]
+        _sendmmsg.restype = ctypes.c_int
+        have_mmsg = True
+    except (AttributeError, OSError):
+        pass  # noqa
+
+
+def pack_sockaddr(family: int, addr: Tuple) -> Optional[bytes]:
+    """ Return the C sockaddr structure for a numeric IPv4 or IPv6 address.
+
+    :param family: The address family, socket.AF_INET or socket.AF_INET6.
+
+    :param addr: A (host, port) tuple, or a (host, port, flowinfo, scope_id)
+      tuple for IPv6.
+
+    :returns: The packed structure or None if the host is not a numeric
+      address of the family.
+    """
+    try:
+        if family == socket.AF_INET:
+            return (
+                struct.pack("=H", family)
+                + struct.pack("!H", addr[1])
+                + socket.inet_pton(family, addr[0])
+                + bytes(8)
+            )
+        if family == socket.AF_INET6:
+            flowinfo = addr[2] if len(addr) > 2 else 0
+            scope_id = addr[3] if len(addr) > 3 else 0
+            return (
+                struct.pack("=H", family)
+                + struct.pack("!HI", addr[1], flowinfo)
+                + socket.inet_pton(family, addr[0])
+                + struct.pack("=I", scope_id)
+            )
+    except (OSError, struct.error, TypeError):
+        pass  # noqa
+    return None
+
+
+def unpack_sockaddr(raw: bytes) -> Any:
+    """ Return the address tuple, in the form the socket module uses, for a
+    C sockaddr structure.
+
+    :param raw: A sockaddr_in or sockaddr_in6 structure.
+    """
+    (family,) = struct.unpack_from("=H", raw)
+    if family == socket.AF_INET:
+        (port,) = struct.unpack_from("!H", raw, 2)
+        return (socket.inet_ntop(family, raw[4:8]), port)
+    if family == socket.AF_INET6:
+        port, flowinfo = struct.unpack_from("!HI", raw, 2)
+        (scope_id,) = struct.unpack_from("=I", raw, 24)
+        return (socket.inet_ntop(family, raw[8:24]), port, flowinfo, scope_id)
+    return None
+
+
+class BatchSocket:
+    """ Reads and writes batches of datagrams on a non-blocking socket """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_datagram_size: int = MAX_DATAGRAM_SIZE,
+        zero_copy: bool = False,
+    ) -> None:
+        """
+        :param sock: A non-blocking datagram socket.
+
+        :param batch_size: The maximum number of datagrams read in a batch.
+
+        :param max_datagram_size: The largest datagram that can be received.
+          Larger datagrams are truncated by the kernel and are discarded.
+
+        :param zero_copy: When set to True datagrams are received into a pool
+          of reusable buffers and returned as memoryviews of those buffers,
+          instead of being copied into new bytes objects. Each batch must be
+          passed to :meth:`recycle` once it has been processed.
+        """
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise Exception(f"Invalid batch size {batch_size}")
+
+        self.sock = sock
+        self.batch_size = batch_size
+        self.max_datagram_size = max_datagram_size
+        self.zero_copy = zero_copy
+        self.connected = self._is_connected(sock)
+        self.buffers_replaced = 0
+        self._fd = sock.fileno()
+        self._mmsg = have_mmsg
+        self._addresses = {}  # type: Dict[bytes, Any]
+        self._sockaddrs = {}  # type: Dict[Any, Optional[ctypes.Array]]
+
+        # The pool of receive buffers, one for each datagram in a batch. The
+        # slot of each datagram in the current batch is kept for recycling.
+        self._buffers = []  # type: List[bytearray]
+        self._views = []  # type: List[memoryview]
+        self._slots = []  # type: List[int]
+        if self._mmsg:
+            self._init_mmsg()
+        if self._mmsg or zero_copy:
+            for slot in range(batch_size):
+                self._buffers.append(bytearray(max_datagram_size))
+                self._set_buffer(slot)
+            if not zero_copy:
+                self._views = [memoryview(b) for b in self._buffers]
+
+    @staticmethod
+    def _is_connected(sock: socket.socket) -> bool:
+        try:
+            sock.getpeername()
+        except OSError:
+            return False
+        return True
+
+    def _init_mmsg(self) -> None:
+        """ Allocate the message headers once, so that each system call only
+        needs to reset the fields the kernel changed.
+        """
+        n = self.batch_size
+        self._recv_names = (ctypes.c_char * SOCKADDR_STORAGE_SIZE * n)()
+        self._recv_iov = (_iovec * n)()
+        self._recv_msgs = (_mmsghdr * n)()
+        for i in range(n):
+            self._recv_iov[i].iov_len = self.max_datagram_size
+            hdr = self._recv_msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._recv_names[i])
+            hdr.msg_namelen = SOCKADDR_STORAGE_SIZE
+            hdr.msg_iov = ctypes.addressof(self._recv_iov[i])
+            hdr.msg_iovlen = 1
+        self._recv_used = 0
+
+        self._send_iov = (_send_iovec * n)()
+        self._send_msgs = (_mmsghdr * n)()
+        for i in range(n):
+            hdr = self._send_msgs[i].msg_hdr
+            hdr.msg_iov = ctypes.addressof(self._send_iov[i])
+            hdr.msg_iovlen = 1
+
+    def _set_buffer(self, slot: int) -> None:
+        """ Point a recvmmsg message header at a slot's receive buffer.
+
+        Pool buffers are never resized, so their address stays valid without
+        holding an export of the buffer.
+        """
+        if self._mmsg:
+            array = (ctypes.c_char * self.max_datagram_size).from_buffer(
+                self._buffers[slot]
+            )
+            self._recv_iov[slot].iov_base = ctypes.addressof(array)
+
+    def recv(self) -> List[Datagram]:
+        """ Read the datagrams waiting on the socket, up to the batch size.
+
+        :returns: A list of (data, addr) tuples. In zero copy mode data is a
+          memoryview of a pool buffer that may be reused once the batch has
+          been passed to :meth:`recycle`.
+
+        :raises BlockingIOError: if no datagrams are waiting.
+        """
+        if self._mmsg:
+            return self._recv_mmsg()
+        if self.zero_copy:
+            return self._recv_into()
+
+        datagrams = []  # type: List[Datagram]
+        recvfrom = self.sock.recvfrom
+        size = self.max_datagram_size
+        for _ in range(self.batch_size):
+            try:
+                datagrams.append(recvfrom(size))
+            except OSError:
+                if datagrams:
+                    break
+                raise
+        return datagrams
+
+    def _recv_into(self) -> List[Datagram]:
+        datagrams = []  # type: List[Datagram]
+        slots = self._slots = []
+        buffers = self._buffers
+        can_recvmsg = hasattr(self.sock, "recvmsg_into")
+        for slot in range(self.batch_size):
+            try:
+                if can_recvmsg:
+                    nbytes, _, flags, addr = self.sock.recvmsg_into([buffers[slot]])
+                else:
+                    nbytes, addr = self.sock.recvfrom_into(buffers[slot])
+                    flags = 0
+            except OSError:
+                if datagrams:
+                    break
+                raise
+            if flags & MSG_TRUNC:
+                logger.warning(
+                    f"Discarding datagram larger than {self.max_datagram_size} bytes"
+                )
+                continue
+            datagrams.append((memoryview(buffers[slot])[:nbytes], addr))
+            slots.append(slot)
+        return datagrams
+
+    def _recv_mmsg(self) -> List[Datagram]:
+        msgs = self._recv_msgs
+        for i in range(self._recv_used):
+            msgs[i].msg_hdr.msg_namelen = SOCKADDR_STORAGE_SIZE
+
+        count = _recvmmsg(self._fd, msgs, self.batch_size, socket.MSG_DONTWAIT, None)
+        if count < 0:
+            self._recv_used = 0
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._recv_used = count
+
+        datagrams = []  # type: List[Datagram]
+        slots = self._slots = []
+        buffers = self._buffers
+        views = self._views
+        names = self._recv_names
+        addresses = self._addresses
+        zero_copy = self.zero_copy
+        for i in range(count):
+            msg = msgs[i]
+            hdr = msg.msg_hdr
+            if hdr.msg_flags & MSG_TRUNC:
+                logger.warning(
+                    f"Discarding datagram larger than {self.max_datagram_size} bytes"
+                )
+                continue
+            raw = names[i].raw[: hdr.msg_namelen]
+            addr = addresses.get(raw)
+            if addr is None:
+                if len(addresses) >= MAX_CACHED_ADDRESSES:
+                    addresses.clear()
+                addr = addresses[raw] = unpack_sockaddr(raw)
+            if zero_copy:
+                datagrams.append((memoryview(buffers[i])[: msg.msg_len], addr))
+                slots.append(i)
+            else:
+                datagrams.append((bytes(views[i][: msg.msg_len]), addr))
+        return datagrams
+
+    def recycle(self, datagrams: List[Datagram]) -> None:
+        """ Return the buffers of a processed batch to the pool.
+
+        A buffer is only reused if nothing refers to it any more. A buffer
+        that is still referenced, by a kept view or by an object decoded from
+        it without copying, is left to its owners and replaced in the pool.
+
+        :param datagrams: The list returned by the most recent :meth:`recv`.
+          It is cleared.
+        """
+        datagrams.clear()
+        buffers = self._buffers
+        for slot in self._slots:
+            # Only the pool list and the getrefcount argument refer to a
+            # buffer that is free. Each view holds a reference through its
+            # managed buffer until it is released or deleted.
+            if sys.getrefcount(buffers[slot]) > 2:
+                buffers[slot] = bytearray(self.max_datagram_size)
+                self._set_buffer(slot)
+                self.buffers_replaced += 1
+        self._slots = []
+
+    def send(self, datagrams: Sequence[BytesLike], addr: Any = None) -> int:
+        """ Write datagrams to the socket.
+
+        :param datagrams: A sequence of bytes-like objects to send.
+
+        :param addr: The destination address. It must be None when the
+          socket is connected.
+
+        :returns: The number of datagrams written. Fewer than supplied are
+          written if the socket buffer fills.
+
+        :raises BlockingIOError: if no datagrams could be written.
+        """
+        sockaddr = self._sockaddr(addr) if self._mmsg and addr is not None else None
+        if self._mmsg and (addr is None or sockaddr is not None):
+            return self._send_mmsg(datagrams, sockaddr)
+
+        sent = 0
+        for data in datagrams:
+            try:
+                if addr is None:
+                    self.sock.send(data)
+                else:
+                    self.sock.sendto(data, addr)
+            except OSError:
+                if sent:
+                    break
+                raise
+            sent += 1
+        return sent
+
+    def _sockaddr(self, addr: Any) -> Optional[ctypes.Array]:
+        try:
+            return self._sockaddrs[addr]
+        except KeyError:
+            pass
+        raw = pack_sockaddr(self.sock.family, addr)
+        sockaddr = ctypes.create_string_buffer(raw, len(raw)) if raw else None
+        if len(self._sockaddrs) >= MAX_CACHED_ADDRESSES:
+            self._sockaddrs.clear()
+        self._sockaddrs[addr] = sockaddr
+        return sockaddr
+
+    def _send_mmsg(
+        self, datagrams: Sequence[BytesLike], sockaddr: Optional[ctypes.Array]
+    ) -> int:
+        msgs = self._send_msgs
+        iov = self._send_iov
+        if sockaddr is None:
+            name, namelen = None, 0
+        else:
+            name, namelen = ctypes.addressof(sockaddr), len(sockaddr)
+
+        sent = 0
+        total = len(datagrams)
+        while sent < total:
+            chunk = datagrams[sent : sent + self.batch_size]
+            for i, data in enumerate(chunk):
+                iov[i].iov_base = data if type(data) is bytes else bytes(data)
+                iov[i].iov_len = len(data)
+                hdr = msgs[i].msg_hdr
+                hdr.msg_name = name
+                hdr.msg_namelen = namelen
+
+            count = _sendmmsg(self._fd, msgs, len(chunk), 0)
+
+            # Release the references to the sent data
+            for i in range(len(chunk)):
+                iov[i].iov_base = None
+
+            if count < 0:
+                err = ctypes.get_errno()
+                if sent:
+                    break
+                raise OSError(err, os.strerror(err))
+            sent += count
+            if count < len(chunk):
+                break
+        return sent
+
+
+class BatchDatagramTransport(asyncio.DatagramTransport):
+    """
+    A datagram transport that reads and writes datagrams in batches.
+
+    Each time the socket becomes readable every waiting datagram, up to the
+    batch size, is read and passed to the protocol's ``datagrams_received``
+    method as a list of (data, addr) tuples. ``sendto_many`` writes several
+    datagrams using as few system calls as possible.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        sock: socket.socket,
+        protocol: BaseDatagramProtocol,
+        waiter: asyncio.Future = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_datagram_size: int = MAX_DATAGRAM_SIZE,
+        high_water: int = 64 * 1024,
+        zero_copy: bool = False,
+    ) -> None:
+        """
+        :param loop: The event loop to use.
+
+        :param sock: A non-blocking datagram socket, already bound or
+          connected.
+
+        :param protocol: The protocol to pass received datagrams to.
+
+        :param waiter: An optional future that is completed once the
+          protocol has been connected to the transport.
+
+        :param batch_size: The maximum number of datagrams read or written in
+          a single system call.
+
+        :param max_datagram_size: The largest datagram that can be received.
+
+        :param high_water: The write buffer size above which the protocol is
+          asked to pause writing. Writing resumes once the buffer has drained
+          below a quarter of this size.
+
+        :param zero_copy: When set to True datagrams are received into a pool
+          of reusable buffers and passed to the protocol as memoryviews. A
+          buffer is reused once ``datagrams_received`` has returned unless it
+          is still referenced.
+        """
+        super().__init__()
+        self._loop = loop
+        self._sock = sock
+        self._sock_fd = sock.fileno()
+        self._protocol = protocol
+        self._batch = BatchSocket(
+            sock, batch_size, max_datagram_size, zero_copy=zero_copy
+        )
+        self._extra = {
+            "socket": sock,
+            "sockname": sock.getsockname(),
+            "peername": sock.getpeername() if self._batch.connected else None,
+        }
+        self._buffer = collections.deque()  # type: collections.deque
+        self._buffer_size = 0
+        self._high_water = high_water
+        self._low_water = high_water // 4
+        self._protocol_paused = False
+        self._closing = False
+        self._connection_lost = False
+
+        self._loop.call_soon(self._connection_made, waiter)
+
+    def _connection_made(self, waiter: Optional[asyncio.Future]) -> None:
+        self._protocol.connection_made(self)
+        if not self._closing:
+            self._loop.add_reader(self._sock_fd, self._read_ready)
+        if waiter is not None and not waiter.cancelled():
+            waiter.set_result(None)
+
+    def get_extra_info(self, name, default=None):
+        return self._extra.get(name, default)
+
+    def get_protocol(self):
+        return self._protocol
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def get_write_buffer_size(self) -> int:
+        return self._buffer_size
+
+    def close(self) -> None:
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._sock_fd)
+        if not self._buffer:
+            self._loop.call_soon(self._call_connection_lost, None)
+
+    def abort(self) -> None:
+        self._force_close(None)
+
+    def _force_close(self, exc: Optional[Exception]) -> None:
+        if self._connection_lost:
+            return
+        if self._buffer:
+            self._buffer.clear()
+            self._buffer_size = 0
+            self._loop.remove_writer(self._sock_fd)
+        if not self._closing:
+            self._closing = True
+            self._loop.remove_reader(self._sock_fd)
+        self._loop.call_soon(self._call_connection_lost, exc)
+
+    def _call_connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._connection_lost:
+            return
+        self._connection_lost = True
+        try:
+            self._protocol.connection_lost(exc)
+        finally:
+            self._sock.close()
+
+    def _fatal_error(self, exc: Exception) -> None:
+        logger.exception(f"Fatal error on batched datagram transport: {exc}")
+        self._force_close(exc)
+
+    def _read_ready(self) -> None:
+        try:
+            datagrams = self._batch.recv()
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            self._protocol.error_received(exc)
+        except Exception as exc:
+            self._fatal_error(exc)
+        else:
+            if datagrams:
+                try:
+                    self._protocol.datagrams_received(datagrams)
+                finally:
+                    if self._batch.zero_copy:
+                        self._batch.recycle(datagrams)
+
+    def sendto(self, data: BytesLike, addr: Any = None) -> None:
+        """ Send a datagram.
+
+        :param data: The datagram to send.
+
+        :param addr: The destination address. Must be None, or the peer
+          address, when the socket is connected.
+        """
+        self.sendto_many((data,), addr=addr)
+
+    def sendto_many(self, datagrams: Sequence[BytesLike], addr: Any = None) -> None:
+        """ Send several datagrams to the same address using as few system
+        calls as possible. Datagrams that can't be written immediately are
+        buffered until the socket is writable.
+
+        :param datagrams: A sequence of bytes-like objects to send.
+
+        :param addr: The destination address. Must be None, or the peer
+          address, when the socket is connected.
+        """
+        if self._closing:
+            return
+
+        peername = self._extra["peername"]
+        if peername is not None:
+            if addr not in (None, peername):
+                raise ValueError(f"Invalid address: must be None or {peername}")
+            addr = None
+
+        if not self._buffer:
+            try:
+                sent = self._batch.send(datagrams, addr)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError as exc:
+                self._protocol.error_received(exc)
+                return
+            except Exception as exc:
+                self._fatal_error(exc)
+                return
+
+            if sent == len(datagrams):
+                return
+            datagrams = datagrams[sent:]
+            self._loop.add_writer(self._sock_fd, self._write_ready)
+
+        for data in datagrams:
+            self._buffer.append((bytes(data), addr))
+            self._buffer_size += len(data)
+        self._maybe_pause_protocol()
+
+    def _write_ready(self) -> None:
+        while self._buffer:
+            data, addr = self._buffer[0]
+            try:
+                self._batch.send((data,), addr)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                self._protocol.error_received(exc)
+            except Exception as exc:
+                self._fatal_error(exc)
+                return
+            self._buffer.popleft()
+            self._buffer_size -= len(data)
+
+        self._maybe_resume_protocol()
+        self._loop.remove_writer(self._sock_fd)
+        if self._closing:
+            self._call_connection_lost(None)
+
+    def _maybe_pause_protocol(self) -> None:
+        if self._buffer_size > self._high_water and not self._protocol_paused:
+            self._protocol_paused = True
+            try:
+                self._protocol.pause_writing()
+            except Exception:
+                logger.exception("Error in protocol pause_writing")
+
+    def _maybe_resume_protocol(self) -> None:
+        if self._buffer_size <= self._low_water and self._protocol_paused:
+            self._protocol_paused = False
+            try:
+                self._protocol.resume_writing()
+            except Exception:
+                logger.exception("Error in protocol resume_writing")
@@ -3,8 +3,9 @@ import logging
 import socket
 
 from gestalt import serialization
+from gestalt.datagram.batch import BatchDatagramTransport, DEFAULT_BATCH_SIZE
 from gestalt.datagram.protocols.base import BaseDatagramProtocol
-from typing import Any, Optional, Sequence, Tuple
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +32,7 @@ class DatagramEndpoint:
         on_peer_available=None,
         on_peer_unavailable=None,
         content_type: str = serialization.CONTENT_TYPE_DATA,
+        lazy_decode: bool = False,
         loop=None,
         **kwargs,
     ):
@@ -62,6 +64,10 @@ class DatagramEndpoint:
           value is :const:`serialization.CONTENT_TYPE_DATA` which is suitable
           for sending bytes data that has already been serialized before being
           passed to the endpoint.
+
+        :param lazy_decode: When set to True the on_message handler is passed
+          a :class:`serialization.LazyMessage` which only decodes the message
+          when its data attribute is accessed. Default value is False.
         """
         self.loop = loop or asyncio.get_event_loop()
         self._on_message_handler = on_message
@@ -70,10 +76,17 @@ class DatagramEndpoint:
         self._on_peer_available_handler = on_peer_available
         self._on_peer_unavailable_handler = on_peer_unavailable
 
-        codec = serialization.registry.get_codec(content_type)
-        self.content_type = codec.content_type
-        self.serialization_name = serialization.registry.type_to_name[content_type]
-        self.content_encoding = codec.content_encoding
+        # Resolve the serializer once so that messages can be encoded and
+        # decoded without registry lookups.
+        self.codec = serialization.registry.bind(content_type)
+        self.content_type = self.codec.content_type
+        self.serialization_name = self.codec.name
+        self.content_encoding = self.codec.content_encoding
+
+        # Codecs for message types that use a different serialization to the
+        # endpoint, resolved once when the message type is registered.
+        self._codecs = {}  # type: Dict[Optional[int], serialization.bound_codec]
+        self.lazy_decode = lazy_decode
 
         if not issubclass(self.protocol_class, BaseDatagramProtocol):
             raise Exception(
@@ -96,22 +109,32 @@ class DatagramEndpoint:
     @property
     def bindings(self) -> Sequence[Tuple[str, int]]:
         """ Return a server endpoint's bound addresses. """
-        if self.running:
-            result = [self._protocol.laddr] if self._protocol else []
-        else:
-            result = []
-        return result
+        addr = self._protocol.laddr if self.running and self._protocol else None
+        return [addr] if addr else []
 
     @property
     def connections(self) -> Sequence[Tuple[str, int]]:
         """ Return a client endpoint's connect addresses """
-        if self.running:
-            result = [self._protocol.raddr] if self._protocol else []
-        else:
-            result = []
-        return result
+        addr = self._protocol.raddr if self.running and self._protocol else None
+        return [addr] if addr else []
+
+    @property
+    def message_handler(self):
+        """ Return the user's message handler """
+        return self._on_message_handler
+
+    @message_handler.setter
+    def message_handler(self, handler) -> None:
+        """ Replace the user's message handler.
 
-    def register_message(self, type_identifier: int, obj: Any):
+        :param handler: A callback function that will be called when a
+          message is received, or None to stop passing messages on.
+        """
+        self._on_message_handler = handler
+
+    def register_message(
+        self, type_identifier: int, obj: Any = None, content_type: str = None
+    ):
         """
         Register a message object with a unique message identifier.
 
@@ -119,9 +142,27 @@ class DatagramEndpoint:
           object.
 
         :param obj: The message object to associate with the identifier.
+
+        :param content_type: An optional string specifying the serialization
+          to use for messages with this identifier, instead of the endpoint's
+          content type. This lets a single endpoint carry messages that use
+          different serializations. It requires a protocol that transfers the
+          message type identifier (e.g. MTI).
         """
-        serializer = serialization.registry.get_serializer(self.serialization_name)
-        serializer.registry.register_message(obj, type_identifier=type_identifier)
+        if content_type:
+            self._codecs[type_identifier] = serialization.registry.bind(content_type)
+
+        if obj is not None:
+            self.codec_for(type_identifier).serializer.registry.register_message(
+                obj, type_identifier=type_identifier
+            )
+
+    def codec_for(self, type_identifier: Optional[int]) -> serialization.bound_codec:
+        """ Return the codec used for messages with a type identifier.
+
+        :param type_identifier: A message type identifier.
+        """
+        return self._codecs.get(type_identifier, self.codec)
 
     async def start(
         self,
@@ -130,6 +171,8 @@ class DatagramEndpoint:
         family: int = socket.AF_INET,
         reuse_port: bool = False,
         allow_broadcast: bool = False,
+        batch_size: int = None,
+        zero_copy: bool = False,
     ) -> None:
         """ Start datagam endpoint.
 
@@ -150,6 +193,23 @@ class DatagramEndpoint:
 
         :param allow_broadcast: tells the kernel to allow this endpoint to
           send messages to the broadcast address.
+
+        :param batch_size: When set the endpoint uses a high throughput
+          transport that reads up to this many waiting datagrams each time the
+          socket becomes readable, and passes them to the protocol as a batch.
+          On Linux each batch is read, and each :meth:`send_many` call is
+          written, using a single recvmmsg or sendmmsg system call. By default
+          the standard asyncio transport is used.
+
+        :param zero_copy: When set to True datagrams are received into a pool
+          of preallocated buffers and message payloads are passed to handlers
+          as memoryviews of those buffers, avoiding a copy and an allocation
+          per message. A buffer is reused once the handler returns unless the
+          payload, or an object decoded from it without copying (e.g. a NumPy
+          array), is still referenced. Kept buffers are replaced with new
+          allocations, so copy payloads that are kept using
+          ``bytes(payload)`` or ``LazyMessage.copy()``. Implies the batched
+          transport, using its default batch size if no batch_size is given.
         """
         if self.running:
             return
@@ -165,22 +225,26 @@ class DatagramEndpoint:
         logger.debug(f"Starting datagram endpoint")
 
         try:
-            _transport, _protocol = await self.loop.create_datagram_endpoint(
-                self._protocol_factory,
-                local_addr=local_addr,
-                remote_addr=remote_addr,
-                family=family,
-                reuse_port=reuse_port,
-                allow_broadcast=allow_broadcast,
-            )
-
-            self._running = True
+            if batch_size or zero_copy:
+                sock = await self._create_socket(
+                    local_addr=local_addr,
+                    remote_addr=remote_addr,
+                    family=family,
+                    reuse_port=reuse_port,
+                    allow_broadcast=allow_broadcast,
+                )
+                await self._create_transport(sock, batch_size, zero_copy)
+            else:
+                _transport, _protocol = await self.loop.create_datagram_endpoint(
+                    self._protocol_factory,
+                    local_addr=local_addr,
+                    remote_addr=remote_addr,
+                    family=family,
+                    reuse_port=reuse_port,
+                    allow_broadcast=allow_broadcast,
+                )
 
-            try:
-                if self._on_started_handler:
-                    self._on_started_handler(self)
-            except Exception:
-                logger.exception("Error in on_started callback method")
+            self._set_started()
 
         except (ConnectionRefusedError, OSError) as exc:
             logger.error(
@@ -192,6 +256,83 @@ class DatagramEndpoint:
                 f"(local_addr={local_addr},remote_addr={remote_addr}): {exc}"
             )
 
+    def _set_started(self) -> None:
+        """ Mark the endpoint as running and notify the on_started handler """
+        self._running = True
+
+        try:
+            if self._on_started_handler:
+                self._on_started_handler(self)
+        except Exception:
+            logger.exception("Error in on_started callback method")
+
+    async def _create_socket(
+        self,
+        local_addr: Optional[Tuple[str, int]],
+        remote_addr: Optional[Tuple[str, int]],
+        family: int,
+        reuse_port: bool,
+        allow_broadcast: bool,
+    ) -> socket.socket:
+        """ Create a non-blocking datagram socket that is bound, or
+        connected, to an address.
+        """
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            if reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            if allow_broadcast:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            if local_addr:
+                infos = await self.loop.getaddrinfo(
+                    *local_addr, family=family, type=socket.SOCK_DGRAM
+                )
+                sock.bind(infos[0][4])
+            if remote_addr:
+                infos = await self.loop.getaddrinfo(
+                    *remote_addr, family=family, type=socket.SOCK_DGRAM
+                )
+                await self.loop.sock_connect(sock, infos[0][4])
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    async def _create_transport(
+        self, sock: socket.socket, batch_size: int = None, zero_copy: bool = False
+    ) -> asyncio.DatagramTransport:
+        """ Connect the endpoint's protocol to a socket.
+
+        :param sock: A non-blocking datagram socket.
+
+        :param batch_size: When set a batched transport is used.
+
+        :param zero_copy: When set to True a batched transport that receives
+          into a buffer pool is used.
+        """
+        if not (batch_size or zero_copy):
+            transport, _protocol = await self.loop.create_datagram_endpoint(
+                self._protocol_factory, sock=sock
+            )
+            return transport
+
+        waiter = self.loop.create_future()
+        transport = BatchDatagramTransport(
+            self.loop,
+            sock,
+            self._protocol_factory(),
+            waiter,
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            zero_copy=zero_copy,
+        )
+        try:
+            await waiter
+        except BaseException:
+            transport.close()
+            raise
+        return transport
+
     async def stop(self):
         """ Stop datagram endpoint """
         if not self.running:
@@ -234,9 +375,27 @@ class DatagramEndpoint:
             logger.error(f"No protocol to send message with!")
             return
 
-        _content_type, _content_encoding, data = serialization.dumps(
-            data, self.serialization_name
-        )
+        codec = self._codecs.get(type_identifier, self.codec)
+        data = codec.encode(data, type_identifier=type_identifier)
+
+        self.send_encoded(data, type_identifier=type_identifier, **kwargs)
+
+    def send_encoded(self, data: bytes, *, type_identifier: int = 0, **kwargs):
+        """ Send a message payload that is already in the endpoint's wire
+        encoding.
+
+        This avoids decoding and re-encoding messages that arrive already
+        serialized, such as when bridging messages from another transport.
+
+        :param data: a bytes object containing the encoded message payload.
+
+        :param type_identifier: An optional parameter specifying the message
+          type identifier. If supplied this integer value will be encoded
+          into the message frame header.
+        """
+        if not self._protocol:
+            logger.error(f"No protocol to send message with!")
+            return
 
         if not isinstance(data, bytes):
             logger.error(f"data must be bytes - can't send message. data={data}")
@@ -244,6 +403,44 @@ class DatagramEndpoint:
 
         self._protocol.send(data, type_identifier=type_identifier, **kwargs)
 
+    def send_many(
+        self,
+        messages: Sequence[Any],
+        *,
+        peer_id: bytes = None,
+        type_identifier: int = 0,
+        **kwargs,
+    ):
+        """ Send several messages, each in its own datagram.
+
+        The messages are framed and written to the transport together. When
+        the endpoint was started with a batch_size this uses as few system
+        calls as possible.
+
+        :param messages: a sequence of message payloads.
+
+        :param peer_id: The unique peer identity to send these messages to.
+
+        :param type_identifier: An optional parameter specifying the message
+          type identifier used for every message. If supplied this integer
+          value will be encoded into each message frame header.
+        """
+        if not self._protocol:
+            logger.error(f"No protocol to send message with!")
+            return
+
+        encode = self._codecs.get(type_identifier, self.codec).encode
+        datagrams = [encode(m, type_identifier=type_identifier) for m in messages]
+
+        self._protocol.send_many(datagrams, type_identifier=type_identifier, **kwargs)
+
+    async def drain(self) -> None:
+        """ Wait until the transport's write buffer has drained below its
+        low water mark.
+        """
+        if self._protocol:
+            await self._protocol.drain()
+
     def _protocol_factory(self):
         """ Return a protocol instance to handle a new peer connection """
         return self.protocol_class(
@@ -328,13 +525,15 @@ class DatagramEndpoint:
         try:
             if self._on_message_handler:
                 type_identifier = kwargs.get("type_identifier")
-                data = serialization.loads(
-                    data,
-                    content_type=self.content_type,
-                    content_encoding=self.content_encoding,
-                    type_identifier=type_identifier,
-                )
-
-                self._on_message_handler(self, data, peer_id=peer_id, **kwargs)
+                codec = self._codecs.get(type_identifier, self.codec)
+                message = data  # type: Any
+                if self.lazy_decode:
+                    message = serialization.LazyMessage(
+                        data, codec.decode, type_identifier, kwargs
+                    )
+                elif data:
+                    message = codec.decode(data, type_identifier=type_identifier)
+
+                self._on_message_handler(self, message, peer_id=peer_id, **kwargs)
         except Exception:
             logger.exception("Error in on_message callback method")
@@ -0,0 +1,211 @@
+"""
+Application level fragmentation of datagram messages.
+
+Messages larger than the path MTU are split into fragments that each fit in
+a single datagram, so they are never fragmented at the IP layer where the
+loss of one fragment silently loses the whole datagram. The receiver
+reassembles the fragments of each message and passes on complete messages.
+
+Partially received messages are discarded when they are not completed
+within a timeout, and the memory used to hold them is capped.
+"""
+
+import collections
+import logging
+import time
+
+from typing import Any, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# The default largest datagram size. It leaves room for IP and UDP headers,
+# and for tunnel or VPN encapsulation, within a 1500 byte Ethernet MTU.
+DEFAULT_MTU = 1400
+
+# Partial messages that are not completed within this many seconds are
+# discarded.
+DEFAULT_REASSEMBLY_TIMEOUT = 5.0
+
+# The default limit on the size of a single reassembled message.
+DEFAULT_MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# The default limit on the memory held by all partial messages.
+DEFAULT_MAX_REASSEMBLY_SIZE = 64 * 1024 * 1024
+
+# The fragment count is carried in a uint16 header field
+MAX_FRAGMENTS = 0xFFFF
+
+# The approximate number of bytes, beyond its payload, used to hold each
+# fragment of a partial message. It is counted against the reassembly memory
+# limit so that many small fragments can't exceed it.
+FRAGMENT_OVERHEAD = 128
+
+
+class _PartialMessage:
+    """ The fragments of a message received so far """
+
+    __slots__ = ("created", "count", "fragments", "size")
+
+    def __init__(self, count: int, created: float) -> None:
+        self.created = created
+        self.count = count
+        # Fragments by index. Only received fragments take up memory.
+        self.fragments = {}  # type: Dict[int, bytes]
+        self.size = 0
+
+    @property
+    def memory(self) -> int:
+        """ Return the number of bytes used to hold the fragments """
+        return self.size + len(self.fragments) * FRAGMENT_OVERHEAD
+
+
+class Reassembler:
+    """ Reassembles messages from their fragments.
+
+    Fragments are identified by their sender's address, a message identifier
+    chosen by the sender and the fragment's index in the message. They can
+    arrive in any order. Duplicate fragments are ignored.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_REASSEMBLY_TIMEOUT,
+        max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+        max_size: int = DEFAULT_MAX_REASSEMBLY_SIZE,
+        fragment_size: int = None,
+    ) -> None:
+        """
+        :param timeout: The number of seconds within which all fragments of
+          a message must arrive. Partial messages are discarded after this.
+
+        :param max_message_size: The size, in bytes, above which a message is
+          discarded instead of being reassembled.
+
+        :param max_size: The limit on the number of bytes held by all partial
+          messages, including a per fragment overhead. The oldest partial
+          messages are discarded to stay within it.
+
+        :param fragment_size: The optional size, in bytes, of the fragments
+          senders split messages into. When set, messages with more
+          fragments than a message of max_message_size needs are discarded.
+        """
+        self.timeout = timeout
+        self.max_message_size = max_message_size
+        self.max_size = max_size
+        self.max_fragments = MAX_FRAGMENTS
+        if fragment_size:
+            self.max_fragments = min(
+                MAX_FRAGMENTS, max(1, -(-max_message_size // fragment_size))
+            )
+        self.size = 0
+        self.fragments_received = 0
+        self.messages_reassembled = 0
+        self.messages_expired = 0
+        self.messages_dropped = 0
+        # Partial messages in order of arrival, so the oldest come first
+        self._partial = collections.OrderedDict()  # type: collections.OrderedDict
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """ Return the reassembly statistics """
+        return {
+            "fragments_received": self.fragments_received,
+            "messages_reassembled": self.messages_reassembled,
+            "messages_expired": self.messages_expired,
+            "messages_dropped": self.messages_dropped,
+            "partial_messages": len(self._partial),
+            "partial_bytes": self.size,
+        }
+
+    def add(
+        self, addr: Any, message_id: int, index: int, count: int, data: bytes
+    ) -> Optional[bytes]:
+        """ Add a received fragment.
+
+        :param addr: The address of the sender.
+
+        :param message_id: The sender's identifier for the message.
+
+        :param index: The index of the fragment within the message.
+
+        :param count: The number of fragments in the message.
+
+        :param data: The fragment payload.
+
+        :returns: The reassembled message if this fragment completed it,
+          otherwise None.
+        """
+        self.fragments_received += 1
+        now = time.monotonic()
+        self._expire(now)
+
+        key = (addr, message_id)
+        partial = self._partial.get(key)
+        if partial is None:
+            if count > self.max_fragments or (
+                count * len(data) > self.max_message_size and index < count - 1
+            ):
+                self.messages_dropped += 1
+                logger.warning(
+                    f"Discarding message {message_id} from {addr} larger than "
+                    f"{self.max_message_size} bytes"
+                )
+                return None
+            partial = self._partial[key] = _PartialMessage(count, now)
+        elif partial.count != count:
+            logger.error(
+                f"Discarding fragment of message {message_id} from {addr} with "
+                f"an inconsistent fragment count"
+            )
+            return None
+
+        if index in partial.fragments:
+            # Duplicate fragment
+            return None
+
+        partial.fragments[index] = data if isinstance(data, bytes) else bytes(data)
+        partial.size += len(data)
+        self.size += len(data) + FRAGMENT_OVERHEAD
+
+        if partial.size > self.max_message_size:
+            self._discard(key)
+            self.messages_dropped += 1
+            logger.warning(
+                f"Discarding message {message_id} from {addr} larger than "
+                f"{self.max_message_size} bytes"
+            )
+            return None
+
+        if len(partial.fragments) == count:
+            del self._partial[key]
+            self.size -= partial.memory
+            self.messages_reassembled += 1
+            fragments = partial.fragments
+            return b"".join([fragments[i] for i in range(count)])
+
+        # Make room by discarding the oldest partial messages
+        while self.size > self.max_size and self._partial:
+            self._discard(next(iter(self._partial)))
+            self.messages_dropped += 1
+        return None
+
+    def _discard(self, key: Tuple[Any, int]) -> None:
+        partial = self._partial.pop(key)
+        self.size -= partial.memory
+
+    def _expire(self, now: float) -> None:
+        """ Discard partial messages that have not completed in time """
+        deadline = now - self.timeout
+        while self._partial:
+            key, partial = next(iter(self._partial.items()))
+            if partial.created > deadline:
+                break
+            self._discard(key)
+            self.messages_expired += 1
+            logger.debug(f"Discarding expired partial message {key[1]} from {key[0]}")
+
+    def clear(self) -> None:
+        """ Discard all partial messages """
+        self._partial.clear()
+        self.size = 0
@@ -1,7 +1,178 @@
 from gestalt.datagram.endpoint import DatagramEndpoint
-from gestalt.datagram.protocols.mti import MtiDatagramProtocol
+from gestalt.datagram.fragment import (
+    DEFAULT_MAX_MESSAGE_SIZE,
+    DEFAULT_MAX_REASSEMBLY_SIZE,
+    DEFAULT_MTU,
+    DEFAULT_REASSEMBLY_TIMEOUT,
+)
+from gestalt.datagram.multicast import MulticastReceiver, MulticastSender
+from gestalt.datagram.protocols.mti import (
+    MtiDatagramProtocol,
+    MtiFragmentDatagramProtocol,
+    MtiReliableDatagramProtocol,
+)
+from gestalt.datagram.reliable import (
+    DEFAULT_ACK_DELAY,
+    DEFAULT_DELIVERY_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_RTO,
+    DEFAULT_MIN_RTO,
+    DEFAULT_WINDOW,
+)
+from gestalt.routing import RoutingMixin
+from typing import Any, Dict
 
 
-class MtiDatagramEndpoint(DatagramEndpoint):
+class MtiDatagramEndpoint(RoutingMixin, DatagramEndpoint):
 
     protocol_class = MtiDatagramProtocol
+
+
+class MtiMulticastSender(MulticastSender):
+
+    protocol_class = MtiDatagramProtocol
+
+
+class MtiMulticastReceiver(RoutingMixin, MulticastReceiver):
+
+    protocol_class = MtiDatagramProtocol
+
+
+class MtiFragmentDatagramEndpoint(RoutingMixin, DatagramEndpoint):
+    """
+    An MTI datagram endpoint that splits messages larger than the MTU into
+    fragments and reassembles them on receipt. Both endpoints must use this
+    class.
+    """
+
+    protocol_class = MtiFragmentDatagramProtocol
+
+    def __init__(
+        self,
+        *args,
+        mtu: int = DEFAULT_MTU,
+        reassembly_timeout: float = DEFAULT_REASSEMBLY_TIMEOUT,
+        max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+        max_reassembly_size: int = DEFAULT_MAX_REASSEMBLY_SIZE,
+        **kwargs,
+    ) -> None:
+        """
+        :param mtu: The largest datagram, in bytes and including the frame
+          header, to send. Larger messages are split into fragments. Peers
+          should use the same MTU because received messages with more
+          fragments than a message of max_message_size needs at this MTU
+          are discarded.
+
+        :param reassembly_timeout: The number of seconds within which all
+          fragments of a message must arrive.
+
+        :param max_message_size: The largest message, in bytes, that is
+          reassembled.
+
+        :param max_reassembly_size: The limit on the number of bytes held by
+          partially received messages.
+        """
+        super().__init__(*args, **kwargs)
+        self.mtu = mtu
+        self.reassembly_timeout = reassembly_timeout
+        self.max_message_size = max_message_size
+        self.max_reassembly_size = max_reassembly_size
+
+    @property
+    def reassembly_stats(self) -> Dict[str, int]:
+        """ Return the reassembly statistics of the running endpoint """
+        protocol = self._protocol
+        if not isinstance(protocol, MtiFragmentDatagramProtocol):
+            return {}
+        return protocol.reassembler.stats
+
+    def _protocol_factory(self):
+        """ Return a protocol instance to handle a new peer connection """
+        return self.protocol_class(
+            on_message=self.on_message,
+            on_peer_available=self.on_peer_available,
+            on_peer_unavailable=self.on_peer_unavailable,
+            mtu=self.mtu,
+            reassembly_timeout=self.reassembly_timeout,
+            max_message_size=self.max_message_size,
+            max_reassembly_size=self.max_reassembly_size,
+        )
+
+
+class MtiReliableDatagramEndpoint(RoutingMixin, DatagramEndpoint):
+    """
+    An MTI datagram endpoint that detects lost messages and retransmits
+    them. Messages of each message type are delivered in order, or as soon
+    as they arrive when ``ordered`` is False. Both endpoints must use this
+    class.
+    """
+
+    protocol_class = MtiReliableDatagramProtocol
+
+    def __init__(
+        self,
+        *args,
+        ordered: bool = True,
+        window: int = DEFAULT_WINDOW,
+        ack_delay: float = DEFAULT_ACK_DELAY,
+        min_rto: float = DEFAULT_MIN_RTO,
+        max_rto: float = DEFAULT_MAX_RTO,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        delivery_timeout: float = DEFAULT_DELIVERY_TIMEOUT,
+        **kwargs,
+    ) -> None:
+        """
+        :param ordered: Whether the messages of each message type are
+          delivered in the order they were sent.
+
+        :param window: The largest number of unacknowledged messages in
+          flight to a peer.
+
+        :param ack_delay: The number of seconds acknowledgements are delayed
+          by so that one acknowledges several messages.
+
+        :param min_rto: The lower limit, in seconds, of the retransmission
+          timeout.
+
+        :param max_rto: The upper limit, in seconds, of the retransmission
+          timeout.
+
+        :param max_retries: The number of retransmission timeouts after which
+          an unacknowledged message is abandoned.
+
+        :param delivery_timeout: The number of seconds a receiver waits for a
+          missing message before delivering the messages that follow it.
+        """
+        super().__init__(*args, **kwargs)
+        self.ordered = ordered
+        self.window = window
+        self.ack_delay = ack_delay
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.max_retries = max_retries
+        self.delivery_timeout = delivery_timeout
+
+    @property
+    def reliability_stats(self) -> Dict[str, Any]:
+        """ Return the loss, retransmission and round trip time statistics of
+        the running endpoint.
+        """
+        protocol = self._protocol
+        if not isinstance(protocol, MtiReliableDatagramProtocol):
+            return {}
+        return protocol.stats
+
+    def _protocol_factory(self):
+        """ Return a protocol instance to handle a new peer connection """
+        return self.protocol_class(
+            on_message=self.on_message,
+            on_peer_available=self.on_peer_available,
+            on_peer_unavailable=self.on_peer_unavailable,
+            ordered=self.ordered,
+            window=self.window,
+            ack_delay=self.ack_delay,
+            min_rto=self.min_rto,
+            max_rto=self.max_rto,
+            max_retries=self.max_retries,
+            delivery_timeout=self.delivery_timeout,
+        )
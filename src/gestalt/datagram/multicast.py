@@ -0,0 +1,416 @@
+"""
+IP multicast datagram endpoints.
+
+A multicast sender transmits each message once, to a group address, and the
+network delivers a copy to every receiver that has joined the group. This
+fans messages out to any number of receivers for the cost of a single send.
+
+Receivers join groups on chosen interfaces. A receiver can also join a group
+for specific sources only (source-specific multicast), in which case it only
+receives datagrams sent to the group by those sources.
+"""
+
+import ipaddress
+import logging
+import socket
+import struct
+import sys
+
+from gestalt.datagram.endpoint import DatagramEndpoint
+from typing import Optional, Sequence, Set, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+Interface = Union[str, int, None]
+
+# The socket module does not define the source-specific membership options
+# on every platform.
+if sys.platform.startswith("linux"):
+    _SOURCE_OPTIONS = (39, 40)
+elif sys.platform == "win32":
+    _SOURCE_OPTIONS = (15, 16)
+else:
+    _SOURCE_OPTIONS = (70, 71)
+IP_ADD_SOURCE_MEMBERSHIP = getattr(
+    socket, "IP_ADD_SOURCE_MEMBERSHIP", _SOURCE_OPTIONS[0]
+)
+IP_DROP_SOURCE_MEMBERSHIP = getattr(
+    socket, "IP_DROP_SOURCE_MEMBERSHIP", _SOURCE_OPTIONS[1]
+)
+
+# By default Linux delivers the datagrams of every group joined by any socket
+# on the host to all sockets bound to the port. Clearing this option limits a
+# socket to the groups and sources it joined itself.
+IP_MULTICAST_ALL = getattr(socket, "IP_MULTICAST_ALL", 49)
+
+
+def group_family(group: str) -> int:
+    """ Return the address family of a multicast group address.
+
+    :param group: An IPv4 or IPv6 multicast group address.
+    """
+    try:
+        address = ipaddress.ip_address(group)
+    except ValueError:
+        raise Exception(f"Invalid multicast group address: {group}") from None
+    if not address.is_multicast:
+        raise Exception(f"{group} is not a multicast group address")
+    return socket.AF_INET6 if address.version == 6 else socket.AF_INET
+
+
+def _interface_index(interface: Interface) -> int:
+    """ Return the index of an IPv6 interface given its name or index """
+    if interface is None:
+        return 0
+    if isinstance(interface, int):
+        return interface
+    return socket.if_nametoindex(interface)
+
+
+def _membership(
+    group: str, interface: Interface, source: Optional[str], join: bool
+) -> Tuple[int, int, bytes]:
+    """ Return the socket option level, name and value that join or leave a
+    multicast group.
+    """
+    if group_family(group) == socket.AF_INET6:
+        if source is not None:
+            raise Exception("Source-specific multicast is only supported for IPv4")
+        option = socket.IPV6_JOIN_GROUP if join else socket.IPV6_LEAVE_GROUP
+        value = socket.inet_pton(socket.AF_INET6, group) + struct.pack(
+            "@I", _interface_index(interface)
+        )
+        return socket.IPPROTO_IPV6, option, value
+
+    if isinstance(interface, int):
+        raise Exception("IPv4 interfaces are specified by their address")
+    group_addr = socket.inet_aton(group)
+    interface_addr = socket.inet_aton(interface or "0.0.0.0")
+    if source is None:
+        option = socket.IP_ADD_MEMBERSHIP if join else socket.IP_DROP_MEMBERSHIP
+        return socket.IPPROTO_IP, option, group_addr + interface_addr
+
+    option = IP_ADD_SOURCE_MEMBERSHIP if join else IP_DROP_SOURCE_MEMBERSHIP
+    source_addr = socket.inet_aton(source)
+    if sys.platform.startswith("linux"):
+        value = group_addr + interface_addr + source_addr
+    else:
+        value = group_addr + source_addr + interface_addr
+    return socket.IPPROTO_IP, option, value
+
+
+def join_group(
+    sock: socket.socket, group: str, interface: Interface = None, source: str = None
+) -> None:
+    """ Join a multicast group.
+
+    :param sock: The datagram socket that will receive the group's datagrams.
+
+    :param group: The multicast group address.
+
+    :param interface: The interface to join the group on. IPv4 interfaces
+      are identified by their address and IPv6 interfaces by their name or
+      index. By default the system chooses the interface.
+
+    :param source: An optional IPv4 source address. When given only
+      datagrams sent to the group by this source are received.
+    """
+    sock.setsockopt(*_membership(group, interface, source, join=True))
+
+
+def leave_group(
+    sock: socket.socket, group: str, interface: Interface = None, source: str = None
+) -> None:
+    """ Leave a multicast group that was joined using :func:`join_group`.
+
+    :param sock: The datagram socket that joined the group.
+
+    :param group: The multicast group address.
+
+    :param interface: The interface the group was joined on.
+
+    :param source: The source address the group was joined for, if any.
+    """
+    sock.setsockopt(*_membership(group, interface, source, join=False))
+
+
+class MulticastSender(DatagramEndpoint):
+    """
+    A datagram endpoint that sends messages to a multicast group.
+
+    Every message is sent once and is delivered to all receivers that have
+    joined the group.
+    """
+
+    def __init__(
+        self,
+        group: str,
+        port: int,
+        interface: Interface = None,
+        ttl: int = 1,
+        loopback: bool = True,
+        **kwargs,
+    ) -> None:
+        """
+        :param group: The multicast group address to send messages to.
+
+        :param port: The port that receivers are bound to.
+
+        :param interface: The interface to send datagrams from. IPv4
+          interfaces are identified by their address and IPv6 interfaces by
+          their name or index. By default the system chooses the interface.
+
+        :param ttl: The time to live, or hop limit, of sent datagrams. The
+          default value of 1 keeps datagrams on the local network.
+
+        :param loopback: Whether datagrams are also delivered to receivers on
+          this host. Defaults to True.
+
+        Other keyword arguments are passed to :class:`DatagramEndpoint`.
+
+        Raises:
+            Exception: If the group is not a multicast group address.
+        """
+        super().__init__(**kwargs)
+        self.family = group_family(group)
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.ttl = ttl
+        self.loopback = loopback
+
+    async def start(
+        self,
+        local_addr: Tuple[str, int] = None,
+        remote_addr: Tuple[str, int] = None,
+        family: int = socket.AF_INET,
+        reuse_port: bool = False,
+        allow_broadcast: bool = False,
+        batch_size: int = None,
+        zero_copy: bool = False,
+    ) -> None:
+        """ Start the multicast sender.
+
+        :param local_addr: An optional (host, port) tuple to bind the socket
+          to. The host is the source address that receivers see, which
+          matters to receivers that joined the group for specific sources.
+
+        :param batch_size: When set the endpoint uses the batched transport,
+          which sends each :meth:`send_many` call using as few system calls
+          as possible.
+
+        The remote_addr, family, reuse_port, allow_broadcast and zero_copy
+        arguments of :meth:`DatagramEndpoint.start` are not used. Datagrams
+        are always sent to the group.
+        """
+        if self.running:
+            return
+
+        group, port, interface = self.group, self.port, self.interface
+        logger.debug(f"Starting multicast sender for {group}:{port}")
+
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            if self.family == socket.AF_INET6:
+                sock.setsockopt(
+                    socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, self.ttl
+                )
+                sock.setsockopt(
+                    socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_LOOP, int(self.loopback)
+                )
+                if interface is not None:
+                    sock.setsockopt(
+                        socket.IPPROTO_IPV6,
+                        socket.IPV6_MULTICAST_IF,
+                        _interface_index(interface),
+                    )
+            else:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+                sock.setsockopt(
+                    socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, int(self.loopback)
+                )
+                if interface is not None:
+                    if not isinstance(interface, str):
+                        raise Exception(
+                            "IPv4 interfaces are specified by their address"
+                        )
+                    sock.setsockopt(
+                        socket.IPPROTO_IP,
+                        socket.IP_MULTICAST_IF,
+                        socket.inet_aton(interface),
+                    )
+            if local_addr:
+                sock.bind(local_addr)
+            sock.connect((group, port))
+            await self._create_transport(sock, batch_size)
+        except Exception as exc:
+            sock.close()
+            logger.error(f"Error starting multicast sender for {group}:{port}: {exc}")
+            return
+
+        self._set_started()
+
+
+class MulticastReceiver(DatagramEndpoint):
+    """
+    A datagram endpoint that receives messages sent to multicast groups.
+
+    Several receivers on a host can join the same group and port. Each of
+    them receives a copy of every datagram.
+    """
+
+    def __init__(
+        self,
+        group: str,
+        port: int,
+        interfaces: Sequence[Interface] = None,
+        sources: Sequence[str] = None,
+        bind_any: bool = False,
+        **kwargs,
+    ) -> None:
+        """
+        :param group: The multicast group address to join.
+
+        :param port: The port to receive datagrams on. Use 0 to bind to a
+          port chosen by the system, which is then available from
+          :attr:`bindings`.
+
+        :param interfaces: An optional list of interfaces to join the group
+          on. IPv4 interfaces are identified by their address and IPv6
+          interfaces by their name or index. By default the system chooses
+          the interface.
+
+        :param sources: An optional list of IPv4 source addresses. When
+          given the group is joined for these sources only (source-specific
+          multicast).
+
+        :param bind_any: The socket is bound to the group address, except on
+          Windows where that is not supported, so that it only receives the
+          group's datagrams. When set to True the socket is bound to the
+          wildcard address instead, which is needed to receive datagrams for
+          further groups joined using :meth:`join`.
+
+        Other keyword arguments are passed to :class:`DatagramEndpoint`.
+
+        Raises:
+            Exception: If the group is not a multicast group address.
+        """
+        super().__init__(**kwargs)
+        self.family = group_family(group)
+        self.group = group
+        self.port = port
+        self.interfaces = interfaces
+        self.sources = sources
+        self.bind_any = bind_any
+        self._sock = None  # type: Optional[socket.socket]
+        self._memberships = set()  # type: Set[Tuple[str, Interface, Optional[str]]]
+
+    @property
+    def memberships(self) -> Set[Tuple[str, Interface, Optional[str]]]:
+        """ Return the (group, interface, source) memberships the receiver
+        has joined.
+        """
+        return set(self._memberships)
+
+    async def start(
+        self,
+        local_addr: Tuple[str, int] = None,
+        remote_addr: Tuple[str, int] = None,
+        family: int = socket.AF_INET,
+        reuse_port: bool = False,
+        allow_broadcast: bool = False,
+        batch_size: int = None,
+        zero_copy: bool = False,
+    ) -> None:
+        """ Start the multicast receiver and join its group.
+
+        :param reuse_port: Also set SO_REUSEPORT, which lets receivers in
+          different processes share the port on systems where SO_REUSEADDR
+          does not.
+
+        :param batch_size: When set the endpoint uses the batched transport.
+          See :meth:`DatagramEndpoint.start`.
+
+        :param zero_copy: When set to True datagrams are received into a pool
+          of preallocated buffers. See :meth:`DatagramEndpoint.start`.
+
+        The local_addr, remote_addr, family and allow_broadcast arguments of
+        :meth:`DatagramEndpoint.start` are not used. The socket is bound to
+        the port passed to the constructor.
+        """
+        if self.running:
+            return
+
+        group, port = self.group, self.port
+        logger.debug(f"Starting multicast receiver for {group}:{port}")
+
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            # Multicast receivers must share the port with other receivers
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            if self.bind_any or sys.platform == "win32":
+                host = "::" if self.family == socket.AF_INET6 else "0.0.0.0"
+            else:
+                host = group
+            sock.bind((host, port))
+            if self.family == socket.AF_INET and sys.platform.startswith("linux"):
+                sock.setsockopt(socket.IPPROTO_IP, IP_MULTICAST_ALL, 0)
+
+            for interface in self.interfaces or (None,):
+                for source in self.sources or (None,):
+                    join_group(sock, group, interface, source)
+                    self._memberships.add((group, interface, source))
+
+            self._sock = sock
+            await self._create_transport(sock, batch_size, zero_copy)
+        except Exception as exc:
+            sock.close()
+            self._sock = None
+            self._memberships.clear()
+            logger.error(f"Error starting multicast receiver for {group}:{port}: {exc}")
+            return
+
+        self._set_started()
+
+    async def stop(self):
+        """ Stop the multicast receiver. Closing its socket leaves every group
+        it has joined.
+        """
+        await super().stop()
+        self._sock = None
+        self._memberships.clear()
+
+    def join(self, group: str, interface: Interface = None, source: str = None):
+        """ Join a multicast group, or an additional interface or source of a
+        group, while the receiver is running.
+
+        :param group: The multicast group address.
+
+        :param interface: The interface to join the group on.
+
+        :param source: An optional IPv4 source address to receive the group's
+          datagrams from.
+        """
+        if self._sock is None:
+            raise Exception("Multicast receiver is not running")
+        join_group(self._sock, group, interface, source)
+        self._memberships.add((group, interface, source))
+
+    def leave(self, group: str, interface: Interface = None, source: str = None):
+        """ Leave a multicast group membership.
+
+        :param group: The multicast group address.
+
+        :param interface: The interface the group was joined on.
+
+        :param source: The source address the group was joined for, if any.
+        """
+        if self._sock is None:
+            raise Exception("Multicast receiver is not running")
+        leave_group(self._sock, group, interface, source)
+        self._memberships.discard((group, interface, source))
@@ -1,7 +1,18 @@
 from gestalt.datagram.endpoint import DatagramEndpoint
+from gestalt.datagram.multicast import MulticastReceiver, MulticastSender
 from gestalt.datagram.protocols.netstring import NetstringDatagramProtocol
 
 
 class NetstringDatagramEndpoint(DatagramEndpoint):
 
     protocol_class = NetstringDatagramProtocol
+
+
+class NetstringMulticastSender(MulticastSender):
+
+    protocol_class = NetstringDatagramProtocol
+
+
+class NetstringMulticastReceiver(MulticastReceiver):
+
+    protocol_class = NetstringDatagramProtocol
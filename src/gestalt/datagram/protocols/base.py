@@ -3,7 +3,7 @@ import binascii
 import logging
 import os
 
-from typing import Tuple
+from typing import Any, Optional, Sequence, Tuple, Union
 
 
 logger = logging.getLogger(__name__)
@@ -38,6 +38,8 @@ class BaseDatagramProtocol(asyncio.DatagramProtocol):
         self._identity = b""
         self._remote_address = None  # type: Optional[Tuple[str, int]]
         self._local_address = None  # type: Optional[Tuple[str, int]]
+        self._write_paused = False
+        self._drain_waiter = None  # type: Optional[asyncio.Future]
         self.transport = None
 
     @property
@@ -46,12 +48,12 @@ class BaseDatagramProtocol(asyncio.DatagramProtocol):
         return self._identity
 
     @property
-    def raddr(self) -> Tuple[str, int]:
+    def raddr(self) -> Optional[Tuple[str, int]]:
         """ Return the remote address the protocol is connected with """
         return self._remote_address
 
     @property
-    def laddr(self) -> Tuple[str, int]:
+    def laddr(self) -> Optional[Tuple[str, int]]:
         """ Return the local address the protocol is using """
         return self._local_address
 
@@ -84,12 +86,46 @@ class BaseDatagramProtocol(asyncio.DatagramProtocol):
         self._identity = None
         self._local_address = None
 
+        # Release any senders waiting for the write buffer to drain
+        self._write_paused = False
+        self._wake_drain_waiter()
+
     def close(self):
         """ Close this connection """
         logger.debug(f"Closing connection. id={self._identity}")
         if self.transport:
             self.transport.close()
 
+    def pause_writing(self):
+        """
+        Called by the transport when its write buffer exceeds the high water mark.
+        """
+        self._write_paused = True
+
+    def resume_writing(self):
+        """
+        Called by the transport when its write buffer drains below the low water mark.
+        """
+        self._write_paused = False
+        self._wake_drain_waiter()
+
+    async def drain(self):
+        """ Wait until the transport's write buffer has drained below its
+        low water mark. Returns immediately if writing is not paused.
+        """
+        if not self._write_paused:
+            return
+        if self._drain_waiter is None:
+            self._drain_waiter = asyncio.get_event_loop().create_future()
+        # Several senders may share the waiter so protect it from cancellation
+        await asyncio.shield(self._drain_waiter)
+
+    def _wake_drain_waiter(self):
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
     def send(self, data, addr=None, **kwargs):
         """
         Send a message to a remote UDP endpoint by writing it to the transport.
@@ -106,6 +142,55 @@ class BaseDatagramProtocol(asyncio.DatagramProtocol):
 
         self.transport.sendto(data, addr=addr)
 
+    def send_many(self, datagrams: Sequence[bytes], addr=None, **kwargs):
+        """
+        Send several messages to a remote UDP endpoint, each in its own
+        datagram.
+
+        :param datagrams: a sequence of bytes objects containing the message
+          payloads.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+        """
+        for data in datagrams:
+            if not isinstance(data, bytes):
+                logger.error(
+                    f"data must be bytes - can't send messages. data={type(data)}"
+                )
+                return
+
+        self.sendto_many(datagrams, addr=addr)
+
+    def sendto_many(self, datagrams: Sequence[bytes], addr=None):
+        """
+        Write several framed datagrams to the transport. A batched transport
+        writes them using as few system calls as possible.
+
+        :param datagrams: a sequence of bytes objects to write.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple.
+        """
+        sendto_many = getattr(self.transport, "sendto_many", None)
+        if sendto_many is not None:
+            sendto_many(datagrams, addr=addr)
+        else:
+            for data in datagrams:
+                self.transport.sendto(data, addr=addr)
+
+    def datagrams_received(
+        self, datagrams: Sequence[Tuple[Union[bytes, memoryview], Any]]
+    ):
+        """
+        Process a batch of datagrams received from a batched transport.
+
+        :param datagrams: A sequence of (data, addr) tuples.
+        """
+        for data, addr in datagrams:
+            self.datagram_received(data, addr)
+
     def datagram_received(self, data, addr):
         """
         Process a datagram received from the transport.
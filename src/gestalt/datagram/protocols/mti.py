@@ -1,7 +1,32 @@
+import asyncio
 import logging
+import os
 import struct
 
 from .base import BaseDatagramProtocol
+from gestalt.datagram.fragment import (
+    DEFAULT_MAX_MESSAGE_SIZE,
+    DEFAULT_MAX_REASSEMBLY_SIZE,
+    DEFAULT_MTU,
+    DEFAULT_REASSEMBLY_TIMEOUT,
+    MAX_FRAGMENTS,
+    Reassembler,
+)
+from gestalt.datagram.reliable import (
+    DEFAULT_ACK_DELAY,
+    DEFAULT_DELIVERY_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_RTO,
+    DEFAULT_MIN_RTO,
+    DEFAULT_WINDOW,
+    MAX_SEQUENCE_GAP,
+    SEQUENCE_MASK,
+    ReceiveState,
+    SendState,
+    Sequencer,
+    unwrap,
+)
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +34,18 @@ logger = logging.getLogger(__name__)
 MTI_HEADER_FORMAT = "II"
 MTI_HEADER_SIZE = struct.calcsize(MTI_HEADER_FORMAT)
 
+MTI_FRAGMENT_HEADER_FORMAT = "IIIHH"
+MTI_FRAGMENT_HEADER_SIZE = struct.calcsize(MTI_FRAGMENT_HEADER_FORMAT)
+
+MTI_RELIABLE_HEADER_FORMAT = "IIIIIBB"
+MTI_RELIABLE_HEADER_SIZE = struct.calcsize(MTI_RELIABLE_HEADER_FORMAT)
+RELIABLE_ACK_FORMAT = "Q"
+RELIABLE_NACK_ITEM_SIZE = struct.calcsize("I")
+RELIABLE_KIND_DATA = 0
+RELIABLE_KIND_ACK = 1
+RELIABLE_KIND_NACK = 2
+RELIABLE_FLAG_ORDERED = 0x01
+
 
 class MtiDatagramProtocol(BaseDatagramProtocol):
     """
@@ -76,6 +113,39 @@ class MtiDatagramProtocol(BaseDatagramProtocol):
 
         self.transport.sendto(msg, addr=addr)
 
+    def send_many(
+        self, datagrams: Sequence[bytes], addr=None, type_identifier: int = 0, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """ Sends several messages, each in its own datagram, by writing them
+        to the transport together.
+
+        :param datagrams: a sequence of bytes objects containing the message
+          payloads.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+
+        :param type_identifier: a message type identifier used for every
+          message.
+        """
+        if not isinstance(type_identifier, int):
+            logger.error(
+                f"type_identifier must be integer - can't send messages. type_identifier={type(type_identifier)}"
+            )
+            return
+
+        try:
+            msgs = [
+                struct.pack(MTI_HEADER_FORMAT, len(data), type_identifier) + data
+                for data in datagrams
+            ]
+        except TypeError:
+            logger.error(f"data must be bytes - can't send messages")
+            return
+
+        self.sendto_many(msgs, addr=addr)
+
     def datagram_received(self, data, addr):
         """
         Process a datagram received from the transport.
@@ -105,3 +175,707 @@ class MtiDatagramProtocol(BaseDatagramProtocol):
                 )
         except Exception:
             logger.exception("Error in on_message callback method")
+
+    def datagrams_received(
+        self, datagrams: Sequence[Tuple[Union[bytes, memoryview], Any]]
+    ):
+        """
+        Process a batch of datagrams received from a batched transport.
+
+        :param datagrams: A sequence of (data, addr) tuples.
+        """
+        handler = self._on_message_handler
+        if handler is None:
+            return
+
+        identity = self._identity
+        for data, addr in datagrams:
+            try:
+                msg_len, msg_id = struct.unpack_from(MTI_HEADER_FORMAT, data)
+            except struct.error:
+                logger.error(f"Discarding datagram with an invalid frame header")
+                continue
+            eom = MTI_HEADER_SIZE + msg_len
+            msg = data[MTI_HEADER_SIZE:eom] if msg_len else ""
+
+            try:
+                handler(self, identity, msg, addr=addr, type_identifier=msg_id)
+            except Exception:
+                logger.exception("Error in on_message callback method")
+
+
+class MtiFragmentDatagramProtocol(MtiDatagramProtocol):
+    """
+    The MTI fragment protocol extends the MTI framing strategy so that
+    messages larger than a datagram can be sent. Messages are split into
+    fragments that fit within a configurable MTU and are reassembled by the
+    receiver. This avoids IP fragmentation, where losing one fragment loses
+    the whole datagram, and lifts the 64 KB datagram size limit.
+
+    The frame header adds a message identifier, the fragment's index and the
+    number of fragments in the message to the MTI header. The length field
+    holds the number of payload bytes in this fragment. Messages that fit in
+    a single datagram are sent as one fragment.
+
+    .. code-block:: console
+
+        +-----------------------------------------------------------+-----------+
+        |                          header                           |  payload  |
+        +-----------------------------------------------------------+-----------+
+        | Length | Message_Type | Message_Id | Fragment | Fragments |  DATA ... |
+        | uint32 |    uint32    |   uint32   |  uint16  |  uint16   |           |
+        +--------+--------------+------------+----------+-----------+-----------+
+
+    This protocol is not compatible with the plain MTI datagram protocol.
+    Both ends must use it.
+    """
+
+    def __init__(
+        self,
+        on_message=None,
+        on_peer_available=None,
+        on_peer_unavailable=None,
+        mtu: int = DEFAULT_MTU,
+        reassembly_timeout: float = DEFAULT_REASSEMBLY_TIMEOUT,
+        max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+        max_reassembly_size: int = DEFAULT_MAX_REASSEMBLY_SIZE,
+        **kwargs,
+    ):
+        """
+        :param mtu: The largest datagram, in bytes and including the frame
+          header, to send. Larger messages are split into fragments. Peers
+          should use the same MTU because received messages with more
+          fragments than a message of max_message_size needs at this MTU
+          are discarded.
+
+        :param reassembly_timeout: The number of seconds within which all
+          fragments of a message must arrive.
+
+        :param max_message_size: The largest message, in bytes, that is
+          reassembled.
+
+        :param max_reassembly_size: The limit on the number of bytes held by
+          partially received messages.
+        """
+        super().__init__(
+            on_message=on_message,
+            on_peer_available=on_peer_available,
+            on_peer_unavailable=on_peer_unavailable,
+        )
+        if mtu <= MTI_FRAGMENT_HEADER_SIZE:
+            raise Exception(f"MTU must be larger than {MTI_FRAGMENT_HEADER_SIZE}")
+        self.fragment_size = mtu - MTI_FRAGMENT_HEADER_SIZE
+        self.reassembler = Reassembler(
+            timeout=reassembly_timeout,
+            max_message_size=max_message_size,
+            max_size=max_reassembly_size,
+            fragment_size=self.fragment_size,
+        )
+        self._message_id = 0
+
+    def send(
+        self, data: bytes, addr=None, type_identifier: int = 0, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """ Sends a message by writing it to the transport, split into
+        fragments if it does not fit in a single datagram.
+
+        :param data: a bytes object containing the message payload.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+
+        :param type_identifier: a message type identifier.
+        """
+        if not isinstance(data, bytes):
+            logger.error(f"data must be bytes - can't send message. data={type(data)}")
+            return
+
+        if not isinstance(type_identifier, int):
+            logger.error(
+                f"type_identifier must be integer - can't send message. type_identifier={type(type_identifier)}"
+            )
+            return
+
+        frames = self._fragment(data, type_identifier)
+        if frames:
+            self.sendto_many(frames, addr=addr)
+
+    def send_many(
+        self, datagrams: Sequence[bytes], addr=None, type_identifier: int = 0, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """ Sends several messages, fragmenting those that do not fit in a
+        single datagram, by writing them to the transport together.
+
+        :param datagrams: a sequence of bytes objects containing the message
+          payloads.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+
+        :param type_identifier: a message type identifier used for every
+          message.
+        """
+        frames = []  # type: List[bytes]
+        for data in datagrams:
+            if not isinstance(data, bytes):
+                logger.error(
+                    f"data must be bytes - can't send messages. data={type(data)}"
+                )
+                return
+            frames.extend(self._fragment(data, type_identifier))
+        self.sendto_many(frames, addr=addr)
+
+    def _fragment(self, data: bytes, type_identifier: int) -> List[bytes]:
+        """ Return the framed fragments of a message """
+        size = self.fragment_size
+        count = max(1, -(-len(data) // size))
+        if count > MAX_FRAGMENTS:
+            logger.error(
+                f"Message of {len(data)} bytes needs more than {MAX_FRAGMENTS} "
+                "fragments - can't send message"
+            )
+            return []
+
+        message_id = self._message_id
+        self._message_id = (message_id + 1) & 0xFFFFFFFF
+
+        view = memoryview(data)
+        frames = []
+        for index in range(count):
+            chunk = view[index * size : (index + 1) * size]
+            header = struct.pack(
+                MTI_FRAGMENT_HEADER_FORMAT,
+                len(chunk),
+                type_identifier,
+                message_id,
+                index,
+                count,
+            )
+            frames.append(header + chunk)
+        return frames
+
+    def datagram_received(self, data, addr):
+        """
+        Process a datagram received from the transport.
+
+        :param data: The datagram payload
+
+        :param addr: A (host, port) tuple defining the source address
+        """
+        self.datagrams_received(((data, addr),))
+
+    def datagrams_received(
+        self, datagrams: Sequence[Tuple[Union[bytes, memoryview], Any]]
+    ):
+        """
+        Process a batch of datagrams received from the transport. Complete
+        messages are passed to the on_message handler.
+
+        :param datagrams: A sequence of (data, addr) tuples.
+        """
+        handler = self._on_message_handler
+        if handler is None:
+            return
+
+        identity = self._identity
+        for data, addr in datagrams:
+            try:
+                msg_len, msg_id, message_id, index, count = struct.unpack_from(
+                    MTI_FRAGMENT_HEADER_FORMAT, data
+                )
+            except struct.error:
+                logger.error(f"Discarding datagram with an invalid frame header")
+                continue
+            if index >= count:
+                logger.error(f"Discarding datagram with an invalid fragment index")
+                continue
+
+            eom = MTI_FRAGMENT_HEADER_SIZE + msg_len
+            msg = data[MTI_FRAGMENT_HEADER_SIZE:eom] if msg_len else b""
+            if count > 1:
+                message = self.reassembler.add(addr, message_id, index, count, msg)
+                if message is None:
+                    continue
+                msg = message
+
+            try:
+                handler(self, identity, msg, addr=addr, type_identifier=msg_id)
+            except Exception:
+                logger.exception("Error in on_message callback method")
+
+    def connection_lost(self, exc):
+        super().connection_lost(exc)
+        self.reassembler.clear()
+
+
+class MtiReliableDatagramProtocol(MtiDatagramProtocol):
+    """
+    The MTI reliable protocol extends the MTI framing strategy with sequence
+    numbers and acknowledgements so that lost datagrams are detected and
+    retransmitted. It is a lighter weight alternative to a stream for lossy
+    links. Unlike a stream, ordering is per message type identifier so a lost
+    message does not delay unrelated messages (no head of line blocking
+    across message types), and messages can be delivered unordered.
+
+    The frame header adds the sender's session identifier, the message's
+    sequence number, its sequence number within its message type (stream
+    sequence), the frame kind and flags to the MTI header.
+
+    .. code-block:: console
+
+        +-----------------------------------------------------------------------------+-----------+
+        |                                    header                                   |  payload  |
+        +-----------------------------------------------------------------------------+-----------+
+        | Length | Message_Type | Session | Sequence | Stream_Sequence | Kind | Flags |  DATA ... |
+        | uint32 |    uint32    | uint32  |  uint32  |     uint32      | uint8| uint8 |           |
+        +--------+--------------+---------+----------+-----------------+------+-------+-----------+
+
+    A DATA frame carries a message. An ACK frame acknowledges every message
+    below its sequence number and its payload is a uint64 bitmap of the
+    messages received beyond that. A NACK frame's payload lists the uint32
+    sequence numbers of missing messages. ACK and NACK frames carry the
+    session identifier of the peer whose messages they refer to.
+
+    This protocol is not compatible with the plain MTI datagram protocol.
+    Both ends must use it.
+    """
+
+    def __init__(
+        self,
+        on_message=None,
+        on_peer_available=None,
+        on_peer_unavailable=None,
+        ordered: bool = True,
+        window: int = DEFAULT_WINDOW,
+        ack_delay: float = DEFAULT_ACK_DELAY,
+        min_rto: float = DEFAULT_MIN_RTO,
+        max_rto: float = DEFAULT_MAX_RTO,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        delivery_timeout: float = DEFAULT_DELIVERY_TIMEOUT,
+        **kwargs,
+    ):
+        """
+        :param ordered: Whether the messages of each message type are
+          delivered in the order they were sent. When False messages are
+          delivered as soon as they arrive.
+
+        :param window: The largest number of unacknowledged messages in
+          flight to a peer. Further messages wait until earlier ones are
+          acknowledged.
+
+        :param ack_delay: The number of seconds acknowledgements are delayed
+          by so that one acknowledges several messages.
+
+        :param min_rto: The lower limit, in seconds, of the retransmission
+          timeout.
+
+        :param max_rto: The upper limit, in seconds, of the retransmission
+          timeout.
+
+        :param max_retries: The number of retransmission timeouts after which
+          an unacknowledged message is abandoned.
+
+        :param delivery_timeout: The number of seconds a receiver waits for a
+          missing message before delivering the messages that follow it.
+        """
+        super().__init__(
+            on_message=on_message,
+            on_peer_available=on_peer_available,
+            on_peer_unavailable=on_peer_unavailable,
+        )
+        self.ordered = ordered
+        self.window = window
+        self.ack_delay = ack_delay
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.max_retries = max_retries
+        self.delivery_timeout = delivery_timeout
+        self.messages_sent = 0
+        self.messages_delivered = 0
+        self.messages_lost = 0
+        self.messages_skipped = 0
+        self.retransmits = 0
+        self.duplicates = 0
+        self.acks_sent = 0
+        self.acks_received = 0
+        self.nacks_sent = 0
+        self.nacks_received = 0
+        self._session = 0
+        self._senders = {}  # type: Dict[Any, SendState]
+        self._receivers = {}  # type: Dict[Any, ReceiveState]
+        self._loop = asyncio.get_event_loop()
+        self._retransmit_handle = None  # type: Optional[asyncio.TimerHandle]
+        self._expire_handle = None  # type: Optional[asyncio.TimerHandle]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ Return the loss, retransmission and round trip time statistics.
+        The round trip time and window statistics are reported per peer.
+        """
+        return {
+            "messages_sent": self.messages_sent,
+            "messages_delivered": self.messages_delivered,
+            "messages_lost": self.messages_lost,
+            "messages_skipped": self.messages_skipped,
+            "retransmits": self.retransmits,
+            "duplicates": self.duplicates,
+            "acks_sent": self.acks_sent,
+            "acks_received": self.acks_received,
+            "nacks_sent": self.nacks_sent,
+            "nacks_received": self.nacks_received,
+            "peers": {addr: state.stats for addr, state in self._senders.items()},
+        }
+
+    def connection_made(self, transport):
+        self._session = int.from_bytes(os.urandom(4), "little")
+        super().connection_made(transport)
+
+    def connection_lost(self, exc):
+        for handle in (self._retransmit_handle, self._expire_handle):
+            if handle is not None:
+                handle.cancel()
+        self._retransmit_handle = None
+        self._expire_handle = None
+        for receiver in self._receivers.values():
+            if receiver.ack_handle is not None:
+                receiver.ack_handle.cancel()
+        self._senders.clear()
+        self._receivers.clear()
+        super().connection_lost(exc)
+
+    def send(
+        self, data: bytes, addr=None, type_identifier: int = 0, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """ Sends a message reliably by writing it to the transport.
+
+        :param data: a bytes object containing the message payload.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+
+        :param type_identifier: a message type identifier.
+        """
+        self.send_many((data,), addr=addr, type_identifier=type_identifier)
+
+    def send_many(
+        self, datagrams: Sequence[bytes], addr=None, type_identifier: int = 0, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """ Sends several messages reliably, each in its own datagram, by
+        writing them to the transport together.
+
+        :param datagrams: a sequence of bytes objects containing the message
+          payloads.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+
+        :param type_identifier: a message type identifier used for every
+          message.
+        """
+        if not isinstance(type_identifier, int):
+            logger.error(
+                f"type_identifier must be integer - can't send messages. type_identifier={type(type_identifier)}"
+            )
+            return
+
+        for data in datagrams:
+            if not isinstance(data, bytes):
+                logger.error(
+                    f"data must be bytes - can't send messages. data={type(data)}"
+                )
+                return
+
+        if self.transport is None:
+            logger.error(f"Protocol is not connected - can't send messages")
+            return
+
+        peer = addr or self._remote_address
+        state = self._senders.get(peer)
+        if state is None:
+            state = self._senders[peer] = SendState(
+                self.window, self.min_rto, self.max_rto
+            )
+
+        flags = RELIABLE_FLAG_ORDERED if self.ordered else 0
+        for data in datagrams:
+            sequence, stream_sequence = state.allocate(type_identifier, self.ordered)
+            header = struct.pack(
+                MTI_RELIABLE_HEADER_FORMAT,
+                len(data),
+                type_identifier,
+                self._session,
+                sequence & SEQUENCE_MASK,
+                stream_sequence & SEQUENCE_MASK,
+                RELIABLE_KIND_DATA,
+                flags,
+            )
+            state.backlog.append((sequence, header + data))
+        self.messages_sent += len(datagrams)
+
+        frames = state.release(self._loop.time())
+        if frames:
+            self.sendto_many(frames, addr=addr)
+            self._schedule_retransmit()
+
+    def datagram_received(self, data, addr):
+        """
+        Process a datagram received from the transport.
+
+        :param data: The datagram payload
+
+        :param addr: A (host, port) tuple defining the source address
+        """
+        self.datagrams_received(((data, addr),))
+
+    def datagrams_received(
+        self, datagrams: Sequence[Tuple[Union[bytes, memoryview], Any]]
+    ):
+        """
+        Process a batch of datagrams received from the transport. New messages
+        are passed to the on_message handler and acknowledged.
+
+        :param datagrams: A sequence of (data, addr) tuples.
+        """
+        now = self._loop.time()
+        for data, addr in datagrams:
+            try:
+                (
+                    msg_len,
+                    msg_id,
+                    session,
+                    sequence,
+                    stream_sequence,
+                    kind,
+                    flags,
+                ) = struct.unpack_from(MTI_RELIABLE_HEADER_FORMAT, data)
+            except struct.error:
+                logger.error(f"Discarding datagram with an invalid frame header")
+                continue
+
+            eom = MTI_RELIABLE_HEADER_SIZE + msg_len
+            msg = data[MTI_RELIABLE_HEADER_SIZE:eom]
+            if kind == RELIABLE_KIND_DATA:
+                self._data_received(
+                    msg if msg_len else b"",
+                    addr,
+                    msg_id,
+                    session,
+                    sequence,
+                    stream_sequence,
+                    flags,
+                    now,
+                )
+            elif kind == RELIABLE_KIND_ACK:
+                self._ack_received(msg, addr, session, sequence, now)
+            elif kind == RELIABLE_KIND_NACK:
+                self._nack_received(msg, addr, session, now)
+            else:
+                logger.error(f"Discarding datagram with an invalid frame kind {kind}")
+
+    def _data_received(
+        self, msg, addr, msg_id, session, sequence, stream_sequence, flags, now
+    ):
+        """ Deliver, or hold, a received message and acknowledge it """
+        state = self._receivers.get(addr)
+        if state is None or state.session != session:
+            if state is not None:
+                logger.debug(f"Peer {addr} restarted, resetting its sequence")
+                if state.ack_handle is not None:
+                    state.ack_handle.cancel()
+            state = self._receivers[addr] = ReceiveState(session)
+
+        received = state.received
+        sequence = unwrap(sequence, received.next)
+        if sequence - received.next >= MAX_SEQUENCE_GAP:
+            logger.error(f"Discarding message with an invalid sequence number")
+            return
+
+        self._schedule_ack(state, addr)
+        if sequence in received:
+            self.duplicates += 1
+            return
+
+        missing = state.missing(sequence)
+        if missing:
+            self._send_nack(missing, addr, session)
+        received.add(sequence, None, now)
+
+        if not flags & RELIABLE_FLAG_ORDERED:
+            self._deliver((msg,), addr, msg_id)
+            if received.held:
+                self._schedule_expire()
+            return
+
+        stream = state.streams.get(msg_id)
+        if stream is None:
+            stream = state.streams[msg_id] = Sequencer()
+        stream_sequence = unwrap(stream_sequence, stream.next)
+        if stream_sequence in stream:
+            # The message arrived after the receiver stopped waiting for it
+            logger.warning(f"Discarding late message {sequence} from {addr}")
+            return
+        if stream_sequence != stream.next and type(msg) is memoryview:
+            # Don't hold on to pooled receive buffers while messages wait
+            msg = bytes(msg)
+        msgs = stream.add(stream_sequence, msg, now)
+        if msgs:
+            self._deliver(msgs, addr, msg_id)
+        if received.held or stream.held:
+            self._schedule_expire()
+
+    def _deliver(self, msgs, addr, msg_id):
+        """ Pass messages to the on_message handler """
+        handler = self._on_message_handler
+        if handler is None:
+            return
+        identity = self._identity
+        for msg in msgs:
+            self.messages_delivered += 1
+            try:
+                handler(self, identity, msg, addr=addr, type_identifier=msg_id)
+            except Exception:
+                logger.exception("Error in on_message callback method")
+
+    def _ack_received(self, msg, addr, session, sequence, now):
+        """ Remove acknowledged messages from the window and send any that
+        were waiting for room in it.
+        """
+        state = self._senders.get(addr)
+        if state is None or session != self._session:
+            return
+        self.acks_received += 1
+        try:
+            (bitmap,) = struct.unpack(RELIABLE_ACK_FORMAT, msg)
+        except struct.error:
+            logger.error(f"Discarding ACK with an invalid bitmap")
+            return
+        cumulative = unwrap(sequence, state.next_sequence)
+        _acked, lost = state.acknowledge(cumulative, bitmap, now)
+        self.retransmits += len(lost)
+        frames = lost + state.release(now)
+        if frames:
+            self.sendto_many(frames, addr=addr)
+            self._schedule_retransmit()
+
+    def _nack_received(self, msg, addr, session, now):
+        """ Retransmit the messages a peer reports as missing """
+        state = self._senders.get(addr)
+        if state is None or session != self._session:
+            return
+        self.nacks_received += 1
+        count = len(msg) // RELIABLE_NACK_ITEM_SIZE
+        frames = []
+        for sequence in struct.unpack_from(f"{count}I", msg):
+            message = state.pending.get(unwrap(sequence, state.next_sequence))
+            if message is not None:
+                message.sent = now
+                message.retries += 1
+                frames.append(message.frame)
+        if frames:
+            self.retransmits += len(frames)
+            self.sendto_many(frames, addr=addr)
+
+    def _send_nack(self, missing, addr, session):
+        """ Ask a peer to retransmit missing messages """
+        self.nacks_sent += 1
+        payload = struct.pack(
+            f"{len(missing)}I", *(sequence & SEQUENCE_MASK for sequence in missing)
+        )
+        header = struct.pack(
+            MTI_RELIABLE_HEADER_FORMAT,
+            len(payload),
+            0,
+            session,
+            0,
+            0,
+            RELIABLE_KIND_NACK,
+            0,
+        )
+        self.transport.sendto(header + payload, addr)
+
+    def _schedule_ack(self, state, addr):
+        if state.ack_handle is None:
+            state.ack_handle = self._loop.call_later(
+                self.ack_delay, self._send_ack, state, addr
+            )
+
+    def _send_ack(self, state, addr):
+        """ Acknowledge the messages received from a peer """
+        state.ack_handle = None
+        if self.transport is None:
+            return
+        self.acks_sent += 1
+        payload = struct.pack(RELIABLE_ACK_FORMAT, state.ack_bitmap())
+        header = struct.pack(
+            MTI_RELIABLE_HEADER_FORMAT,
+            len(payload),
+            0,
+            state.session,
+            state.received.next & SEQUENCE_MASK,
+            0,
+            RELIABLE_KIND_ACK,
+            0,
+        )
+        self.transport.sendto(header + payload, addr)
+
+    def _schedule_retransmit(self):
+        if self._retransmit_handle is not None:
+            return
+        deadlines = [
+            state.deadline(message)
+            for state in self._senders.values()
+            for message in state.pending.values()
+        ]
+        if deadlines:
+            self._retransmit_handle = self._loop.call_at(
+                min(deadlines), self._retransmit
+            )
+
+    def _retransmit(self):
+        """ Retransmit messages whose retransmission timeout has expired and
+        abandon those that have been retransmitted too many times.
+        """
+        self._retransmit_handle = None
+        if self.transport is None:
+            return
+        now = self._loop.time()
+        for addr, state in self._senders.items():
+            frames, abandoned = state.expire(now, self.max_retries)
+            if abandoned:
+                self.messages_lost += abandoned
+                logger.warning(f"Abandoned {abandoned} messages to {addr}")
+            if frames:
+                self.retransmits += len(frames)
+                self.sendto_many(frames, addr=addr)
+        self._schedule_retransmit()
+
+    def _schedule_expire(self):
+        if self._expire_handle is None:
+            self._expire_handle = self._loop.call_later(
+                self.delivery_timeout / 2, self._expire
+            )
+
+    def _expire(self):
+        """ Stop waiting for messages that have been missing for longer than
+        the delivery timeout and deliver the messages that follow them.
+        """
+        self._expire_handle = None
+        if self.transport is None:
+            return
+        now = self._loop.time()
+        waiting = False
+        for addr, state in self._receivers.items():
+            _, skipped = state.received.expire(now, self.delivery_timeout)
+            self.messages_skipped += skipped
+            waiting = waiting or bool(state.received.held)
+            for msg_id, stream in state.streams.items():
+                msgs, _ = stream.expire(now, self.delivery_timeout)
+                if msgs:
+                    self._deliver(msgs, addr, msg_id)
+                waiting = waiting or bool(stream.held)
+        if waiting:
+            self._schedule_expire()
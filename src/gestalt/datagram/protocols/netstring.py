@@ -2,6 +2,7 @@ import logging
 import struct
 
 from .base import BaseDatagramProtocol
+from typing import Any, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +58,31 @@ class NetstringDatagramProtocol(BaseDatagramProtocol):
 
         self.transport.sendto(msg, addr=addr)
 
+    def send_many(
+        self, datagrams: Sequence[bytes], addr=None, **kwargs
+    ):  # pylint: disable=arguments-differ
+        """
+        Send several messages, each in its own datagram, by writing them to
+        the transport together.
+
+        :param datagrams: a sequence of bytes objects containing the message
+          payloads.
+
+        :param addr: The address of the remote endpoint as a (host, port)
+          tuple. If remote_addr was specified when the endpoint was created then
+          the addr is optional.
+        """
+        try:
+            msgs = [
+                struct.pack(NETSTRING_HEADER_FORMAT, len(data)) + data
+                for data in datagrams
+            ]
+        except TypeError:
+            logger.error(f"data must be bytes - can't send messages")
+            return
+
+        self.sendto_many(msgs, addr=addr)
+
     def datagram_received(self, data, addr):
         """
         Process a datagram received from the transport.
@@ -82,3 +108,30 @@ class NetstringDatagramProtocol(BaseDatagramProtocol):
                 self._on_message_handler(self, self._identity, msg, addr=addr)
         except Exception:
             logger.exception("Error in on_message callback method")
+
+    def datagrams_received(
+        self, datagrams: Sequence[Tuple[Union[bytes, memoryview], Any]]
+    ):
+        """
+        Process a batch of datagrams received from a batched transport.
+
+        :param datagrams: A sequence of (data, addr) tuples.
+        """
+        handler = self._on_message_handler
+        if handler is None:
+            return
+
+        identity = self._identity
+        for data, addr in datagrams:
+            try:
+                (msg_len,) = struct.unpack_from(NETSTRING_HEADER_FORMAT, data)
+            except struct.error:
+                logger.error(f"Discarding datagram with an invalid frame header")
+                continue
+            eom = NETSTRING_HEADER_SIZE + msg_len
+            msg = data[NETSTRING_HEADER_SIZE:eom]
+
+            try:
+                handler(self, identity, msg, addr=addr)
+            except Exception:
+                logger.exception("Error in on_message callback method")
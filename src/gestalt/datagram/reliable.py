@@ -0,0 +1,364 @@
+"""
+Reliable delivery of datagram messages.
+
+Each message sent to a peer is given a sequence number. The receiver
+acknowledges the messages it has received using a cumulative acknowledgement
+plus a bitmap of the messages received beyond it (selective ACK), and asks for
+missing messages as soon as it detects a gap (selective NACK). The sender
+keeps unacknowledged messages in a bounded window and retransmits them when
+they are NACKed or when their retransmission timeout, derived from the
+measured round trip time, expires. Duplicate messages are discarded by the
+receiver.
+
+Messages can be delivered as soon as they arrive (unordered) or in the order
+they were sent (ordered). Ordering is per message type identifier so that a
+lost message only delays later messages of its own type, not unrelated ones.
+
+This module holds the per peer state. The protocol that frames messages and
+runs the timers is :class:`MtiReliableDatagramProtocol`.
+"""
+
+import collections
+
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+# Sequence numbers are carried in uint32 header fields
+SEQUENCE_MASK = 0xFFFFFFFF
+
+# The default number of unacknowledged messages a sender can have in flight
+# to each peer. Further messages wait in a backlog.
+DEFAULT_WINDOW = 256
+
+# Acknowledgements are delayed by this many seconds so that one covers
+# several messages.
+DEFAULT_ACK_DELAY = 0.01
+
+# Retransmission timeout limits, in seconds
+DEFAULT_INITIAL_RTO = 0.25
+DEFAULT_MIN_RTO = 0.05
+DEFAULT_MAX_RTO = 2.0
+
+# A message is abandoned after this many retransmission timeouts
+DEFAULT_MAX_RETRIES = 8
+
+# A message is considered lost once a message sent this many sequence numbers
+# after it has been acknowledged.
+LOSS_THRESHOLD = 3
+
+# The number of messages retransmitted to a peer when the retransmission
+# timeout expires. Their acknowledgement reports the state of the rest.
+PROBES = 2
+
+# The number of seconds a receiver waits for a missing message before it
+# gives up on it and delivers the messages that follow it.
+DEFAULT_DELIVERY_TIMEOUT = 5.0
+
+# The number of messages beyond the cumulative acknowledgement that an ACK
+# reports in its bitmap.
+SACK_BITS = 64
+
+# The largest number of sequence numbers in a NACK
+MAX_NACKS = 128
+
+# Sequence numbers further than this beyond the next expected one are
+# discarded as invalid.
+MAX_SEQUENCE_GAP = 1 << 16
+
+
+def unwrap(sequence: int, reference: int) -> int:
+    """ Return the sequence number closest to a reference sequence number
+    whose lower 32 bits match a received sequence number. This extends
+    received uint32 sequence numbers so that they never wrap around.
+
+    :param sequence: A uint32 sequence number received from a peer.
+
+    :param reference: The sequence number the received one is expected to
+      be close to.
+    """
+    diff = (sequence - reference) & SEQUENCE_MASK
+    if diff > SEQUENCE_MASK >> 1:
+        diff -= SEQUENCE_MASK + 1
+    return reference + diff
+
+
+class Sequencer:
+    """ Puts items received out of order back into sequence.
+
+    Items that arrive ahead of the next expected sequence number are held
+    until the items before them arrive, or until they have been held for
+    longer than a timeout in which case the missing items are skipped.
+    """
+
+    __slots__ = ("next", "held")
+
+    def __init__(self) -> None:
+        self.next = 0
+        # Held items, and the time they arrived, by sequence number
+        self.held = {}  # type: Dict[int, Tuple[float, Any]]
+
+    def __contains__(self, sequence: int) -> bool:
+        """ Return True if an item with this sequence number was added """
+        return sequence < self.next or sequence in self.held
+
+    def add(self, sequence: int, item: Any, now: float) -> List[Any]:
+        """ Add an item.
+
+        :param sequence: The item's sequence number. It must not already
+          have been added.
+
+        :param item: The item.
+
+        :param now: The current time.
+
+        :returns: The items that are now in sequence, in order.
+        """
+        if sequence != self.next:
+            self.held[sequence] = (now, item)
+            return []
+
+        items = [item]
+        self.next += 1
+        if self.held:
+            self._release(items)
+        return items
+
+    def expire(self, now: float, timeout: float) -> Tuple[List[Any], int]:
+        """ Skip the items missing before held items that have waited longer
+        than the timeout.
+
+        :returns: A tuple of the items that are now in sequence and the
+          number of missing items that were skipped.
+        """
+        items = []  # type: List[Any]
+        skipped = 0
+        while self.held:
+            sequence = min(self.held)
+            if now - self.held[sequence][0] < timeout:
+                break
+            skipped += sequence - self.next
+            self.next = sequence
+            self._release(items)
+        return items, skipped
+
+    def _release(self, items: List[Any]) -> None:
+        """ Move held items that are now in sequence to the items list """
+        held = self.held
+        while self.next in held:
+            items.append(held.pop(self.next)[1])
+            self.next += 1
+
+
+class _Pending:
+    """ A message sent to a peer that has not been acknowledged """
+
+    __slots__ = ("frame", "sent", "retries")
+
+    def __init__(self, frame: bytes, sent: float) -> None:
+        self.frame = frame
+        self.sent = sent
+        self.retries = 0
+
+
+class SendState:
+    """ The state of the messages sent to a peer """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        min_rto: float = DEFAULT_MIN_RTO,
+        max_rto: float = DEFAULT_MAX_RTO,
+    ) -> None:
+        self.window = window
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.next_sequence = 0
+        self.stream_sequences = {}  # type: Dict[int, int]
+        # Unacknowledged messages in sequence number order
+        self.pending = collections.OrderedDict()  # type: Dict[int, _Pending]
+        # Messages waiting for room in the window
+        self.backlog = collections.deque()  # type: Deque[Tuple[int, bytes]]
+        self.srtt = None  # type: Optional[float]
+        self.rttvar = 0.0
+        self.rto = min(max(DEFAULT_INITIAL_RTO, min_rto), max_rto)
+
+    def allocate(self, type_identifier: int, ordered: bool) -> Tuple[int, int]:
+        """ Return the sequence number, and the stream sequence number, for
+        the next message.
+        """
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        if not ordered:
+            return sequence, 0
+        stream_sequence = self.stream_sequences.get(type_identifier, 0)
+        self.stream_sequences[type_identifier] = stream_sequence + 1
+        return sequence, stream_sequence
+
+    def release(self, now: float) -> List[bytes]:
+        """ Move messages from the backlog into the window.
+
+        :returns: The frames to send.
+        """
+        frames = []
+        pending = self.pending
+        backlog = self.backlog
+        while backlog and len(pending) < self.window:
+            sequence, frame = backlog.popleft()
+            pending[sequence] = _Pending(frame, now)
+            frames.append(frame)
+        return frames
+
+    def acknowledge(
+        self, cumulative: int, bitmap: int, now: float
+    ) -> Tuple[int, List[bytes]]:
+        """ Remove acknowledged messages from the window, update the round
+        trip time estimate and detect lost messages.
+
+        :param cumulative: The sequence number below which every message has
+          been received.
+
+        :param bitmap: A bitmap of the messages received beyond the
+          cumulative acknowledgement. Bit n is set if the message with
+          sequence number cumulative + 1 + n has been received.
+
+        :param now: The current time.
+
+        :returns: A tuple of the number of messages acknowledged and the
+          frames of lost messages to retransmit.
+        """
+        pending = self.pending
+        acked = []  # type: List[int]
+        for sequence in pending:
+            if sequence >= cumulative:
+                break
+            acked.append(sequence)
+        offset = cumulative + 1
+        while bitmap:
+            if bitmap & 1 and offset in pending:
+                acked.append(offset)
+            bitmap >>= 1
+            offset += 1
+
+        if not acked:
+            return 0, []
+
+        sample = None
+        largest = max(acked)
+        largest_sent = pending[largest].sent
+        for sequence in acked:
+            message = pending.pop(sequence)
+            # Retransmitted messages give ambiguous samples (Karn's algorithm)
+            if message.retries == 0:
+                sample = now - message.sent
+        if sample is not None:
+            self.update_rtt(sample)
+
+        # Messages sent before a later message that has been acknowledged
+        # are lost.
+        lost = []
+        for sequence, message in pending.items():
+            if sequence + LOSS_THRESHOLD > largest:
+                break
+            if message.sent <= largest_sent:
+                message.sent = now
+                message.retries += 1
+                lost.append(message.frame)
+        return len(acked), lost
+
+    def expire(self, now: float, max_retries: int) -> Tuple[List[bytes], int]:
+        """ Handle the expiry of the retransmission timeout of messages.
+
+        A few of the expired messages are retransmitted as probes and the
+        timeout of every expired message is backed off. Messages whose
+        timeout has expired too many times are abandoned.
+
+        :param now: The current time.
+
+        :param max_retries: The number of timeouts after which a message is
+          abandoned.
+
+        :returns: A tuple of the frames to retransmit and the number of
+          messages abandoned.
+        """
+        pending = self.pending
+        frames = []  # type: List[bytes]
+        abandoned = []  # type: List[int]
+        for sequence, message in pending.items():
+            if self.deadline(message) > now:
+                continue
+            if message.retries >= max_retries:
+                abandoned.append(sequence)
+                continue
+            if len(frames) < PROBES:
+                frames.append(message.frame)
+            message.sent = now
+            message.retries += 1
+        for sequence in abandoned:
+            del pending[sequence]
+        return frames, len(abandoned)
+
+    def update_rtt(self, sample: float) -> None:
+        """ Update the round trip time estimate and the retransmission
+        timeout using a measured round trip time, as in RFC 6298.
+        """
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.min_rto), self.max_rto)
+
+    def deadline(self, message: _Pending) -> float:
+        """ Return the time at which a message is retransmitted. The timeout
+        doubles with each retransmission.
+        """
+        return message.sent + min(self.rto * (1 << message.retries), self.max_rto)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ Return the round trip time and window statistics """
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "rto": self.rto,
+            "in_flight": len(self.pending),
+            "backlog": len(self.backlog),
+        }
+
+
+class ReceiveState:
+    """ The state of the messages received from a peer """
+
+    def __init__(self, session: int) -> None:
+        """
+        :param session: The peer's session identifier. A peer chooses a new
+          session identifier when it restarts, which resets the sequence.
+        """
+        self.session = session
+        self.received = Sequencer()
+        self.streams = {}  # type: Dict[int, Sequencer]
+        # The highest sequence number received, used to detect new gaps
+        self.highest = -1
+        self.ack_handle = None  # type: Any
+
+    def ack_bitmap(self) -> int:
+        """ Return the bitmap of the messages received beyond the cumulative
+        acknowledgement.
+        """
+        base = self.received.next + 1
+        bitmap = 0
+        for sequence in self.received.held:
+            offset = sequence - base
+            if 0 <= offset < SACK_BITS:
+                bitmap |= 1 << offset
+        return bitmap
+
+    def missing(self, sequence: int) -> List[int]:
+        """ Record the arrival of a message and return the sequence numbers of
+        the messages before it that are newly known to be missing.
+        """
+        start = max(self.highest + 1, self.received.next)
+        if sequence > self.highest:
+            self.highest = sequence
+        return list(range(start, min(sequence, start + MAX_NACKS)))
@@ -0,0 +1,210 @@
+"""
+Message routing for endpoints that transfer a message type identifier.
+
+A route maps a type identifier to a handler function. Received messages are
+passed to the handler registered for their type identifier using a single
+dict lookup. Messages without a route are passed to the endpoint's on_message
+handler, which acts as the default handler.
+
+Each route has its own policy. A route can decode its messages using a
+different serializer to the endpoint, run its handler in an executor and
+limit how many of its messages are handled concurrently. This allows cheap
+high rate messages to be handled inline while expensive messages are
+handled elsewhere without delaying them.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+
+from concurrent.futures import Executor
+from gestalt import serialization
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+if TYPE_CHECKING:  # pragma: no cover
+
+    class _Endpoint:
+        """ The endpoint attributes that the routing mixin relies on """
+
+        loop = None  # type: asyncio.AbstractEventLoop
+
+        def on_message(self, prot, peer_id: bytes, data: bytes, **kwargs) -> None:
+            pass
+
+
+else:
+    _Endpoint = object
+
+
+class Route:
+    """ The handler and handling policy for a message type """
+
+    __slots__ = ("handler", "codec", "executor", "semaphore", "deferred")
+
+    def __init__(
+        self,
+        handler: Callable,
+        codec: Optional[serialization.bound_codec] = None,
+        executor: Executor = None,
+        concurrency: int = None,
+    ) -> None:
+        """
+        :param handler: The function to call with each message.
+
+        :param codec: The codec used to decode messages. If not specified
+          then the endpoint's codec for the message type is used.
+
+        :param executor: An optional executor to decode and handle messages in.
+
+        :param concurrency: An optional limit on the number of messages that
+          are handled concurrently.
+        """
+        self.handler = handler
+        self.codec = codec
+        self.executor = executor
+        self.semaphore = (
+            asyncio.Semaphore(concurrency) if concurrency is not None else None
+        )
+        # Whether messages may be handled after on_message returns
+        self.deferred = (
+            executor is not None
+            or concurrency is not None
+            or inspect.iscoroutinefunction(handler)
+        )
+
+    def __call__(self, ep, peer_id: bytes, data: bytes, kwargs: Dict) -> Any:
+        """ Decode a message and pass it to the handler """
+        type_identifier = kwargs.get("type_identifier")
+        codec = self.codec or ep.codec_for(type_identifier)
+        message = data  # type: Any
+        if ep.lazy_decode:
+            message = serialization.LazyMessage(
+                data, codec.decode, type_identifier, kwargs
+            )
+        elif data:
+            message = codec.decode(data, type_identifier=type_identifier)
+        return self.handler(ep, message, peer_id=peer_id, **kwargs)
+
+
+class RoutingMixin(_Endpoint):
+    """
+    Adds type identifier based message routing to an endpoint.
+
+    The mixin must precede the endpoint class in the list of base classes so
+    that it can intercept received messages.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._routes = {}  # type: Dict[Optional[int], Route]
+
+    def route(
+        self,
+        type_identifier: int,
+        handler: Callable,
+        *,
+        content_type: str = None,
+        executor: Executor = None,
+        concurrency: int = None,
+    ) -> None:
+        """ Route messages with a type identifier to a handler.
+
+        :param type_identifier: The message type identifier to route.
+
+        :param handler: A function that will be called with each message. It
+          is called in the same way as the endpoint's on_message handler and
+          may be a coroutine function.
+
+        :param content_type: An optional string specifying the serialization
+          used for this message type. If not specified then the codec the
+          endpoint uses for the message type is used.
+
+        :param executor: An optional executor in which messages are decoded
+          and handled. This keeps expensive handlers from blocking the event
+          loop. The handler must be a regular function.
+
+        :param concurrency: An optional limit on the number of messages of
+          this type that are handled at the same time. Further messages wait
+          until a running handler completes.
+        """
+        if executor is not None and inspect.iscoroutinefunction(handler):
+            raise Exception("Handlers run in an executor can not be coroutines")
+        if concurrency is not None and concurrency < 1:
+            raise Exception(f"Invalid concurrency limit {concurrency}")
+
+        codec = serialization.registry.bind(content_type) if content_type else None
+        self._routes[type_identifier] = Route(
+            handler, codec, executor=executor, concurrency=concurrency
+        )
+
+    def unroute(self, type_identifier: int) -> None:
+        """ Remove the route for a type identifier. Subsequent messages of
+        this type are passed to the on_message handler.
+
+        :param type_identifier: The message type identifier to stop routing.
+        """
+        self._routes.pop(type_identifier, None)
+
+    def on_message(self, prot, peer_id: bytes, data: bytes, **kwargs) -> None:
+        """ Called by a protocol when it receives a message from a peer.
+
+        :param prot: The protocol instance the received the message.
+
+        :param peer_id: The peer's unique identity which can be used to route
+          messages back to the originator.
+
+        :param data: The message payload.
+        """
+        route = self._routes.get(kwargs.get("type_identifier"))
+        if route is None:
+            super().on_message(prot, peer_id, data, **kwargs)
+            return
+
+        if route.deferred and type(data) is memoryview:
+            # Don't hold on to pooled receive buffers while messages wait
+            data = bytes(data)
+
+        if route.executor is not None or route.semaphore is not None:
+            self.loop.create_task(self._handle_routed(route, peer_id, data, kwargs))
+            return
+
+        # Don't let poor user code break the library
+        try:
+            maybe_awaitable = route(self, peer_id, data, kwargs)
+            if inspect.isawaitable(maybe_awaitable):
+                asyncio.ensure_future(maybe_awaitable, loop=self.loop)
+        except Exception:
+            type_identifier = kwargs.get("type_identifier")
+            logger.exception(f"Error in route handler for type {type_identifier}")
+
+    async def _handle_routed(
+        self, route: Route, peer_id: bytes, data: bytes, kwargs: Dict
+    ) -> None:
+        """ Handle a message using the route's executor and concurrency limit """
+        if route.semaphore is not None:
+            async with route.semaphore:
+                await self._call_routed(route, peer_id, data, kwargs)
+        else:
+            await self._call_routed(route, peer_id, data, kwargs)
+
+    async def _call_routed(
+        self, route: Route, peer_id: bytes, data: bytes, kwargs: Dict
+    ) -> None:
+        try:
+            if route.executor is not None:
+                await self.loop.run_in_executor(
+                    route.executor,
+                    functools.partial(route, self, peer_id, data, kwargs),
+                )
+            else:
+                maybe_awaitable = route(self, peer_id, data, kwargs)
+                if inspect.isawaitable(maybe_awaitable):
+                    await maybe_awaitable
+        except Exception:
+            type_identifier = kwargs.get("type_identifier")
+            logger.exception(f"Error in route handler for type {type_identifier}")
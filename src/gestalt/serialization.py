@@ -1,52 +1,143 @@
 import abc
+import ast
+import functools
+import importlib.util
 import io
 import json
+import operator
+import struct
+import sys
 
 from collections import namedtuple
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    from avro import io as avro_io
-    from avro import schema
 
-    have_avro = True
-except ImportError:
-    have_avro = False
+def _lazy_import(name: str):
+    """ Return a module that is only loaded when one of its attributes is
+    first accessed, or None if the module is not installed.
 
-try:
-    import msgpack
+    Optional serializers are registered using lazily loaded modules so that
+    importing this module does not pay the cost of importing every backing
+    library. A library is imported the first time its serializer is used.
 
-    have_msgpack = True
-except ImportError:
-    have_msgpack = False
+    :param name: The absolute name of the module to import.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None or spec.loader is None:
+        return None
+
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    # Make a submodule available as an attribute of its parent package, as a
+    # regular import would.
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+
+    return module
+
+
+avro_io = _lazy_import("avro.io")
+schema = _lazy_import("avro.schema")
+have_avro = avro_io is not None and schema is not None
+
+fastavro = _lazy_import("fastavro")
+have_fastavro = fastavro is not None
 
-try:
-    import yaml
+orjson = _lazy_import("orjson")
+have_orjson = orjson is not None
 
-    have_yaml = True
-except ImportError:
-    have_yaml = False
+ujson = _lazy_import("ujson")
+have_ujson = ujson is not None
 
-try:
-    from google.protobuf.message import Message
-    from google.protobuf import symbol_database
+rapidjson = _lazy_import("rapidjson")
+have_rapidjson = rapidjson is not None
 
-    have_protobuf = True
-except ImportError:
-    have_protobuf = False
+msgpack = _lazy_import("msgpack")
+have_msgpack = msgpack is not None
+
+yaml = _lazy_import("yaml")
+have_yaml = yaml is not None
+
+np = _lazy_import("numpy")
+have_numpy = np is not None
+
+protobuf_message = _lazy_import("google.protobuf.message")
+have_protobuf = protobuf_message is not None
 
 
 CONTENT_TYPE_AVRO = "application/x-avro"
 CONTENT_TYPE_DATA = "application/data"
 CONTENT_TYPE_JSON = "application/json"
 CONTENT_TYPE_MSGPACK = "application/msgpack"
+CONTENT_TYPE_NUMPY = "application/x-numpy"
 CONTENT_TYPE_PROTOBUF = "application/vnd.google.protobuf"
+CONTENT_TYPE_STRUCT = "application/x-struct"
 CONTENT_TYPE_TEXT = "text/plain"
 CONTENT_TYPE_YAML = "application/yaml"
 
+JSON_BACKEND_ORJSON = "orjson"
+JSON_BACKEND_UJSON = "ujson"
+JSON_BACKEND_RAPIDJSON = "rapidjson"
+JSON_BACKEND_STDLIB = "json"
+
+AVRO_BACKEND_FASTAVRO = "fastavro"
+AVRO_BACKEND_AVRO = "avro"
+
+# Batches of objects encoded by the default ISerializer.encode_many
+# implementation are a sequence of length prefixed items.
+#
+#     | Length | Item | Length | Item | ...
+#
+BATCH_ITEM_HEADER_FORMAT = "<I"
+BATCH_ITEM_HEADER_SIZE = struct.calcsize(BATCH_ITEM_HEADER_FORMAT)
+
+# NumPy arrays are encoded using the NumPy .npy format version 1.0, a magic
+# string, a little-endian uint16 header length and a header describing the
+# dtype, order and shape followed by the raw array data. Headers are padded
+# so that the array data is aligned.
+NUMPY_MAGIC = b"\x93NUMPY\x01\x00"
+NUMPY_HEADER_FORMAT = "<8sH"
+NUMPY_HEADER_SIZE = struct.calcsize(NUMPY_HEADER_FORMAT)
+NUMPY_ALIGNMENT = 64
+
+# JSON backends in order of preference (fastest first)
+JSON_BACKENDS = (
+    JSON_BACKEND_ORJSON,
+    JSON_BACKEND_UJSON,
+    JSON_BACKEND_RAPIDJSON,
+    JSON_BACKEND_STDLIB,
+)
+
 
 codec = namedtuple("codec", ("content_type", "content_encoding", "serializer"))
 
+# A codec resolved by SerializerRegistry.bind. The encode and decode fields
+# are callables that can be used directly, without any registry lookups.
+bound_codec = namedtuple(
+    "bound_codec",
+    (
+        "name",
+        "content_type",
+        "content_encoding",
+        "serializer",
+        "encode",
+        "decode",
+        "encode_many",
+        "decode_many",
+    ),
+)
+
 
 class ISerializer(abc.ABC):
     """
@@ -61,6 +152,129 @@ class ISerializer(abc.ABC):
     def decode(self, data, **kwargs):
         """ Returns deserialized data """
 
+    def encode_many(self, items, **kwargs) -> bytes:
+        """ Returns a sequence of objects serialized as a single bytes object.
+
+        This default implementation encodes each item separately and
+        prefixes it with its length. Serializers that natively support
+        streams of objects should override this method, along with
+        decode_many.
+        """
+        return _pack_items([self.encode(item, **kwargs) for item in items])
+
+    def decode_many(self, data, **kwargs) -> list:
+        """ Returns a list of objects deserialized from data created by
+        encode_many.
+        """
+        return [self.decode(item, **kwargs) for item in _unpack_items(data)]
+
+
+# Marks a LazyMessage that has not been decoded yet
+_NOT_DECODED = object()
+
+
+class LazyMessage:
+    """ A received message that is only decoded when its data is accessed.
+
+    Handlers that only inspect the type identifier or metadata (e.g. to route
+    a message) never pay the cost of decoding the payload. The decoded data
+    is cached so the payload is decoded at most once.
+
+    Any error raised by the decoder is raised when data is accessed.
+    """
+
+    __slots__ = ("raw", "type_identifier", "metadata", "_decode", "_data")
+
+    def __init__(
+        self, raw, decode, type_identifier: int = None, metadata: dict = None
+    ) -> None:
+        """
+        :param raw: The bytes-like object containing the received payload.
+
+        :param decode: A callable that decodes the payload. It is called
+          with the raw payload and a type_identifier keyword argument.
+
+        :param type_identifier: An optional message type identifier.
+
+        :param metadata: An optional dict of message metadata (e.g. headers).
+        """
+        self.raw = raw
+        self.type_identifier = type_identifier
+        self.metadata = metadata if metadata is not None else {}
+        self._decode = decode
+        self._data = _NOT_DECODED
+
+    @property
+    def data(self) -> Any:
+        """ Return the decoded message, decoding it on first access """
+        if self._data is _NOT_DECODED:
+            if self.raw:
+                self._data = self._decode(
+                    self.raw, type_identifier=self.type_identifier
+                )
+            else:
+                self._data = self.raw
+        return self._data
+
+    @property
+    def decoded(self) -> bool:
+        """ Return True if the message has been decoded """
+        return self._data is not _NOT_DECODED
+
+    def copy(self) -> "LazyMessage":
+        """ Return a copy of the message that owns its payload.
+
+        Messages received in zero copy mode refer to a pooled receive buffer,
+        which can't be reused while the message is kept. Keep a copy instead
+        so that the buffer is returned to the pool.
+        """
+        raw = self.raw if isinstance(self.raw, bytes) else bytes(self.raw)
+        return LazyMessage(raw, self._decode, self.type_identifier, self.metadata)
+
+    def __repr__(self):
+        return (
+            f"<LazyMessage type_identifier={self.type_identifier} "
+            f"size={len(self.raw)} decoded={self.decoded}>"
+        )
+
+
+def _is_buffer(data) -> bool:
+    """ Return True if data supports the buffer protocol (e.g. bytes,
+    bytearray, memoryview).
+    """
+    try:
+        memoryview(data)
+    except TypeError:
+        return False
+    return True
+
+
+def _pack_items(payloads) -> bytes:
+    """ Join serialized items into a batch of length prefixed items. """
+    parts = []
+    for payload in payloads:
+        parts.append(struct.pack(BATCH_ITEM_HEADER_FORMAT, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def _unpack_items(data) -> list:
+    """ Split a batch of length prefixed items into memoryview slices. """
+    view = memoryview(data).cast("B")
+    items = []
+    offset = 0
+    end = len(view)
+    while offset < end:
+        start = offset + BATCH_ITEM_HEADER_SIZE
+        if start > end:
+            raise Exception("Batch payload is truncated")
+        (length,) = struct.unpack(BATCH_ITEM_HEADER_FORMAT, view[offset:start])
+        offset = start + length
+        if offset > end:
+            raise Exception("Batch payload is truncated")
+        items.append(view[start:offset])
+    return items
+
 
 class SerializerRegistry:
     """ This registry keeps track of serialization strategies.
@@ -74,6 +288,7 @@ class SerializerRegistry:
         self._default_codec = None
         self.type_to_name = {}
         self.name_to_type = {}
+        self._bound = {}
 
     def register(
         self,
@@ -101,6 +316,9 @@ class SerializerRegistry:
 
         self._serializers[name] = codec(content_type, content_encoding, serializer)
 
+        # Registering a serializer may replace one that has already been bound.
+        self._bound.clear()
+
         # map convenience name to mime-type and back again.
         self.type_to_name[content_type] = name
         self.name_to_type[name] = content_type
@@ -146,6 +364,47 @@ class SerializerRegistry:
         name = self._resolve(name_or_type)
         return self._serializers[name]
 
+    def bind(self, name_or_type: Optional[str]) -> bound_codec:
+        """ Return a resolved codec for a specific serializer.
+
+        Resolving the serializer once and then using the returned codec's
+        encode and decode callables avoids the registry lookups performed by
+        `dumps` and `loads` on every message. Bound codecs are cached so
+        repeated calls are cheap.
+
+        The codec for the none serializer (e.g. application/data) encodes
+        using the same best guess as `dumps`.
+
+        :param name_or_type: a string specifying the serialization strategy.
+          The string may be the convenience name (e.g. json) or the mime-type
+          (e.g. application/json).
+
+        :returns: A bound_codec named tuple.
+
+        Raises:
+            Exception: If the serialization method requested is not available.
+        """
+        try:
+            return self._bound[name_or_type]
+        except KeyError:
+            pass
+
+        name = self._resolve(name_or_type)
+        content_type, content_encoding, serializer = self._serializers[name]
+        encode = serializer.encode if name else self._encode_untyped
+        bound = bound_codec(
+            name,
+            content_type,
+            content_encoding,
+            serializer,
+            encode,
+            serializer.decode,
+            serializer.encode_many,
+            serializer.decode_many,
+        )
+        self._bound[name_or_type] = bound
+        return bound
+
     def dumps(
         self, data: Any, name_or_type: str = None, **kwargs
     ) -> Tuple[Optional[str], str, bytes]:
@@ -185,7 +444,7 @@ class SerializerRegistry:
 
         else:
             # Make a best guess based on data type
-            if isinstance(data, bytes):
+            if isinstance(data, (bytes, bytearray, memoryview)):
                 content_type = CONTENT_TYPE_DATA
                 content_encoding = "binary"
                 payload = data
@@ -247,7 +506,80 @@ class SerializerRegistry:
 
         return data
 
-    def _resolve(self, x: str) -> str:
+    def dumps_many(
+        self, items, name_or_type: str = None, **kwargs
+    ) -> Tuple[Optional[str], str, bytes]:
+        """ Encode a sequence of objects into a single payload.
+
+        Encoding many objects in one call avoids the per-object dispatch
+        overhead of `dumps`. Serializers with native support for streams
+        of objects (e.g. msgpack, avro) use it, others encode each object
+        and join them as length prefixed items.
+
+        :param items: A sequence of objects to encode.
+
+        :param name_or_type: A string representing the serialization strategy
+          to apply to the data (e.g. ``json``, etc). If not specified then
+          the default serializer is used.
+
+        Keywords:
+
+          :param type_identifier: An integer that uniquely identifies a
+            registered message. All of the objects must be of this type.
+
+        :returns: A string specifying the content type (e.g.,
+          `application/json`), a string specifying the content encoding, (e.g.
+          `utf-8`) and the serialized data as bytes.
+
+        Raises:
+            Exception: If the serialization method requested is not available.
+        """
+        name = self._resolve(name_or_type) if name_or_type else self._default_codec
+        content_type, content_encoding, serializer = self._serializers[name]
+        payload = serializer.encode_many(items, **kwargs)
+        return content_type, content_encoding, payload
+
+    def loads_many(
+        self,
+        data: bytes,
+        content_type: Optional[str],
+        content_encoding: Optional[str],
+        **kwargs,
+    ) -> list:
+        """ Decode a payload created by `dumps_many`.
+
+        :param data: The message data to deserialize.
+
+        :param content_type: The content-type of the data (e.g., application/json).
+
+        :param content_encoding: The content-encoding of the data. (e.g., utf-8,
+          binary). NOTE: This parameter is not currently used.
+
+        Keywords:
+
+          :param type_identifier: An integer that uniquely identifies a
+            registered message.
+
+        Raises:
+            Exception: If the serialization method requested is not available.
+        Returns:
+            A list of the deserialized objects.
+        """
+        content_type = content_type if content_type else CONTENT_TYPE_DATA
+
+        if data:
+            name = self._resolve(content_type)
+            _ct, _ce, serializer = self._serializers[name]
+            return serializer.decode_many(data, **kwargs)
+
+        return []
+
+    def _encode_untyped(self, data: Any, **kwargs) -> bytes:
+        """ Encode data using a best guess based on its type. """
+        _content_type, _content_encoding, payload = self.dumps(data)
+        return payload
+
+    def _resolve(self, x: Optional[str]) -> Optional[str]:
         """ Return a serializer alias string.
 
         :param x: a string specifying the serialization strategy.
@@ -268,8 +600,10 @@ def register_none(reg: SerializerRegistry):
     class NoneSerializer(ISerializer):
         def encode(self, data, **kwargs):
             """ Returns serialized data as a bytes object. """
-            if not isinstance(data, bytes):
-                raise Exception(f"Can only serialize bytes, got {type(data)}")
+            if not _is_buffer(data):
+                raise Exception(
+                    f"Can only serialize bytes-like objects, got {type(data)}"
+                )
             return data
 
         def decode(self, data, **kwargs):
@@ -296,11 +630,11 @@ def register_text(reg: SerializerRegistry) -> None:
         def decode(self, data: bytes, **kwargs) -> str:
             """ Decode *data* from :class:`bytes` to the original data structure.
 
-            :param data: a bytes object containing a serialized message.
+            :param data: a bytes-like object containing a serialized message.
 
             :returns: A str object.
             """
-            return data.decode("utf-8")
+            return str(data, "utf-8")
 
     serializer = TextSerializer()
     reg.register(
@@ -308,27 +642,113 @@ def register_text(reg: SerializerRegistry) -> None:
     )
 
 
-def register_json(reg: SerializerRegistry) -> None:
-    """ Register an encoder/decoder for JSON serialization. """
+def _json_default(obj):
+    """ Convert objects that the JSON backends can't natively serialize.
+
+    NumPy arrays and scalars provide a tolist method that returns native
+    Python objects.
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def register_json(
+    reg: SerializerRegistry, backend: str = None, numpy: bool = False, **options
+) -> None:
+    """ Register an encoder/decoder for JSON serialization.
+
+    The fastest available JSON backend (orjson, ujson, rapidjson and then
+    the standard library json module) is used unless a specific backend is
+    requested. All backends are registered under the same content type so
+    the choice is not visible to receivers.
+
+    :param backend: An optional JSON backend name (e.g. orjson, json) to
+      use instead of the fastest available backend.
+
+    :param numpy: Support encoding NumPy arrays and scalars.
+
+    :param options: Additional keyword arguments passed to the backend's
+      dumps function (e.g. option for orjson, sort_keys for json).
+
+    Raises:
+        Exception: If the requested backend is not available.
+    """
+    available = {
+        JSON_BACKEND_ORJSON: have_orjson,
+        JSON_BACKEND_UJSON: have_ujson,
+        JSON_BACKEND_RAPIDJSON: have_rapidjson,
+        JSON_BACKEND_STDLIB: True,
+    }
+    if backend is None:
+        backend = next(name for name in JSON_BACKENDS if available[name])
+    elif not available.get(backend):
+        raise Exception(f"JSON backend '{backend}' is not available")
 
     class JsonSerializer(ISerializer):
+        def __init__(self, backend: str, numpy: bool = False, **options):
+            """
+            :param backend: The name of the JSON backend to use.
+
+            :param numpy: Support encoding NumPy arrays and scalars.
+
+            :param options: Additional keyword arguments passed to the
+              backend's dumps function.
+            """
+            self.backend = backend
+            self._numpy = numpy
+            self._options = options
+            # The backend is imported when the first message is encoded or
+            # decoded, at which point these are replaced.
+            self._dumps = lambda data: self._load()[0](data)
+            self._loads = lambda data: self._load()[1](data)
+
+        def _load(self):
+            """ Resolve the backend's dumps and loads functions """
+            options = dict(self._options)
+            if self.backend == JSON_BACKEND_ORJSON:
+                # Match the standard library's handling of non-str dict keys
+                option = options.pop("option", 0) | orjson.OPT_NON_STR_KEYS
+                if self._numpy:
+                    option |= orjson.OPT_SERIALIZE_NUMPY
+                self._dumps = functools.partial(orjson.dumps, option=option, **options)
+                self._loads = orjson.loads
+            else:
+                if self._numpy:
+                    options.setdefault("default", _json_default)
+                if self.backend == JSON_BACKEND_UJSON:
+                    dumps, loads = ujson.dumps, ujson.loads
+                elif self.backend == JSON_BACKEND_RAPIDJSON:
+                    dumps, loads = rapidjson.dumps, rapidjson.loads
+                else:
+                    dumps, loads = json.dumps, json.loads
+                dumps = functools.partial(dumps, **options)
+                self._dumps = lambda data: dumps(data).encode("utf-8")
+                self._loads = loads
+            return self._dumps, self._loads
+
         def encode(self, data: Any, **kwargs) -> bytes:
             """ Encode an object into JSON and return a :class:`bytes` object.
 
             :returns: a serialized message as a bytes object.
             """
-            return json.dumps(data).encode("utf-8")
+            return self._dumps(data)
 
         def decode(self, data: bytes, **kwargs) -> str:
             """ Decode *data* from :class:`bytes` to the original data structure.
 
-            :param data: a bytes object containing a serialized message.
+            :param data: a bytes-like object containing a serialized message.
 
             :returns: A Python object.
             """
-            return json.loads(data if isinstance(data, str) else data.decode("utf-8"))
-
-    serializer = JsonSerializer()
+            if (
+                not isinstance(data, (str, bytes))
+                and self.backend != JSON_BACKEND_ORJSON
+            ):
+                data = str(data, "utf-8")
+            return self._loads(data)
+
+    serializer = JsonSerializer(backend, numpy=numpy, **options)
     reg.register(
         "json", serializer, content_type=CONTENT_TYPE_JSON, content_encoding="utf-8"
     )
@@ -357,12 +777,31 @@ def register_msgpack(reg: SerializerRegistry) -> None:
             def decode(self, data: bytes, **kwargs) -> str:
                 """ Decode *data* from :class:`bytes` to the original data structure.
 
-                :param data: a bytes object containing a serialized message.
+                :param data: a bytes-like object containing a serialized message.
 
                 :returns: A Python object.
                 """
                 return msgpack.unpackb(data, raw=False)
 
+            def encode_many(self, items, **kwargs) -> bytes:
+                """ Encode a sequence of objects into a stream of MsgPack
+                objects.
+                """
+                packer = msgpack.Packer(use_bin_type=True, autoreset=False)
+                for item in items:
+                    packer.pack(item)
+                return packer.bytes()
+
+            def decode_many(self, data, **kwargs) -> list:
+                """ Decode a stream of MsgPack objects. """
+                size = memoryview(data).nbytes
+                unpacker = msgpack.Unpacker(raw=False, max_buffer_size=size)
+                unpacker.feed(data)
+                items = list(unpacker)
+                if unpacker.tell() != size:
+                    raise Exception("Batch payload is truncated")
+                return items
+
         serializer = MsgpackSerializer()
         reg.register(
             "msgpack",
@@ -392,11 +831,11 @@ def register_yaml(reg: SerializerRegistry) -> None:
             def decode(self, data: bytes, **kwargs) -> str:
                 """ Decode *data* from :class:`bytes` to the original data structure.
 
-                :param data: a bytes object containing a serialized message.
+                :param data: a bytes-like object containing a serialized message.
 
                 :returns: A Python object.
                 """
-                return yaml.safe_load(data.decode("utf-8"))
+                return yaml.safe_load(str(data, "utf-8"))
 
         serializer = YamlSerializer()
         reg.register(
@@ -404,25 +843,55 @@ def register_yaml(reg: SerializerRegistry) -> None:
         )
 
 
-def register_avro(reg: SerializerRegistry, schema_registry=None):
-    """ Register an encoder/decoder for Apache Avro serialization. """
+def register_avro(reg: SerializerRegistry, schema_registry=None, backend: str = None):
+    """ Register an encoder/decoder for Apache Avro serialization.
 
-    if have_avro:
+    Avro data is encoded without an embedded schema. The schema is looked
+    up in a schema registry using a type identifier that is transferred
+    alongside the data (e.g. in a MTI frame header or the x-type-id AMQP
+    header).
+
+    The fastavro package is used when it is installed as it is much faster
+    than the pure Python avro package.
+
+    :param schema_registry: An optional schema registry populated with the
+      schemas that will be used.
+
+    :param backend: An optional Avro backend name (e.g. fastavro, avro) to
+      use instead of the fastest available backend.
+
+    Raises:
+        Exception: If the requested backend is not available.
+    """
+
+    if have_avro or have_fastavro:
+
+        available = {AVRO_BACKEND_FASTAVRO: have_fastavro, AVRO_BACKEND_AVRO: have_avro}
+        if backend is None:
+            backend = AVRO_BACKEND_FASTAVRO if have_fastavro else AVRO_BACKEND_AVRO
+        elif not available.get(backend):
+            raise Exception(f"Avro backend '{backend}' is not available")
 
         class SchemaRegistry:
             def __init__(self):
-                self.id2schema = {}  # type: Dict[int, schema.Schema]
+                self.id2schema = {}  # type: Dict[int, Any]
                 self._id = 0
+                # Objects derived from a schema are created on first use and
+                # cached so they are not rebuilt for every message.
+                self._writers = {}  # type: Dict[int, Any]
+                self._readers = {}  # type: Dict[int, Any]
+                self._parsed = {}  # type: Dict[int, Any]
 
             def register_message(self, obj: dict, type_identifier: int = None) -> int:
                 """
-                :param obj: A message object to register.
+                :param obj: A message object to register. This may be a
+                  schema dict or a schema object from the avro package.
 
                 :param type_identifier: An optional message type identifier to
                   use for the object. If not specified then a number will be
                   automatically assigned.
                 """
-                if isinstance(obj, dict):
+                if isinstance(obj, dict) and have_avro:
                     avro_schema = schema.SchemaFromJSONData(obj, schema.Names())
                 else:
                     avro_schema = obj
@@ -432,18 +901,70 @@ def register_avro(reg: SerializerRegistry, schema_registry=None):
                     type_identifier = self._id
 
                 self.id2schema[type_identifier] = avro_schema
+                self._writers.pop(type_identifier, None)
+                self._readers.pop(type_identifier, None)
+                self._parsed.pop(type_identifier, None)
                 return type_identifier
 
-            def get_schema_by_id(self, schema_identifier: int) -> int:
+            def get_schema_by_id(self, schema_identifier: int) -> Any:
                 return self.id2schema[schema_identifier]
 
+            def get_datum_writer(self, schema_identifier: int):
+                """ Return a cached avro DatumWriter for a schema """
+                try:
+                    return self._writers[schema_identifier]
+                except KeyError:
+                    writer = avro_io.DatumWriter(
+                        self.get_schema_by_id(schema_identifier)
+                    )
+                    self._writers[schema_identifier] = writer
+                    return writer
+
+            def get_datum_reader(self, schema_identifier: int):
+                """ Return a cached avro DatumReader for a schema """
+                try:
+                    return self._readers[schema_identifier]
+                except KeyError:
+                    reader = avro_io.DatumReader(
+                        self.get_schema_by_id(schema_identifier)
+                    )
+                    self._readers[schema_identifier] = reader
+                    return reader
+
+            def get_parsed_schema(self, schema_identifier: int):
+                """ Return a cached fastavro parsed schema """
+                try:
+                    return self._parsed[schema_identifier]
+                except KeyError:
+                    obj = self.get_schema_by_id(schema_identifier)
+                    if not isinstance(obj, dict):
+                        # A schema object from the avro package
+                        obj = obj.to_json()
+                    parsed = fastavro.parse_schema(obj)
+                    self._parsed[schema_identifier] = parsed
+                    return parsed
+
         class AvroSerializer(ISerializer):
-            def __init__(self, schema_registry=None):
+            def __init__(self, schema_registry=None, backend: str = AVRO_BACKEND_AVRO):
                 """
                 :param schema_registry: A schema.Schema object populated with the
                   schemas that will be used.
+
+                :param backend: The name of the Avro backend to use.
                 """
                 self.registry = schema_registry if schema_registry else SchemaRegistry()
+                self.backend = backend
+
+            @staticmethod
+            def _schema_id(type_identifier: Optional[int]) -> int:
+                """ Return the identifier of the schema to use.
+
+                Raises:
+                    Exception: If no type identifier was specified.
+                """
+                if type_identifier is None:
+                    raise Exception("Avro serialization requires a type_identifier")
+                return type_identifier
 
             def encode(
                 self, data, *, type_identifier: int = None, **kwargs
@@ -452,11 +973,14 @@ def register_avro(reg: SerializerRegistry, schema_registry=None):
 
                 :returns: a serialized message as a bytes object.
                 """
-                avroSchema = self.registry.get_schema_by_id(type_identifier)
+                schema_id = self._schema_id(type_identifier)
                 bytes_writer = io.BytesIO()
-                encoder = avro_io.BinaryEncoder(bytes_writer)
-                datum_writer = avro_io.DatumWriter(avroSchema)
-                datum_writer.write(data, encoder)
+                if self.backend == AVRO_BACKEND_FASTAVRO:
+                    parsed_schema = self.registry.get_parsed_schema(schema_id)
+                    fastavro.schemaless_writer(bytes_writer, parsed_schema, data)
+                else:
+                    datum_writer = self.registry.get_datum_writer(schema_id)
+                    datum_writer.write(data, avro_io.BinaryEncoder(bytes_writer))
                 return bytes_writer.getvalue()
 
             def decode(
@@ -472,13 +996,55 @@ def register_avro(reg: SerializerRegistry, schema_registry=None):
 
                 :returns: A Python object.
                 """
-                avroSchema = self.registry.get_schema_by_id(type_identifier)
+                schema_id = self._schema_id(type_identifier)
+                bytes_reader = io.BytesIO(data)
+                if self.backend == AVRO_BACKEND_FASTAVRO:
+                    parsed_schema = self.registry.get_parsed_schema(schema_id)
+                    return fastavro.schemaless_reader(bytes_reader, parsed_schema)
+                datum_reader = self.registry.get_datum_reader(schema_id)
+                return datum_reader.read(avro_io.BinaryDecoder(bytes_reader))
+
+            def encode_many(
+                self, items, *, type_identifier: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Encode a sequence of objects, that share a schema, into a
+                block of consecutive Avro datums.
+                """
+                schema_id = self._schema_id(type_identifier)
+                bytes_writer = io.BytesIO()
+                if self.backend == AVRO_BACKEND_FASTAVRO:
+                    parsed_schema = self.registry.get_parsed_schema(schema_id)
+                    for item in items:
+                        fastavro.schemaless_writer(bytes_writer, parsed_schema, item)
+                else:
+                    datum_writer = self.registry.get_datum_writer(schema_id)
+                    encoder = avro_io.BinaryEncoder(bytes_writer)
+                    for item in items:
+                        datum_writer.write(item, encoder)
+                return bytes_writer.getvalue()
+
+            def decode_many(
+                self, data, *, type_identifier: int = None, **kwargs
+            ):  # pylint: disable=arguments-differ
+                """ Decode a block of consecutive Avro datums. """
+                schema_id = self._schema_id(type_identifier)
                 bytes_reader = io.BytesIO(data)
-                decoder = avro_io.BinaryDecoder(bytes_reader)
-                datum_reader = avro_io.DatumReader(avroSchema)
-                return datum_reader.read(decoder)
+                size = memoryview(data).nbytes
+                items = []
+                if self.backend == AVRO_BACKEND_FASTAVRO:
+                    parsed_schema = self.registry.get_parsed_schema(schema_id)
+                    while bytes_reader.tell() < size:
+                        items.append(
+                            fastavro.schemaless_reader(bytes_reader, parsed_schema)
+                        )
+                else:
+                    datum_reader = self.registry.get_datum_reader(schema_id)
+                    decoder = avro_io.BinaryDecoder(bytes_reader)
+                    while bytes_reader.tell() < size:
+                        items.append(datum_reader.read(decoder))
+                return items
 
-        serializer = AvroSerializer(schema_registry=schema_registry)
+        serializer = AvroSerializer(schema_registry=schema_registry, backend=backend)
         reg.register(
             "avro",
             serializer,
@@ -487,43 +1053,62 @@ def register_avro(reg: SerializerRegistry, schema_registry=None):
         )
 
 
-def register_protobuf(reg: SerializerRegistry, object_registry=None) -> None:
-    """ Register an encoder/decoder for Google Protocol Buffers serialization. """
+def register_protobuf(
+    reg: SerializerRegistry, object_registry=None, reuse_messages: bool = False
+) -> None:
+    """ Register an encoder/decoder for Google Protocol Buffers serialization.
+
+    :param object_registry: An optional object registry populated with the
+      messages that will be used.
+
+    :param reuse_messages: Decode messages into a single reused message
+      object per type instead of creating a new object for each message.
+      See ProtobufSerializer for details.
+    """
 
     if have_protobuf:
 
         class ObjectRegistry:
             def __init__(self):
-                self.symDb = symbol_database.Default()
                 self.id2sym = {}
                 self.sym2id = {}
+                # The message classes are cached when registered so that no
+                # symbol database lookups are needed for each message.
+                self.id2cls = {}  # type: Dict[int, Any]
+                self.cls2id = {}  # type: Dict[Any, int]
                 self._id = 0
 
-            def register_message(
-                self, obj: Message, type_identifier: int = None
-            ) -> int:
+            def register_message(self, obj: Any, type_identifier: int = None) -> int:
                 """
-                :param obj: A message object to register.
+                :param obj: A message class, or message object, to register.
 
                 :param type_identifier: An optional message type identifier to
                   use for the object. If not specified then a number will be
                   automatically assigned.
                 """
-                symbol_name = obj.DESCRIPTOR.name
+                message_class = obj if isinstance(obj, type) else type(obj)  # type: Any
+                symbol_name = message_class.DESCRIPTOR.name
                 if type_identifier is None:
                     self._id += 1
                     type_identifier = self._id
                 self.id2sym[type_identifier] = symbol_name
                 self.sym2id[symbol_name] = type_identifier
+                self.id2cls[type_identifier] = message_class
+                self.cls2id[message_class] = type_identifier
                 return type_identifier
 
-            def get_object_by_id(self, type_identifier: int) -> str:
-                symbol_name = self.id2sym.get(type_identifier)
-                messageClass = self.symDb.GetSymbol(symbol_name)
-                return messageClass()
+            def get_class_by_id(self, type_identifier: int):
+                return self.id2cls[type_identifier]
+
+            def get_object_by_id(self, type_identifier: int) -> Any:
+                return self.id2cls[type_identifier]()
 
-            def get_id_for_object(self, obj: Message) -> int:
-                return self.sym2id[obj.DESCRIPTOR.name]
+            def get_id_for_object(self, obj: Any) -> int:
+                try:
+                    return self.cls2id[type(obj)]
+                except KeyError:
+                    # A different class that describes a registered message
+                    return self.sym2id[obj.DESCRIPTOR.name]
 
         class ProtobufSerializer(ISerializer):
             """ Google Protocol Buffers serialization.
@@ -547,19 +1132,42 @@ def register_protobuf(reg: SerializerRegistry, object_registry=None) -> None:
 
             This serializer relies on an object registry to manage the associated
             between an identifier and an object. The identifier is used as a
-            lookup key to construct the message class object from the symbol
-            database and decode data into it.
-
-            When a pb2 file is imported it automatically adds the messages to the
-            default symbol database.
+            lookup key to construct the message class object and decode data
+            into it. The message classes are cached by the registry when they
+            are registered.
+
+            Creating a message object for every decoded message can be avoided
+            by enabling message reuse. In this mode each message type has a
+            single message object that is cleared and reparsed for every
+            message. This is only suitable for consumers that process each
+            message synchronously and do not keep references to the decoded
+            message, because the object is overwritten by the next message of
+            the same type.
             """
 
-            def __init__(self, object_registry=None):
+            def __init__(self, object_registry=None, reuse_messages: bool = False):
                 """
                 :param object_registry: An object that is responsible for translating
                   a Protocol Buffers object to a type identifier and back.
+
+                :param reuse_messages: Decode messages into a reused message
+                  object per type. Defaults to False.
                 """
                 self.registry = object_registry if object_registry else ObjectRegistry()
+                self.reuse_messages = reuse_messages
+                self._pool = {}  # type: Dict[int, Any]
+
+            @staticmethod
+            def _type_identifier(kwargs: Dict[str, Any]) -> int:
+                """ Return the type identifier of the message to decode.
+
+                Raises:
+                    Exception: If no type identifier was specified.
+                """
+                type_identifier = kwargs.get("type_identifier")
+                if type_identifier is None:
+                    raise Exception("Protobuf decoding requires a type_identifier")
+                return type_identifier
 
             def encode(self, obj, **kwargs):  # pylint: disable=arguments-differ
                 """ Encode the given object and return a :class:`bytes` object.
@@ -568,7 +1176,7 @@ def register_protobuf(reg: SerializerRegistry, object_registry=None) -> None:
 
                 :returns: a serialized message as a bytes object.
                 """
-                assert isinstance(obj, Message)
+                assert isinstance(obj, protobuf_message.Message)
                 return obj.SerializeToString()
 
             def decode(self, data: bytes, **kwargs):
@@ -585,17 +1193,52 @@ def register_protobuf(reg: SerializerRegistry, object_registry=None) -> None:
 
                 :raises: KeyError if matching symbol type is not found.
                 """
-                type_identifier = kwargs.get("type_identifier")
+                type_identifier = self._type_identifier(kwargs)
+                obj = self._pool.get(type_identifier) if self.reuse_messages else None
+                if obj is None:
+                    try:
+                        obj = self.registry.get_object_by_id(type_identifier)
+                    except KeyError:
+                        raise Exception(
+                            f"Unable to load '{type_identifier}' from symbol database"
+                        ) from None
+                    if self.reuse_messages:
+                        self._pool[type_identifier] = obj
+                # ParseFromString clears the message before parsing
+                obj.ParseFromString(data)
+                return obj
+
+            def encode_many(self, items, **kwargs) -> bytes:
+                """ Encode a sequence of message objects into a batch of
+                length prefixed messages.
+                """
+                return _pack_items([item.SerializeToString() for item in items])
+
+            def decode_many(self, data, **kwargs) -> list:
+                """ Decode a batch of length prefixed messages.
+
+                All messages in the batch must be of the type identified by
+                the type_identifier keyword argument. The message class is
+                resolved once for the whole batch. Message reuse does not
+                apply to batches as every message is returned.
+                """
+                type_identifier = self._type_identifier(kwargs)
                 try:
-                    obj = self.registry.get_object_by_id(type_identifier)
+                    message_class = self.registry.get_class_by_id(type_identifier)
                 except KeyError:
                     raise Exception(
                         f"Unable to load '{type_identifier}' from symbol database"
                     ) from None
-                obj.ParseFromString(data)
-                return obj
-
-        serializer = ProtobufSerializer(object_registry=object_registry)
+                items = []
+                for item in _unpack_items(data):
+                    obj = message_class()
+                    obj.ParseFromString(item)
+                    items.append(obj)
+                return items
+
+        serializer = ProtobufSerializer(
+            object_registry=object_registry, reuse_messages=reuse_messages
+        )
         reg.register(
             "protobuf",
             serializer,
@@ -604,6 +1247,291 @@ def register_protobuf(reg: SerializerRegistry, object_registry=None) -> None:
         )
 
 
+def register_struct(reg: SerializerRegistry, layout_registry=None) -> None:
+    """ Register an encoder/decoder for fixed layout binary records.
+
+    Fixed shape messages (e.g. telemetry) are packed into a binary record
+    using a precompiled :class:`struct.Struct`. A message layout is
+    registered with a type identifier that is transferred alongside the
+    data (e.g. in a MTI frame header or the x-type-id AMQP header).
+
+    A layout is a dict with a name, a list of (field name, struct format
+    character) pairs and an optional byte order (which defaults to ``<``
+    little-endian with no padding). For example:
+
+    .. code-block:: python
+
+        {
+            "name": "Position",
+            "fields": [
+                ("latitude", "d"),
+                ("longitude", "d"),
+                ("altitude", "d"),
+                ("status", "B"),
+            ],
+        }
+
+    :param layout_registry: An optional layout registry populated with the
+      layouts that will be used.
+    """
+
+    # The compiled form of a layout
+    struct_layout = namedtuple("struct_layout", ("struct", "record", "fields"))
+
+    def _fields_getter(getter, names):
+        """ Return a function that returns a tuple of field values """
+        get = getter(*names)
+        if len(names) == 1:
+            return lambda obj: (get(obj),)
+        return get
+
+    class LayoutRegistry:
+        def __init__(self):
+            self.id2layout = {}  # type: Dict[int, Any]
+            self._id = 0
+
+        def register_message(self, obj: dict, type_identifier: int = None) -> int:
+            """
+            :param obj: A layout dict describing the record fields.
+
+            :param type_identifier: An optional message type identifier to
+              use for the object. If not specified then a number will be
+              automatically assigned.
+            """
+            byte_order = obj.get("byte_order", "<")
+            names = []
+            formats = []
+            for name, fmt in obj["fields"]:
+                try:
+                    struct.calcsize(byte_order + fmt)
+                except struct.error:
+                    raise Exception(
+                        f"Invalid struct format '{fmt}' for field '{name}'"
+                    ) from None
+                names.append(name)
+                formats.append(fmt)
+
+            if type_identifier is None:
+                self._id += 1
+                type_identifier = self._id
+
+            self.id2layout[type_identifier] = struct_layout(
+                struct.Struct(byte_order + "".join(formats)),
+                namedtuple(obj.get("name", "Record"), names),
+                (
+                    _fields_getter(operator.itemgetter, names),
+                    _fields_getter(operator.attrgetter, names),
+                ),
+            )
+            return type_identifier
+
+        def get_layout_by_id(self, type_identifier: int):
+            try:
+                return self.id2layout[type_identifier]
+            except KeyError:
+                raise Exception(
+                    f"No struct layout registered for '{type_identifier}'"
+                ) from None
+
+    class StructSerializer(ISerializer):
+        """ Fixed layout binary record serialization.
+
+        Records can be encoded from tuples (including named tuples), dicts or
+        any object with attributes matching the field names (e.g. objects
+        using __slots__). Decoded records are returned as named tuples.
+        """
+
+        def __init__(self, layout_registry=None):
+            """
+            :param layout_registry: An object that is responsible for
+              translating a type identifier to a record layout.
+            """
+            self.registry = layout_registry if layout_registry else LayoutRegistry()
+
+        def _values(self, layout, data):
+            """ Return the field values of a record """
+            if isinstance(data, tuple):
+                return data
+            if isinstance(data, dict):
+                return layout.fields[0](data)
+            return layout.fields[1](data)
+
+        def encode(
+            self, data, *, type_identifier: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Pack a record and return a :class:`bytes` object.
+
+            :returns: a serialized message as a bytes object.
+            """
+            layout = self.registry.get_layout_by_id(type_identifier)
+            return layout.struct.pack(*self._values(layout, data))
+
+        def decode(
+            self, data, *, type_identifier: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Unpack *data* into a record.
+
+            :param data: a bytes-like object containing a serialized message.
+
+            :param type_identifier: An integer specifying the identity of a
+              registered layout.
+
+            :returns: A named tuple.
+            """
+            layout = self.registry.get_layout_by_id(type_identifier)
+            return layout.record._make(layout.struct.unpack(data))
+
+        def encode_many(
+            self, items, *, type_identifier: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Pack a sequence of records, that share a layout, into
+            consecutive fixed size records.
+            """
+            layout = self.registry.get_layout_by_id(type_identifier)
+            pack = layout.struct.pack
+            return b"".join([pack(*self._values(layout, item)) for item in items])
+
+        def decode_many(
+            self, data, *, type_identifier: int = None, **kwargs
+        ):  # pylint: disable=arguments-differ
+            """ Unpack consecutive fixed size records. """
+            layout = self.registry.get_layout_by_id(type_identifier)
+            make = layout.record._make
+            return [make(values) for values in layout.struct.iter_unpack(data)]
+
+    serializer = StructSerializer(layout_registry=layout_registry)
+    reg.register(
+        "struct",
+        serializer,
+        content_type=CONTENT_TYPE_STRUCT,
+        content_encoding="binary",
+    )
+
+
+def register_numpy(reg: SerializerRegistry) -> None:
+    """ Register an encoder/decoder for NumPy arrays.
+
+    Arrays are transferred as a small header, describing the dtype, shape
+    and memory order, followed by the raw array buffer. The wire format is
+    the NumPy .npy format. Record (structured) dtypes are supported but
+    object arrays are not as they would require pickling.
+
+    Decoding does not copy the array data. The returned array is a view onto
+    the received buffer, which means it is read-only if the buffer is (e.g.
+    bytes).
+    """
+
+    if have_numpy:
+
+        class NumpySerializer(ISerializer):
+            def _header(self, array) -> bytes:
+                """ Return the .npy header for an array """
+                fortran_order = (
+                    array.flags.f_contiguous and not array.flags.c_contiguous
+                )
+                header = repr(
+                    {
+                        "descr": np.lib.format.dtype_to_descr(array.dtype),
+                        "fortran_order": fortran_order,
+                        "shape": array.shape,
+                    }
+                ).encode("latin1")
+                # Pad the header (with spaces and a newline) so that the array
+                # data starts on an aligned boundary.
+                padding = -(NUMPY_HEADER_SIZE + len(header) + 1) % NUMPY_ALIGNMENT
+                header += b" " * padding + b"\n"
+                return (
+                    struct.pack(NUMPY_HEADER_FORMAT, NUMPY_MAGIC, len(header)) + header
+                )
+
+            def _parts(self, array):
+                """ Return the header and a view of the array data """
+                if not isinstance(array, np.ndarray):
+                    array = np.asarray(array)
+                if array.dtype.hasobject:
+                    raise Exception("Can't serialize arrays containing objects")
+                if not (array.flags.c_contiguous or array.flags.f_contiguous):
+                    array = np.ascontiguousarray(array)
+                # A flat byte view of the array data in memory order
+                data = array.reshape(-1, order="A").view(np.uint8)
+                return self._header(array), data
+
+            def _read(self, view, offset: int):
+                """ Return an array view of the data at offset and the offset
+                of the end of its data.
+                """
+                start = offset + NUMPY_HEADER_SIZE
+                if start > len(view):
+                    raise Exception("NumPy payload is truncated")
+                magic, header_len = struct.unpack(
+                    NUMPY_HEADER_FORMAT, view[offset:start]
+                )
+                if magic != NUMPY_MAGIC:
+                    raise Exception("Invalid NumPy payload header")
+                header = ast.literal_eval(
+                    str(view[start : start + header_len], "latin1")
+                )
+                dtype = np.lib.format.descr_to_dtype(header["descr"])
+                shape = header["shape"]
+                count = 1
+                for dim in shape:
+                    count *= dim
+                start += header_len
+                end = start + count * dtype.itemsize
+                if end > len(view):
+                    raise Exception("NumPy payload is truncated")
+                array = np.frombuffer(view, dtype=dtype, count=count, offset=start)
+                order = "F" if header["fortran_order"] else "C"
+                return array.reshape(shape, order=order), end
+
+            def encode(self, data, **kwargs) -> bytes:
+                """ Encode an array and return a :class:`bytes` object.
+
+                :returns: a serialized message as a bytes object.
+                """
+                return b"".join(self._parts(data))
+
+            def decode(self, data, **kwargs):
+                """ Decode *data* into an array without copying it.
+
+                :param data: a bytes-like object containing a serialized message.
+
+                :returns: A numpy.ndarray object.
+                """
+                array, _end = self._read(memoryview(data).cast("B"), 0)
+                return array
+
+            def encode_many(self, items, **kwargs) -> bytes:
+                """ Encode a sequence of arrays. Each array's data is padded so
+                that the following array's data remains aligned.
+                """
+                parts = []  # type: List[bytes]
+                for item in items:
+                    header, data = self._parts(item)
+                    padding = -(len(header) + len(data)) % NUMPY_ALIGNMENT
+                    parts.extend((header, data, b"\x00" * padding))
+                return b"".join(parts)
+
+            def decode_many(self, data, **kwargs) -> list:
+                """ Decode a sequence of arrays without copying them. """
+                view = memoryview(data).cast("B")
+                items = []
+                offset = 0
+                while offset < len(view):
+                    array, end = self._read(view, offset)
+                    items.append(array)
+                    offset = end + (-(end - offset) % NUMPY_ALIGNMENT)
+                return items
+
+        serializer = NumpySerializer()
+        reg.register(
+            "numpy",
+            serializer,
+            content_type=CONTENT_TYPE_NUMPY,
+            content_encoding="binary",
+        )
+
+
 def initialize(reg: SerializerRegistry):
     """ Register serialization methods and set a default """
     register_none(reg)
@@ -613,6 +1541,8 @@ def initialize(reg: SerializerRegistry):
     register_yaml(reg)
     register_avro(reg)
     register_protobuf(reg)
+    register_struct(reg)
+    register_numpy(reg)
 
     reg.set_default("json")
 
@@ -623,4 +1553,8 @@ dumps = registry.dumps
 
 loads = registry.loads
 
+dumps_many = registry.dumps_many
+
+loads_many = registry.loads_many
+
 initialize(registry)
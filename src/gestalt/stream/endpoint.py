@@ -8,7 +8,7 @@ import socket
 from ssl import SSLContext
 from gestalt import serialization
 from gestalt.stream.protocols.base import BaseStreamProtocol
-from typing import Any, Dict, Optional, Sequence, Tuple, Type
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple, Type
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +60,7 @@ class StreamEndpoint:
         on_peer_unavailable=None,
         content_type: str = serialization.CONTENT_TYPE_DATA,
         backoff_maximum: float = 10.0,
+        lazy_decode: bool = False,
         loop=None,
         **kwargs,
     ) -> None:
@@ -95,6 +96,12 @@ class StreamEndpoint:
         :param backoff_maximum: The maximum interval between reconnect attempts
           by an endpoint operating in client mode. Reconnect attempts backoff
           exponentially up to this maximum value. Default value is 10.0 seconds.
+
+        :param lazy_decode: When set to True the on_message handler is passed
+          a :class:`serialization.LazyMessage` which only decodes the message
+          when its data attribute is accessed. This is useful for handlers that
+          route messages using the type identifier without using the message
+          data. Default value is False.
         """
         self.loop = loop or asyncio.get_event_loop()
         self._on_message_handler = on_message
@@ -103,10 +110,17 @@ class StreamEndpoint:
         self._on_peer_available_handler = on_peer_available
         self._on_peer_unavailable_handler = on_peer_unavailable
 
-        codec = serialization.registry.get_codec(content_type)
-        self.content_type = codec.content_type
-        self.serialization_name = serialization.registry.type_to_name[content_type]
-        self.content_encoding = codec.content_encoding
+        # Resolve the serializer once so that messages can be encoded and
+        # decoded without registry lookups.
+        self.codec = serialization.registry.bind(content_type)
+        self.content_type = self.codec.content_type
+        self.serialization_name = self.codec.name
+        self.content_encoding = self.codec.content_encoding
+
+        # Codecs for message types that use a different serialization to the
+        # endpoint, resolved once when the message type is registered.
+        self._codecs = {}  # type: Dict[Optional[int], serialization.bound_codec]
+        self.lazy_decode = lazy_decode
 
         if self.protocol_class is None:
             raise Exception("protocol_class is not defined")
@@ -127,6 +141,7 @@ class StreamEndpoint:
         self._ssl = None  # type: Optional[SSLContext]
 
         self._running = False
+        self._reading_paused = False
 
         # Client specific attributes
         self._reconnect = False
@@ -138,6 +153,11 @@ class StreamEndpoint:
         self._listener = None  # type: Optional[asyncio.AbstractServer]
         self._listener_addr = None  # type: Optional[Tuple[str, int]]
 
+        # Relay attributes
+        self._relaying = False
+        self._relay_target = None  # type: Optional[StreamEndpoint]
+        self._relay_filter = None  # type: Optional[Callable[..., bool]]
+
     @property
     def mode(self):
         """ Return the endpoint operating mode """
@@ -161,9 +181,31 @@ class StreamEndpoint:
     @property
     def connections(self) -> Sequence[Tuple[str, int]]:
         """ Return a client endpoint's connect addresses """
-        return [prot.raddr for _prot_id, prot in self._peers.items()]
+        addrs = [prot.raddr for prot in self._peers.values()]
+        return [addr for addr in addrs if addr]
+
+    @property
+    def message_handler(self):
+        """ Return the user's message handler """
+        return self._on_message_handler
+
+    @message_handler.setter
+    def message_handler(self, handler) -> None:
+        """ Replace the user's message handler.
+
+        :param handler: A callback function that will be called when a
+          message is received, or None to stop passing messages on.
+        """
+        self._on_message_handler = handler
+
+    @property
+    def peers(self) -> Mapping[bytes, BaseStreamProtocol]:
+        """ Return the protocols of the connected peers keyed by peer identity """
+        return self._peers
 
-    def register_message(self, type_identifier: int, obj: Any):
+    def register_message(
+        self, type_identifier: int, obj: Any = None, content_type: str = None
+    ):
         """
         Register a message object with a unique message identifier.
 
@@ -171,9 +213,27 @@ class StreamEndpoint:
           object.
 
         :param obj: The message object to associate with the identifier.
+
+        :param content_type: An optional string specifying the serialization
+          to use for messages with this identifier, instead of the endpoint's
+          content type. This lets a single endpoint carry messages that use
+          different serializations. It requires a protocol that transfers the
+          message type identifier (e.g. MTI).
+        """
+        if content_type:
+            self._codecs[type_identifier] = serialization.registry.bind(content_type)
+
+        if obj is not None:
+            self.codec_for(type_identifier).serializer.registry.register_message(
+                obj, type_identifier=type_identifier
+            )
+
+    def codec_for(self, type_identifier: Optional[int]) -> serialization.bound_codec:
+        """ Return the codec used for messages with a type identifier.
+
+        :param type_identifier: A message type identifier.
         """
-        serializer = serialization.registry.get_serializer(self.serialization_name)
-        serializer.registry.register_message(obj, type_identifier=type_identifier)
+        return self._codecs.get(type_identifier, self.codec)
 
     async def start(
         self,
@@ -295,10 +355,35 @@ class StreamEndpoint:
             logger.error(f"No peers to send message to!")
             return
 
-        _content_type, _content_encoding, data = serialization.dumps(
-            data, self.serialization_name
+        codec = self._codecs.get(type_identifier, self.codec)
+        data = codec.encode(data, type_identifier=type_identifier)
+
+        self.send_encoded(
+            data, peer_id=peer_id, type_identifier=type_identifier, **kwargs
         )
 
+    def send_encoded(
+        self, data: bytes, *, peer_id: bytes = None, type_identifier: int = 0, **kwargs
+    ):
+        """ Send a message payload that is already in the endpoint's wire
+        encoding to one or more peers.
+
+        This avoids decoding and re-encoding messages that arrive already
+        serialized, such as when bridging messages from another transport.
+
+        :param data: a bytes object containing the encoded message payload.
+
+        :param peer_id: The unique peer identity to send this message to. If
+          no peer_id is specified then send to all peers.
+
+        :param type_identifier: An optional parameter specifying the message
+          type identifier. If supplied this integer value will be encoded
+          into the message frame header.
+        """
+        if not self._peers:
+            logger.error(f"No peers to send message to!")
+            return
+
         if not isinstance(data, bytes):
             logger.error(f"data must be bytes - can't send message. data={data}")
             return
@@ -309,12 +394,124 @@ class StreamEndpoint:
             prot = self._peers[_peer_id]
             prot.send(data, type_identifier=type_identifier, **kwargs)
 
+    async def drain(self) -> None:
+        """ Wait until the write buffers of all peers have drained below
+        their low water marks.
+
+        Awaiting this between sends applies backpressure to the sender when
+        peers are not reading messages as fast as they are being sent.
+        """
+        for prot in list(self._peers.values()):
+            await prot.drain()
+
+    def pause_reading(self) -> None:
+        """ Stop reading messages from all peers, including peers that
+        connect while reading is paused, until resume_reading is called.
+        """
+        self._reading_paused = True
+        for prot in self._peers.values():
+            prot.pause_reading()
+
+    def resume_reading(self) -> None:
+        """ Resume reading messages from all peers """
+        self._reading_paused = False
+        for prot in self._peers.values():
+            prot.resume_reading()
+
+    def start_relay(
+        self,
+        target: "StreamEndpoint" = None,
+        header_filter: Callable[[bytes, int, int], bool] = None,
+    ) -> None:
+        """ Relay received frames to other peers without decoding them.
+
+        Each complete frame received from a peer, including its frame header,
+        is forwarded as-is. Frames are not deserialized, passed to the
+        on_message handler or re-framed, which makes relaying suitable for
+        fan-in/fan-out hubs.
+
+        Relaying requires a protocol that frames messages and supports
+        passing frames to an on_frame handler (e.g. MTI).
+
+        :param target: An optional endpoint whose peers will be sent the
+          relayed frames. It must use the same protocol as this endpoint. If
+          not specified then frames are relayed to all of this endpoint's
+          peers except the one that sent the frame.
+
+        :param header_filter: An optional function that decides whether a
+          frame is relayed using only information from the frame header. It
+          is called with the sending peer's identity, the message type
+          identifier and the message payload length and returns True if the
+          frame should be relayed. Frames that are not relayed are passed to
+          the on_message handler as usual.
+        """
+        if target is not None and target.protocol_class is not self.protocol_class:
+            raise Exception(
+                f"Relay target must use the same protocol, expected "
+                f"{self.protocol_class}, got {target.protocol_class}"
+            )
+        self._relay_target = target
+        self._relay_filter = header_filter
+        self._relaying = True
+
+    def stop_relay(self) -> None:
+        """ Stop relaying received frames. """
+        self._relaying = False
+        self._relay_target = None
+        self._relay_filter = None
+
+    def on_frame(
+        self, prot, peer_id: bytes, frame, type_identifier: int = 0, msg_len: int = 0
+    ) -> bool:
+        """ Called by a protocol when it extracts a complete frame from the
+        stream.
+
+        :param prot: The protocol instance the received the frame.
+
+        :param peer_id: The peer's unique identity.
+
+        :param frame: A bytes-like object holding the frame, including the
+          frame header.
+
+        :param type_identifier: The message type identifier from the frame
+          header.
+
+        :param msg_len: The message payload length from the frame header.
+
+        :returns: True if the frame was relayed, otherwise False which results
+          in the protocol passing the message to on_message. A frame that
+          could not be sent to some peers is still considered relayed.
+        """
+        if not self._relaying:
+            return False
+
+        if self._relay_filter and not self._relay_filter(
+            peer_id, type_identifier, msg_len
+        ):
+            return False
+
+        if self._relay_target is None:
+            peers = [p for _peer_id, p in self._peers.items() if _peer_id != peer_id]
+        else:
+            peers = list(self._relay_target.peers.values())
+
+        for peer_prot in peers:
+            # A failure to send to one peer must not stop the frame reaching
+            # the others.
+            try:
+                peer_prot.send(frame, add_frame_header=False)
+            except Exception:
+                logger.exception(f"Error relaying frame to peer {peer_prot.identity}")
+
+        return True
+
     def _protocol_factory(self):
         """ Return a protocol instance to handle a new peer connection """
         return self.protocol_class(  # pylint: disable=not-callable
             on_message=self.on_message,
             on_peer_available=self.on_peer_available,
             on_peer_unavailable=self.on_peer_unavailable,
+            on_frame=self.on_frame,
         )
 
     async def _listen(
@@ -481,6 +678,9 @@ class StreamEndpoint:
         """
         self._peers[peer_id] = prot
 
+        if self._reading_paused:
+            prot.pause_reading()
+
         # Don't let poor user code break the library
         try:
             if self._on_peer_available_handler:
@@ -535,22 +735,32 @@ class StreamEndpoint:
         if self._on_message_handler:
 
             type_identifier = kwargs.get("type_identifier")
-            data = serialization.loads(
-                data,
-                content_type=self.content_type,
-                content_encoding=self.content_encoding,
-                type_identifier=type_identifier,
-            )
-
-            try:
-                maybe_awaitable = self._on_message_handler(
-                    self, data, peer_id=peer_id, **kwargs
+            codec = self._codecs.get(type_identifier, self.codec)
+            message = data  # type: Any
+            if self.lazy_decode:
+                message = serialization.LazyMessage(
+                    data, codec.decode, type_identifier, kwargs
                 )
-                if inspect.isawaitable(maybe_awaitable):
-                    self.loop.create_task(maybe_awaitable)
-            except Exception:
-                logger.exception(f"Error in on_message callback method")
-                return
+            elif data:
+                message = codec.decode(data, type_identifier=type_identifier)
+
+            self._dispatch_message(peer_id, message, **kwargs)
+
+    def _dispatch_message(self, peer_id: bytes, data: Any, **kwargs) -> None:
+        """ Pass a decoded message to the user's message handler.
+
+        :param peer_id: The peer's unique identity.
+
+        :param data: The decoded message.
+        """
+        try:
+            maybe_awaitable = self._on_message_handler(
+                self, data, peer_id=peer_id, **kwargs
+            )
+            if inspect.isawaitable(maybe_awaitable):
+                self.loop.create_task(maybe_awaitable)
+        except Exception:
+            logger.exception(f"Error in on_message callback method")
 
 
 class StreamServer(StreamEndpoint):
@@ -0,0 +1,56 @@
+"""
+The msgpack endpoint transfers a stream of MessagePack objects. MessagePack
+objects are self-delimiting so no frame header is added to messages.
+
+.. code-block:: console
+
+    +-----------------+-----------------+-----
+    |  object         |  object         | ...
+    +-----------------+-----------------+-----
+
+Messages are packed when they are sent and received bytes are fed directly
+into a streaming unpacker, so the on_message handler is passed fully
+decoded objects without a separate framing or decode step.
+
+This endpoint requires the msgpack package.
+"""
+
+from gestalt import serialization
+from gestalt.stream.endpoint import StreamEndpoint
+from gestalt.stream.protocols.msgpack import MsgpackStreamProtocol
+from typing import Any
+
+
+class MsgpackStreamEndpoint(StreamEndpoint):
+
+    protocol_class = MsgpackStreamProtocol
+
+    def __init__(self, **kwargs) -> None:
+        # Messages are always packed as msgpack
+        kwargs["content_type"] = serialization.CONTENT_TYPE_MSGPACK
+        super().__init__(**kwargs)
+
+    def on_message(self, prot, peer_id: bytes, data: Any, **kwargs) -> None:
+        """ Called by a protocol when it receives a message from a peer.
+
+        The protocol has already decoded the message.
+
+        :param prot: The protocol instance the received the message.
+
+        :param peer_id: The peer's unique identity which can be used to route
+          messages back to the originator.
+
+        :param data: The decoded message object.
+        """
+        if self._on_message_handler:
+            self._dispatch_message(peer_id, data, **kwargs)
+
+
+class MsgpackStreamClient(MsgpackStreamEndpoint):
+
+    is_server = False
+
+
+class MsgpackStreamServer(MsgpackStreamEndpoint):
+
+    is_server = True
@@ -19,15 +19,16 @@ results in just the message framing header being sent which transfers
 the message identifier. This can be used to notify recipients of simple
 events that do no need any extra context.
 """
+from gestalt.routing import RoutingMixin
 from gestalt.stream.endpoint import StreamClient, StreamServer
 from gestalt.stream.protocols.mti import MtiStreamProtocol
 
 
-class MtiStreamClient(StreamClient):
+class MtiStreamClient(RoutingMixin, StreamClient):
 
     protocol_class = MtiStreamProtocol
 
 
-class MtiStreamServer(StreamServer):
+class MtiStreamServer(RoutingMixin, StreamServer):
 
     protocol_class = MtiStreamProtocol
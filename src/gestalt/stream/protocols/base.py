@@ -3,7 +3,7 @@ import binascii
 import logging
 import os
 
-from typing import Tuple
+from typing import Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
@@ -46,16 +46,19 @@ class BaseStreamProtocol(asyncio.Protocol):
         self._local_address = None  # type: Optional[Tuple[str, int]]
         self._peercert = None
         self._identity = b""
+        self._read_paused = False
+        self._write_paused = False
+        self._drain_waiter = None  # type: Optional[asyncio.Future]
 
         self.transport = None
 
     @property
-    def raddr(self) -> Tuple[str, int]:
+    def raddr(self) -> Optional[Tuple[str, int]]:
         """ Return the remote address the protocol is connected with """
         return self._remote_address
 
     @property
-    def laddr(self) -> Tuple[str, int]:
+    def laddr(self) -> Optional[Tuple[str, int]]:
         """ Return the local address the protocol is using """
         return self._local_address
 
@@ -129,6 +132,11 @@ class BaseStreamProtocol(asyncio.Protocol):
         self._remote_address = None
         self._local_address = None
         self._identity = None
+        self._read_paused = False
+
+        # Release any senders waiting for the write buffer to drain
+        self._write_paused = False
+        self._wake_drain_waiter()
 
     def close(self):
         """
@@ -142,6 +150,50 @@ class BaseStreamProtocol(asyncio.Protocol):
         if self.transport:
             self.transport.close()
 
+    def pause_reading(self):
+        """ Stop reading data from the transport until resume_reading is
+        called. This pushes back on the peer once the socket buffers fill.
+        """
+        if self.transport and not self._read_paused:
+            self._read_paused = True
+            self.transport.pause_reading()
+
+    def resume_reading(self):
+        """ Resume reading data from the transport """
+        if self.transport and self._read_paused:
+            self._read_paused = False
+            self.transport.resume_reading()
+
+    def pause_writing(self):
+        """
+        Called by the transport when its write buffer exceeds the high water mark.
+        """
+        self._write_paused = True
+
+    def resume_writing(self):
+        """
+        Called by the transport when its write buffer drains below the low water mark.
+        """
+        self._write_paused = False
+        self._wake_drain_waiter()
+
+    async def drain(self):
+        """ Wait until the transport's write buffer has drained below its
+        low water mark. Returns immediately if writing is not paused.
+        """
+        if not self._write_paused:
+            return
+        if self._drain_waiter is None:
+            self._drain_waiter = asyncio.get_event_loop().create_future()
+        # Several senders may share the waiter so protect it from cancellation
+        await asyncio.shield(self._drain_waiter)
+
+    def _wake_drain_waiter(self):
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
     def send(self, data: bytes, **kwargs):
         """ Sends a message by writing it to the transport.
 
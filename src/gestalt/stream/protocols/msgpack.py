@@ -0,0 +1,95 @@
+import logging
+
+from .base import BaseStreamProtocol
+
+try:
+    import msgpack
+
+    have_msgpack = True
+except ImportError:
+    have_msgpack = False
+
+logger = logging.getLogger(__name__)
+
+
+MAX_MSG_SIZE = 2 ** 31 - 1  # limit maximum msg size as a precaution
+
+
+class MsgpackStreamProtocol(BaseStreamProtocol):
+    """
+    The msgpack protocol transfers a stream of MessagePack objects. No frame
+    header is needed because MessagePack objects are self-delimiting.
+
+    .. code-block:: console
+
+        +-----------------+-----------------+-----
+        |  object         |  object         | ...
+        +-----------------+-----------------+-----
+
+    Received bytes are fed into a streaming unpacker and each fully decoded
+    object is passed to the on_message handler. This avoids a separate
+    framing layer and decode pass.
+
+    Data sent using this protocol must already be packed into MessagePack
+    bytes (e.g. by the endpoint).
+    """
+
+    def __init__(
+        self,
+        on_message=None,
+        on_peer_available=None,
+        on_peer_unavailable=None,
+        max_buffer_size: int = MAX_MSG_SIZE,
+        **kwargs,
+    ):
+        """
+        :param max_buffer_size: The maximum number of bytes that can be
+          buffered while waiting for an object to be completed. The
+          connection is closed if it is exceeded.
+        """
+        if not have_msgpack:
+            raise Exception("The msgpack package is required by MsgpackStreamProtocol")
+
+        super().__init__(
+            on_message=on_message,
+            on_peer_available=on_peer_available,
+            on_peer_unavailable=on_peer_unavailable,
+        )
+        self._unpacker = msgpack.Unpacker(raw=False, max_buffer_size=max_buffer_size)
+
+    def data_received(self, data):
+        """ Process some bytes received from the transport.
+
+        The bytes are fed to the unpacker and then all objects that have been
+        completely received are extracted. Any trailing partial object is
+        held by the unpacker until more bytes arrive.
+        """
+        try:
+            self._unpacker.feed(data)
+        except msgpack.BufferFull:
+            logger.error(
+                f"Msg size exceeds maximum msg size. "
+                f"Disconnecting peer {self._identity}."
+            )
+            self.close()
+            return
+
+        while True:
+            try:
+                obj = next(self._unpacker)
+            except StopIteration:
+                # There is not enough bytes to extract an object yet.
+                break
+            except Exception as exc:
+                logger.error(
+                    f"Invalid msgpack data ({exc}). Disconnecting peer {self._identity}."
+                )
+                self.close()
+                break
+
+            # Don't let user code break the library
+            try:
+                if self._on_message_handler:
+                    self._on_message_handler(self, self._identity, obj)
+            except Exception:
+                logger.exception("Error in on_message callback method")
@@ -53,6 +53,11 @@ class MtiStreamProtocol(BaseStreamProtocol):
     Upon extracting a message from the stream the mti protocol passes the
     message payload data to the on_message handler along with the optional
     message identifier.
+
+    If an on_frame handler is supplied then each complete frame, including
+    the frame header, is first offered to it. This allows frames to be
+    relayed without being decoded. Frames that the on_frame handler does not
+    accept are passed to the on_message handler as usual.
     """
 
     def __init__(
@@ -60,27 +65,47 @@ class MtiStreamProtocol(BaseStreamProtocol):
         on_message=None,
         on_peer_available=None,
         on_peer_unavailable=None,
+        on_frame=None,
         **kwargs,
     ):
+        """
+        :param on_frame: An optional callback function that will be passed
+          each complete frame extracted from the stream as a memoryview. The
+          callback is also passed the type_identifier and msg_len values from
+          the frame header as keyword arguments. It returns True if it has
+          handled the frame, in which case the frame is not passed to the
+          on_message handler.
+        """
         super().__init__(
             on_message=on_message,
             on_peer_available=on_peer_available,
             on_peer_unavailable=on_peer_unavailable,
         )
+        self._on_frame_handler = on_frame
         self._buffer = bytearray()
         self._state = ProtocolStates.WAIT_HEADER
         self.msg_len = 0
         self.msg_id = 0
 
     def send(
-        self, data: bytes, type_identifier: int = 0, **kwargs
+        self, data: bytes, type_identifier: int = 0, add_frame_header=True, **kwargs
     ):  # pylint: disable=arguments-differ
         """ Sends a message by writing it to the transport.
 
         :param data: a bytes object containing the message payload.
 
         :param type_identifier: a message type identifier.
+
+        :param add_frame_header: A flag that informs the sending function
+          whether it needs to wrap the payload data with the frame header.
+          Defaults to True. This parameter should be set to False when sending
+          pre-formed frames - such as in a relay type application.
         """
+        if not add_frame_header:
+            # A pre-formed frame, which may be any bytes-like object.
+            self.transport.write(data)
+            return
+
         if not isinstance(data, bytes):
             logger.error(f"data must be bytes - can't send message. data={type(data)}")
             return
@@ -124,14 +149,18 @@ class MtiStreamProtocol(BaseStreamProtocol):
                     if self.msg_len == 0:
                         # msg has no body
                         eom = MTI_HEADER_SIZE
+                        relayed = self._on_frame_handler and self._on_frame(eom)
                         self._buffer = self._buffer[eom:]
                         self._state = ProtocolStates.WAIT_HEADER
 
                         # Don't let user code break the library
                         try:
-                            if self._on_message_handler:
+                            if self._on_message_handler and not relayed:
                                 self._on_message_handler(
-                                    self, self._identity, b"", identifier=self.msg_id
+                                    self,
+                                    self._identity,
+                                    b"",
+                                    type_identifier=self.msg_id,
                                 )
                         except Exception:
                             logger.exception("Error in on_message callback method")
@@ -153,6 +182,12 @@ class MtiStreamProtocol(BaseStreamProtocol):
             elif self._state == ProtocolStates.WAIT_PAYLOAD:
                 eom = MTI_HEADER_SIZE + self.msg_len
                 if len(self._buffer) >= eom:
+                    if self._on_frame_handler and self._on_frame(eom):
+                        # The frame has been relayed
+                        self._buffer = self._buffer[eom:]
+                        self._state = ProtocolStates.WAIT_HEADER
+                        continue
+
                     msg = bytes(self._buffer[MTI_HEADER_SIZE:eom])
                     self._buffer = self._buffer[eom:]
                     self._state = ProtocolStates.WAIT_HEADER
@@ -169,3 +204,26 @@ class MtiStreamProtocol(BaseStreamProtocol):
                 else:
                     # There is not enough bytes to extract the payload yet.
                     break
+
+    def _on_frame(self, eom: int) -> bool:
+        """ Offer the frame at the start of the buffer to the on_frame handler.
+
+        The frame is passed as a memoryview onto the buffer so that it is not
+        copied.
+
+        :param eom: The offset of the end of the frame in the buffer.
+
+        :returns: True if the frame was handled.
+        """
+        # Don't let user code break the library
+        try:
+            return self._on_frame_handler(
+                self,
+                self._identity,
+                memoryview(self._buffer)[:eom],
+                type_identifier=self.msg_id,
+                msg_len=self.msg_len,
+            )
+        except Exception:
+            logger.exception("Error in on_frame callback method")
+            return False
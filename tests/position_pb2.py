@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: position.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0eposition.proto\"\xa5\x01\n\x08Position\x12\x10\n\x08latitude\x18\x01 \x01(\x02\x12\x11\n\tlongitude\x18\x02 \x01(\x02\x12\x10\n\x08\x61ltitude\x18\x03 \x01(\x02\x12(\n\x06status\x18\x04 \x01(\x0e\x32\x18.Position.PositionStatus\"8\n\x0ePositionStatus\x12\r\n\tUNDEFINED\x10\x00\x12\x08\n\x04LIVE\x10\x01\x12\r\n\tSIMULATED\x10\x02\x62\x06proto3')
+
+
+
+_POSITION = DESCRIPTOR.message_types_by_name['Position']
+_POSITION_POSITIONSTATUS = _POSITION.enum_types_by_name['PositionStatus']
+Position = _reflection.GeneratedProtocolMessageType('Position', (_message.Message,), {
+  'DESCRIPTOR' : _POSITION,
+  '__module__' : 'position_pb2'
+  # @@protoc_insertion_point(class_scope:Position)
+  })
+_sym_db.RegisterMessage(Position)
+
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _POSITION._serialized_start=19
+  _POSITION._serialized_end=184
+  _POSITION_POSITIONSTATUS._serialized_start=128
+  _POSITION_POSITIONSTATUS._serialized_end=184
+# @@protoc_insertion_point(module_scope)
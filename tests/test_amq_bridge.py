@@ -0,0 +1,196 @@
+import asyncio
+import asynctest
+import unittest
+import unittest.mock
+from gestalt import serialization
+from gestalt.compression import COMPRESSION_ZLIB
+from gestalt.serialization import CONTENT_TYPE_JSON
+from gestalt.stream.mti import MtiStreamClient, MtiStreamServer
+
+try:
+    from gestalt.amq import utils
+    from gestalt.amq.bridge import Bridge
+
+    have_pika = True
+except ImportError:
+    have_pika = False
+
+
+def make_message(payload, routing_key="", content_type=CONTENT_TYPE_JSON, **kwargs):
+    """ Return a mock AMQP message holding an encoded payload """
+    headers = {}
+    body, content_type, content_encoding = utils.encode_payload(
+        payload, content_type=content_type, headers=headers, **kwargs
+    )
+    message = unittest.mock.Mock()
+    message.body = body
+    message.content_type = content_type
+    message.content_encoding = content_encoding
+    message.headers = headers
+    message.routing_key = routing_key
+    return message
+
+
+@unittest.skipUnless(have_pika, "aio_pika is not available")
+class BridgeTestCase(asynctest.TestCase):
+    async def setUp(self):
+        self.client_on_message_mock = unittest.mock.Mock()
+        self.server_ep = MtiStreamServer(content_type=CONTENT_TYPE_JSON)
+        self.client_ep = MtiStreamClient(
+            content_type=CONTENT_TYPE_JSON, on_message=self.client_on_message_mock
+        )
+        self.producer = unittest.mock.Mock()
+        self.producer.publish_encoded = asynctest.CoroutineMock()
+
+        self.bridge = Bridge(
+            self.server_ep,
+            producer=self.producer,
+            routing_keys={"position": 1, "status": 2},
+            batch_size=4,
+            max_pending=4,
+        )
+
+        await self.server_ep.start(addr="127.0.0.1")
+        address, port = self.server_ep.bindings[0]
+        await self.client_ep.start(addr=address, port=port)
+        await asyncio.sleep(0.1)
+        await self.bridge.start()
+
+    async def tearDown(self):
+        await self.bridge.stop()
+        await self.client_ep.stop()
+        await self.server_ep.stop()
+
+    async def test_amqp_to_endpoint(self):
+        """ check AMQP messages are forwarded to endpoint peers """
+        message = make_message({"x": 1}, routing_key="position")
+        payload = utils.lazy_decode_message(message)
+        await self.bridge.on_amqp_message(payload, message)
+        await asyncio.sleep(0.1)
+
+        # Matching content types are forwarded without being decoded
+        self.assertFalse(payload.decoded)
+        self.assertTrue(self.client_on_message_mock.called)
+        (args, kwargs) = self.client_on_message_mock.call_args
+        self.assertEqual(args[1], {"x": 1})
+        self.assertEqual(kwargs["type_identifier"], 1)
+
+        # Compressed payloads are decompressed before forwarding
+        self.client_on_message_mock.reset_mock()
+        message = make_message(
+            {"x": 2}, routing_key="status", compression=COMPRESSION_ZLIB
+        )
+        await self.bridge.on_amqp_message(utils.lazy_decode_message(message), message)
+        await asyncio.sleep(0.1)
+        (args, kwargs) = self.client_on_message_mock.call_args
+        self.assertEqual(args[1], {"x": 2})
+        self.assertEqual(kwargs["type_identifier"], 2)
+
+        # Other content types are decoded and re-encoded
+        self.client_on_message_mock.reset_mock()
+        message = make_message(
+            "hello", routing_key="unknown", content_type=serialization.CONTENT_TYPE_TEXT
+        )
+        message.headers["x-type-id"] = 7
+        await self.bridge.on_amqp_message(utils.lazy_decode_message(message), message)
+        await asyncio.sleep(0.1)
+        (args, kwargs) = self.client_on_message_mock.call_args
+        self.assertEqual(args[1], "hello")
+        self.assertEqual(kwargs["type_identifier"], 7)
+
+    async def test_amqp_type_id_header(self):
+        """ check x-type-id header values are converted to integers """
+        message = make_message({"x": 1}, routing_key=None)
+        message.headers["x-type-id"] = "3"
+        await self.bridge.on_amqp_message(utils.lazy_decode_message(message), message)
+        await asyncio.sleep(0.1)
+        (_args, kwargs) = self.client_on_message_mock.call_args
+        self.assertEqual(kwargs["type_identifier"], 3)
+
+        # Messages with an invalid type identifier are discarded
+        self.client_on_message_mock.reset_mock()
+        message.headers["x-type-id"] = "position"
+        with self.assertLogs("gestalt.amq.bridge", level="ERROR"):
+            await self.bridge.on_amqp_message(
+                utils.lazy_decode_message(message), message
+            )
+        await asyncio.sleep(0.1)
+        self.assertFalse(self.client_on_message_mock.called)
+
+    async def test_amqp_backpressure(self):
+        """ check the AMQP handler blocks while the endpoint queue is full """
+        await self.bridge.stop()
+
+        message = make_message({"x": 1}, routing_key="position")
+        for _ in range(self.bridge.max_pending):
+            await self.bridge.on_amqp_message(
+                utils.lazy_decode_message(message), message
+            )
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                self.bridge.on_amqp_message(
+                    utils.lazy_decode_message(message), message
+                ),
+                timeout=0.1,
+            )
+
+        await self.bridge.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(
+            self.client_on_message_mock.call_count, self.bridge.max_pending
+        )
+
+    async def test_endpoint_to_amqp(self):
+        """ check endpoint messages are published in their wire encoding """
+        self.client_ep.send({"x": 1}, type_identifier=2)
+        self.client_ep.send({"x": 2}, type_identifier=9)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(self.producer.publish_encoded.call_count, 2)
+        calls = self.producer.publish_encoded.call_args_list
+        (args, kwargs) = calls[0]
+        self.assertEqual(args[1], CONTENT_TYPE_JSON)
+        self.assertIsInstance(args[0], bytes)
+        self.assertEqual(
+            serialization.loads(args[0], CONTENT_TYPE_JSON, None), {"x": 1}
+        )
+        self.assertEqual(kwargs["routing_key"], "status")
+        self.assertEqual(kwargs["type_identifier"], 2)
+        (args, kwargs) = calls[1]
+        self.assertIsNone(kwargs["routing_key"])
+        self.assertEqual(kwargs["type_identifier"], 9)
+
+    async def test_endpoint_backpressure(self):
+        """ check reading from peers pauses while the AMQP queue is full """
+        await self.bridge.stop()
+
+        for i in range(self.bridge.max_pending + 1):
+            self.client_ep.send({"x": i}, type_identifier=1)
+        await asyncio.sleep(0.1)
+
+        self.assertTrue(self.bridge._reading_paused)
+        self.assertFalse(self.producer.publish_encoded.called)
+
+        # Queued messages are published and reading resumes
+        await self.bridge.start()
+        await asyncio.sleep(0.1)
+        self.assertFalse(self.bridge._reading_paused)
+        self.assertEqual(
+            self.producer.publish_encoded.call_count, self.bridge.max_pending + 1
+        )
+
+    async def test_endpoint_empty_message_to_amqp(self):
+        """ check zero length endpoint messages are published """
+        self.assertEqual(
+            self.server_ep.message_handler, self.bridge.on_endpoint_message
+        )
+
+        # Zero length MTI datagram payloads are passed as an empty str
+        message = serialization.LazyMessage("", None, 1, {})
+        self.bridge.on_endpoint_message(self.server_ep, message, type_identifier=1)
+        await asyncio.sleep(0.1)
+
+        (args, kwargs) = self.producer.publish_encoded.call_args
+        self.assertEqual(args[0], b"")
+        self.assertEqual(kwargs["type_identifier"], 1)
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import ssl
 import unittest
 import unittest.mock
@@ -10,8 +12,8 @@ class RabbitmqUtilitiesTestCase(unittest.TestCase):
     def test_encode_payload_exceptions(self):
         TEXT_DATA = "The Quick Brown Fox Jumps Over The Lazy Dog"
 
-        with unittest.mock.patch("gestalt.amq.utils.dumps") as mock_dumps:
-            mock_dumps.side_effect = Exception("Boom!")
+        with unittest.mock.patch.object(utils.registry, "bind") as mock_bind:
+            mock_bind.return_value.encode.side_effect = Exception("Boom!")
             with self.assertRaises(Exception):
                 headers = {}
                 utils.encode_payload(
@@ -54,8 +56,8 @@ class RabbitmqUtilitiesTestCase(unittest.TestCase):
                     content_encoding=content_encoding,
                 )
 
-        with unittest.mock.patch("gestalt.amq.utils.loads") as mock_loads:
-            mock_loads.side_effect = Exception("Boom!")
+        with unittest.mock.patch.object(utils.registry, "bind") as mock_bind:
+            mock_bind.return_value.decode.side_effect = Exception("Boom!")
             with self.assertRaises(Exception):
                 utils.decode_payload(
                     payload,
@@ -116,6 +118,245 @@ class RabbitmqUtilitiesTestCase(unittest.TestCase):
                 )
                 self.assertEqual(data, JSON_DATA)
 
+    def test_block_compression_payload_roundtrip(self):
+        TEXT_DATA = "The Quick Brown Fox Jumps Over The Lazy Dog" * 1000
+
+        for threshold, expect_blocks in ((1024, True), (len(TEXT_DATA), False)):
+            with self.subTest(f"Check block compression with threshold {threshold}"):
+                headers = {}
+                payload, content_type, content_encoding = utils.encode_payload(
+                    TEXT_DATA,
+                    content_type=serialization.CONTENT_TYPE_TEXT,
+                    compression=compression.COMPRESSION_ZLIB,
+                    headers=headers,
+                    compression_block_threshold=threshold,
+                )
+                self.assertEqual(expect_blocks, "x-compression-blocks" in headers)
+
+                data = utils.decode_payload(
+                    payload,
+                    compression=headers["compression"],
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                    compression_blocks=headers.get("x-compression-blocks", False),
+                )
+                self.assertEqual(data, TEXT_DATA)
+
+    def test_async_block_compression_payload(self):
+        TEXT_DATA = b"The Quick Brown Fox Jumps Over The Lazy Dog" * 1000
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        for threshold, expect_blocks in ((1024, True), (len(TEXT_DATA), False)):
+            with self.subTest(
+                f"Check async block compression with threshold {threshold}"
+            ), unittest.mock.patch.object(
+                utils, "compress_blocks_async", wraps=utils.compress_blocks_async
+            ) as mock_compress_blocks_async:
+                headers = {}
+                payload = loop.run_until_complete(
+                    utils.compress_payload_async(
+                        TEXT_DATA,
+                        compression.COMPRESSION_ZLIB,
+                        headers=headers,
+                        compression_block_threshold=threshold,
+                    )
+                )
+                # Only payloads above the threshold are compressed off the loop
+                self.assertEqual(expect_blocks, mock_compress_blocks_async.called)
+                self.assertEqual(expect_blocks, "x-compression-blocks" in headers)
+
+                data = utils.decode_payload(
+                    payload,
+                    compression=headers["compression"],
+                    content_type=serialization.CONTENT_TYPE_DATA,
+                    compression_blocks=headers.get("x-compression-blocks", False),
+                )
+                self.assertEqual(data, TEXT_DATA)
+
+    def test_lazy_decode_message(self):
+        JSON_DATA = {"string": "The Quick Brown Fox Jumps Over The Lazy Dog"}
+        headers = {}
+        payload, content_type, content_encoding = utils.encode_payload(
+            JSON_DATA,
+            content_type=serialization.CONTENT_TYPE_JSON,
+            compression=compression.COMPRESSION_ZLIB,
+            headers=headers,
+        )
+        message = unittest.mock.Mock(
+            body=payload,
+            headers=headers,
+            content_type=content_type,
+            content_encoding=content_encoding,
+        )
+
+        with unittest.mock.patch.object(
+            utils, "decode_payload", wraps=utils.decode_payload
+        ) as decode_payload_mock:
+            lazy_message = utils.lazy_decode_message(message)
+            self.assertFalse(decode_payload_mock.called)
+            self.assertIs(lazy_message.raw, payload)
+            self.assertIs(lazy_message.metadata, headers)
+            self.assertFalse(lazy_message.decoded)
+
+            # The payload is decompressed and decoded once, upon first use
+            self.assertEqual(lazy_message.data, JSON_DATA)
+            self.assertEqual(lazy_message.data, JSON_DATA)
+            self.assertTrue(lazy_message.decoded)
+            self.assertEqual(decode_payload_mock.call_count, 1)
+
+    def test_auto_compression_payload_roundtrip(self):
+        for text_data, expect_compressed in (("Short", False), ("Long" * 1000, True)):
+            with self.subTest(f"Check auto compression of {len(text_data)} bytes"):
+                headers = {}
+                payload, content_type, content_encoding = utils.encode_payload(
+                    text_data,
+                    content_type=serialization.CONTENT_TYPE_TEXT,
+                    compression=compression.COMPRESSION_AUTO,
+                    headers=headers,
+                )
+                self.assertEqual(expect_compressed, "compression" in headers)
+
+                data = utils.decode_payload(
+                    payload,
+                    compression=headers.get("compression"),
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                )
+                self.assertEqual(data, text_data)
+
+    def test_auto_block_compression_of_incompressible_payload(self):
+        RANDOM_DATA = os.urandom(100000)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        compression.registry.selector.reset()
+        self.addCleanup(compression.registry.selector.reset)
+
+        for use_async in (False, True):
+            with self.subTest(f"Check auto block compression (async={use_async})"):
+                headers = {}
+                if use_async:
+                    payload = loop.run_until_complete(
+                        utils.compress_payload_async(
+                            RANDOM_DATA,
+                            compression.COMPRESSION_AUTO,
+                            headers=headers,
+                            compression_block_threshold=1024,
+                        )
+                    )
+                else:
+                    payload = utils.compress_payload(
+                        RANDOM_DATA,
+                        compression.COMPRESSION_AUTO,
+                        headers=headers,
+                        compression_block_threshold=1024,
+                    )
+                # The payload is sent as is rather than as a block container
+                self.assertNotIn("compression", headers)
+                self.assertNotIn("x-compression-blocks", headers)
+                self.assertEqual(payload, RANDOM_DATA)
+
+                data = utils.decode_payload(
+                    payload,
+                    compression=headers.get("compression"),
+                    content_type=serialization.CONTENT_TYPE_DATA,
+                    compression_blocks=headers.get("x-compression-blocks", False),
+                )
+                self.assertEqual(data, RANDOM_DATA)
+
+    def test_decode_payload_max_length(self):
+        TEXT_DATA = "The Quick Brown Fox Jumps Over The Lazy Dog" * 1000
+
+        headers = {}
+        payload, content_type, content_encoding = utils.encode_payload(
+            TEXT_DATA,
+            content_type=serialization.CONTENT_TYPE_TEXT,
+            compression=compression.COMPRESSION_ZLIB,
+            headers=headers,
+        )
+
+        data = utils.decode_payload(
+            payload,
+            compression=headers["compression"],
+            content_type=content_type,
+            content_encoding=content_encoding,
+            max_length=len(TEXT_DATA),
+        )
+        self.assertEqual(data, TEXT_DATA)
+
+        with self.assertRaises(Exception) as cm:
+            utils.decode_payload(
+                payload,
+                compression=headers["compression"],
+                content_type=content_type,
+                content_encoding=content_encoding,
+                max_length=1024,
+            )
+        self.assertIn("exceeds maximum length", str(cm.exception))
+
+    def test_compression_preset_payload_roundtrip(self):
+        TEXT_DATA = "The Quick Brown Fox Jumps Over The Lazy Dog"
+
+        for preset in (
+            compression.PRESET_FAST,
+            compression.PRESET_BALANCED,
+            compression.PRESET_MAX,
+        ):
+            with self.subTest(f"Check compressing payload using {preset} preset"):
+                headers = {}
+                payload, content_type, content_encoding = utils.encode_payload(
+                    TEXT_DATA,
+                    content_type=serialization.CONTENT_TYPE_TEXT,
+                    compression=compression.COMPRESSION_ZLIB,
+                    headers=headers,
+                    compression_preset=preset,
+                )
+                data = utils.decode_payload(
+                    payload,
+                    compression=headers["compression"],
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                )
+                self.assertEqual(data, TEXT_DATA)
+
+        with self.assertRaises(Exception):
+            utils.encode_payload(
+                TEXT_DATA,
+                content_type=serialization.CONTENT_TYPE_TEXT,
+                compression=compression.COMPRESSION_ZLIB,
+                headers={},
+                compression_preset="invalid",
+            )
+
+    @unittest.skipUnless(compression.have_zstd, "requires zstandard")
+    def test_compression_dictionary_payload_roundtrip(self):
+        JSON_DATA = dict(latitude=130.0, longitude=-30.0, altitude=50.0)
+
+        compressor = compression.registry.get_compressor(compression.COMPRESSION_ZSTD)
+        dict_id = compressor.registry.register_dictionary(
+            b'{"latitude": 130.0, "longitude": -30.0, "altitude": 50.0}'
+        )
+
+        headers = {}
+        payload, content_type, content_encoding = utils.encode_payload(
+            JSON_DATA,
+            content_type=serialization.CONTENT_TYPE_JSON,
+            compression=compression.COMPRESSION_ZSTD,
+            headers=headers,
+            compression_dict_id=dict_id,
+        )
+        self.assertIn("compression", headers)
+        self.assertEqual(headers["x-compression-dict-id"], dict_id)
+
+        data = utils.decode_payload(
+            payload,
+            compression=headers["compression"],
+            content_type=content_type,
+            content_encoding=content_encoding,
+            compression_dict_id=headers["x-compression-dict-id"],
+        )
+        self.assertEqual(data, JSON_DATA)
+
     @unittest.skipUnless(serialization.have_msgpack, "requires msgpack")
     def test_msgpack_payload_roundtrip(self):
         MSGPACK_DATA = dict(latitude=130.0, longitude=-30.0, altitude=50.0)
@@ -1,4 +1,7 @@
+import asynctest
+import os
 import unittest
+import zlib
 from gestalt import compression
 
 
@@ -251,3 +254,462 @@ class CompressionTestCase(unittest.TestCase):
                 content_type, d = compression.decompress(payload, content_type)
                 self.assertEqual(content_type, mime_type)
                 self.assertEqual(d, TEST_DATA)
+
+    @unittest.skipUnless(compression.have_zstd, "requires zstandard")
+    def test_zstd_compression(self):
+        convenience_name = "zstd"
+        mime_type = compression.COMPRESSION_ZSTD
+
+        # check exception is raised when bytes are not passed in
+        with self.assertRaises(Exception) as cm:
+            compression.compress({}, mime_type)
+        self.assertIn("Can only compress bytes", str(cm.exception))
+
+        # perform roundtrip check
+        for c_name in (convenience_name, mime_type):
+            with self.subTest(f"Check zstd compression roundtrip using {c_name}"):
+                content_type, payload = compression.compress(TEST_DATA, c_name)
+                self.assertEqual(content_type, mime_type)
+                self.assertNotEqual(TEST_DATA, payload)
+                content_type, d = compression.decompress(payload, content_type)
+                self.assertEqual(content_type, mime_type)
+                self.assertEqual(d, TEST_DATA)
+
+    @unittest.skipUnless(compression.have_zstd, "requires zstandard")
+    def test_zstd_dictionary_compression(self):
+        samples = [
+            f'{{"latitude": {i}.5, "longitude": -{i}.25, "status": "ok"}}'.encode()
+            for i in range(1000)
+        ]
+
+        compressor = compression.registry.get_compressor("zstd")
+        dict_id = compressor.registry.train_dictionary(
+            samples, dict_size=1024, dict_id=4242
+        )
+        self.assertEqual(dict_id, 4242)
+
+        data = samples[0]
+        _content_type, plain_payload = compression.compress(data, "zstd")
+        _content_type, payload = compression.compress(data, "zstd", dict_id=dict_id)
+        self.assertLess(len(payload), len(plain_payload))
+
+        # The dictionary identifier is carried in the zstd frame header so
+        # the receiver does not need to be told which dictionary to use.
+        _content_type, d = compression.decompress(payload, "zstd")
+        self.assertEqual(d, data)
+
+        # An explicitly specified dictionary identifier is also accepted.
+        _content_type, d = compression.decompress(payload, "zstd", dict_id=dict_id)
+        self.assertEqual(d, data)
+
+        with self.assertRaises(Exception) as cm:
+            compression.compress(data, "zstd", dict_id=1234567)
+        self.assertIn("Unknown zstd dictionary", str(cm.exception))
+
+    @unittest.skipUnless(compression.have_zstd, "requires zstandard")
+    def test_zstd_raw_dictionary_compression(self):
+        compressor = compression.registry.get_compressor("zstd")
+        dict_id = compressor.registry.register_dictionary(
+            b"The Quick Brown Fox Jumps Over The Lazy Dog" * 4
+        )
+
+        # Raw content dictionaries have no embedded identifier so it must be
+        # supplied to the decompressor.
+        _content_type, payload = compression.compress(
+            TEST_DATA, "zstd", dict_id=dict_id
+        )
+        _content_type, d = compression.decompress(payload, "zstd", dict_id=dict_id)
+        self.assertEqual(d, TEST_DATA)
+
+    @unittest.skipUnless(compression.have_lz4, "requires lz4")
+    def test_lz4_compression(self):
+        convenience_name = "lz4"
+        mime_type = compression.COMPRESSION_LZ4
+
+        # check exception is raised when bytes are not passed in
+        with self.assertRaises(Exception) as cm:
+            compression.compress({}, mime_type)
+        self.assertIn("Can only compress bytes", str(cm.exception))
+
+        # perform roundtrip check
+        for c_name in (convenience_name, mime_type):
+            with self.subTest(f"Check lz4 compression roundtrip using {c_name}"):
+                content_type, payload = compression.compress(TEST_DATA, c_name)
+                self.assertEqual(content_type, mime_type)
+                self.assertNotEqual(TEST_DATA, payload)
+                content_type, d = compression.decompress(payload, content_type)
+                self.assertEqual(content_type, mime_type)
+                self.assertEqual(d, TEST_DATA)
+
+    def test_compression_of_memoryview_slices(self):
+        data = TEST_DATA * 100
+        buffer = memoryview(b"head" + data + b"tail")
+        for name in compression.registry.compressors:
+            with self.subTest(f"Check {name} compression of memoryview slices"):
+                content_type, payload = compression.compress(buffer[4:-4], name)
+                view = memoryview(b"head" + bytes(payload) + b"tail")[4:-4]
+                content_type, d = compression.decompress(view, content_type)
+                self.assertEqual(bytes(d), data)
+
+                content_type, payload = compression.compress(bytearray(data), name)
+                content_type, d = compression.decompress(
+                    bytearray(payload), content_type, max_length=len(data)
+                )
+                self.assertEqual(bytes(d), data)
+
+    def test_compression_presets_roundtrip(self):
+        codecs = compression.registry.compressors
+        presets = (
+            compression.PRESET_FAST,
+            compression.PRESET_BALANCED,
+            compression.PRESET_MAX,
+        )
+        for name in codecs:
+            for preset in presets:
+                with self.subTest(f"Check {name} compression using {preset} preset"):
+                    content_type, payload = compression.compress(
+                        TEST_DATA, name, preset=preset
+                    )
+                    content_type, d = compression.decompress(payload, content_type)
+                    self.assertEqual(d, TEST_DATA)
+
+    def test_compress_with_invalid_preset(self):
+        with self.assertRaises(Exception) as cm:
+            compression.compress(TEST_DATA, "zlib", preset="invalid")
+        self.assertIn("Invalid compression preset", str(cm.exception))
+
+    def test_compression_level_override(self):
+        data = TEST_DATA * 100
+        _content_type, fast_payload = compression.compress(data, "zlib", level=1)
+        _content_type, max_payload = compression.compress(data, "zlib", level=9)
+        self.assertLessEqual(len(max_payload), len(fast_payload))
+
+        # A level argument takes priority over a preset
+        _content_type, payload = compression.compress(
+            data, "zlib", preset=compression.PRESET_MAX, level=1
+        )
+        self.assertEqual(payload, fast_payload)
+
+    def test_configure_compressor_options(self):
+        compressor = compression.registry.get_compressor("zlib")
+        original_options = dict(compressor.options)
+        try:
+            compression.registry.configure("zlib", preset=compression.PRESET_FAST)
+            self.assertEqual(compressor.options["level"], 1)
+
+            compression.registry.configure(compression.COMPRESSION_ZLIB, level=4)
+            self.assertEqual(compressor.options["level"], 4)
+
+            with self.assertRaises(Exception) as cm:
+                compression.registry.configure("zlib", preset="invalid")
+            self.assertIn("Invalid compression preset", str(cm.exception))
+        finally:
+            compressor.options = original_options
+
+
+class AutoCompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.registry = compression.CompressorRegistry()
+        compression.initialize(self.registry)
+
+    def test_auto_compression_roundtrip(self):
+        data = TEST_DATA * 100
+        content_type, payload = self.registry.compress(
+            data, compression.COMPRESSION_AUTO
+        )
+        self.assertIn(content_type, self.registry.type_to_name)
+        self.assertIsNotNone(content_type)
+        self.assertLess(len(payload), len(data))
+        _content_type, d = self.registry.decompress(payload, content_type)
+        self.assertEqual(d, data)
+
+        stats = self.registry.selector.stats
+        self.assertEqual(stats["payloads"], 1)
+        self.assertEqual(stats["samples"], 1)
+        self.assertEqual(stats["selected"], self.registry.type_to_name[content_type])
+        self.assertEqual(stats["selections"], {stats["selected"]: 1})
+        for name, codec_stats in stats["codecs"].items():
+            with self.subTest(f"Check {name} stats"):
+                for key in ("size", "compressed_size", "compress_time", "score"):
+                    self.assertIn(key, codec_stats)
+
+    def test_auto_compression_skips_small_payloads(self):
+        content_type, payload = self.registry.compress(
+            TEST_DATA, compression.COMPRESSION_AUTO
+        )
+        self.assertIsNone(content_type)
+        self.assertEqual(payload, TEST_DATA)
+        stats = self.registry.selector.stats
+        self.assertEqual(stats["skipped_small"], 1)
+        self.assertEqual(stats["samples"], 0)
+
+    def test_auto_compression_skips_incompressible_payloads(self):
+        data = os.urandom(4096)
+        content_type, payload = self.registry.compress(
+            data, compression.COMPRESSION_AUTO
+        )
+        self.assertIsNone(content_type)
+        self.assertEqual(payload, data)
+        stats = self.registry.selector.stats
+        self.assertIsNone(stats["selected"])
+        self.assertEqual(stats["skipped_incompressible"], 1)
+
+    def test_auto_compression_sample_interval(self):
+        selector = compression.CodecSelector(
+            self.registry,
+            candidates=["zlib", compression.COMPRESSION_BZ2],
+            objective=compression.OBJECTIVE_RATIO,
+            sample_interval=3,
+        )
+        self.registry.selector = selector
+        data = TEST_DATA * 100
+        for _ in range(7):
+            content_type, payload = self.registry.compress(
+                data, compression.COMPRESSION_AUTO
+            )
+            self.assertIn(
+                content_type,
+                (compression.COMPRESSION_ZLIB, compression.COMPRESSION_BZ2),
+            )
+        stats = selector.stats
+        self.assertEqual(stats["payloads"], 7)
+        self.assertEqual(stats["samples"], 3)
+        self.assertEqual(set(stats["codecs"]), {"zlib", "bzip2"})
+
+        selector.reset()
+        self.assertEqual(selector.stats["payloads"], 0)
+        self.assertIsNone(selector.selected)
+
+    def test_auto_compression_custom_objective(self):
+        # Prefer the fastest compressor regardless of ratio
+        def fastest(sample):
+            return -(sample.compress_time + sample.decompress_time)
+
+        self.registry.selector = compression.CodecSelector(
+            self.registry, candidates=["zlib"], objective=fastest
+        )
+        content_type, _payload = self.registry.compress(
+            TEST_DATA * 100, compression.COMPRESSION_AUTO
+        )
+        self.assertEqual(content_type, compression.COMPRESSION_ZLIB)
+
+        with self.assertRaises(Exception) as cm:
+            compression.CodecSelector(self.registry, objective="invalid")
+        self.assertIn("Invalid compression objective", str(cm.exception))
+
+    def test_auto_block_compression(self):
+        data = TEST_DATA * 1000
+        content_type, payload = self.registry.compress_blocks(
+            data, compression.COMPRESSION_AUTO, block_size=4096
+        )
+        _content_type, d = self.registry.decompress_blocks(payload, content_type)
+        self.assertEqual(d, data)
+
+
+class StreamCompressionTestCase(asynctest.TestCase):
+    DATA = TEST_DATA * 1000
+
+    def test_stream_compression_roundtrip(self):
+        codecs = compression.registry.compressors
+        data = self.DATA
+        for name in codecs:
+            with self.subTest(f"Check {name} stream compression roundtrip"):
+                content_type, compressor = compression.compressobj(name)
+                self.assertEqual(content_type, codecs[name].content_type)
+                payload = b"".join(
+                    compressor.feed(data[i : i + 1000])
+                    for i in range(0, len(data), 1000)
+                )
+                payload += compressor.flush()
+
+                # The stream output can be decompressed in one go
+                _content_type, d = compression.decompress(payload, name)
+                self.assertEqual(d, data)
+
+                # and incrementally
+                _content_type, decompressor = compression.decompressobj(
+                    name, max_length=len(data)
+                )
+                d = b"".join(
+                    decompressor.feed(payload[i : i + 100])
+                    for i in range(0, len(payload), 100)
+                )
+                d += decompressor.flush()
+                self.assertEqual(d, data)
+
+    def test_decompress_with_max_length(self):
+        codecs = compression.registry.compressors
+        data = self.DATA
+        for name in codecs:
+            with self.subTest(f"Check {name} decompression output limit"):
+                _content_type, payload = compression.compress(data, name)
+                _content_type, d = compression.decompress(
+                    payload, name, max_length=len(data)
+                )
+                self.assertEqual(d, data)
+
+                with self.assertRaises(Exception) as cm:
+                    compression.decompress(payload, name, max_length=len(data) - 1)
+                self.assertIn("exceeds maximum length", str(cm.exception))
+
+    def test_decompression_bomb_is_aborted_early(self):
+        # A small payload that expands to a very large output
+        _content_type, payload = compression.compress(b"\0" * 2 ** 26, "zlib")
+        _content_type, decompressor = compression.decompressobj(
+            "zlib", max_length=2 ** 16
+        )
+        with self.assertRaises(Exception) as cm:
+            decompressor.feed(payload)
+        self.assertIn("exceeds maximum length", str(cm.exception))
+        self.assertLessEqual(decompressor.length, 2 ** 16 + 1)
+
+    @unittest.skipUnless(compression.have_brotli, "requires brotli")
+    def test_brotli_decompression_bomb_is_aborted_early(self):
+        _content_type, payload = compression.compress(b"\0" * 2 ** 28, "brotli")
+        _content_type, decompressor = compression.decompressobj(
+            "brotli", max_length=2 ** 16
+        )
+        with self.assertRaises(Exception) as cm:
+            decompressor.feed(payload)
+        self.assertIn("exceeds maximum length", str(cm.exception))
+        # The brotli output buffer grows in blocks so the limit can be
+        # overshot by a small amount.
+        self.assertLessEqual(decompressor.length, 2 ** 17)
+
+    @unittest.skipUnless(compression.have_zstd, "requires zstandard")
+    def test_zstd_decompression_bomb_is_aborted_early(self):
+        # A streamed frame does not record its content size in the header so
+        # it can only be rejected while it is being decompressed.
+        _content_type, compressor = compression.compressobj("zstd")
+        payload = compressor.feed(b"\0" * 2 ** 28) + compressor.flush()
+        _content_type, decompressor = compression.decompressobj(
+            "zstd", max_length=2 ** 16
+        )
+        with self.assertRaises(Exception) as cm:
+            decompressor.feed(payload)
+        self.assertIn("exceeds maximum length", str(cm.exception))
+        # At most one zstd block is decompressed beyond the limit
+        self.assertLessEqual(decompressor.length, 2 ** 16 + 2 ** 17)
+
+    def test_stream_decompression_of_truncated_data(self):
+        _content_type, payload = compression.compress(self.DATA, "zlib")
+        _content_type, decompressor = compression.decompressobj("zlib")
+        decompressor.feed(payload[: len(payload) // 2])
+        with self.assertRaises(Exception) as cm:
+            decompressor.flush()
+        self.assertIn("ended before the end-of-stream", str(cm.exception))
+
+    def test_block_decompression_with_max_length(self):
+        data = self.DATA
+        _content_type, payload = compression.compress_blocks(
+            data, "zlib", block_size=4096
+        )
+        _content_type, d = compression.decompress_blocks(
+            payload, "zlib", max_length=len(data)
+        )
+        self.assertEqual(d, data)
+        with self.assertRaises(Exception) as cm:
+            compression.decompress_blocks(payload, "zlib", max_length=len(data) - 1)
+        self.assertIn("exceeds maximum length", str(cm.exception))
+
+    def test_block_decompression_shares_max_length(self):
+        # Each block is within the limit but together they exceed it
+        block = zlib.compress(bytes(2 ** 20))
+        payload = compression._pack_blocks([block] * 20)
+        with self.assertRaises(Exception) as cm:
+            compression.decompress_blocks(payload, "zlib", max_length=2 ** 21)
+        self.assertIn("exceeds maximum length", str(cm.exception))
+
+        # A container with more blocks than the maximum length is rejected
+        # before any block is decompressed.
+        payload = compression._pack_blocks([block] * 8)
+        with self.assertRaises(Exception) as cm:
+            compression.decompress_blocks(payload, "zlib", max_length=4)
+        self.assertIn("blocks exceed maximum length", str(cm.exception))
+
+    async def test_async_block_decompression_shares_max_length(self):
+        block = zlib.compress(bytes(2 ** 20))
+        payload = compression._pack_blocks([block] * 20)
+        with self.assertRaises(Exception) as cm:
+            await compression.decompress_blocks_async(
+                payload, "zlib", max_length=2 ** 21
+            )
+        self.assertIn("exceeds maximum length", str(cm.exception))
+
+    async def test_async_stream_compression_roundtrip(self):
+        data = self.DATA
+
+        async def chunks(data, size):
+            for i in range(0, len(data), size):
+                yield data[i : i + size]
+
+        for name in compression.registry.compressors:
+            with self.subTest(f"Check {name} async stream compression roundtrip"):
+                payload = b"".join(
+                    [
+                        chunk
+                        async for chunk in compression.compress_stream(
+                            chunks(data, 1000), name
+                        )
+                    ]
+                )
+                d = b"".join(
+                    [
+                        chunk
+                        async for chunk in compression.decompress_stream(
+                            chunks(payload, 100), name, max_length=len(data)
+                        )
+                    ]
+                )
+                self.assertEqual(d, data)
+
+        _content_type, payload = compression.compress(data, "zlib")
+        with self.assertRaises(Exception) as cm:
+            async for _chunk in compression.decompress_stream(
+                chunks(payload, 100), "zlib", max_length=100
+            ):
+                pass
+        self.assertIn("exceeds maximum length", str(cm.exception))
+
+
+class BlockCompressionTestCase(asynctest.TestCase):
+
+    BLOCK_DATA = TEST_DATA * 1000
+
+    def test_block_compression_roundtrip(self):
+        codecs = compression.registry.compressors
+        for name in codecs:
+            with self.subTest(f"Check {name} block compression roundtrip"):
+                content_type, payload = compression.compress_blocks(
+                    self.BLOCK_DATA, name, block_size=4096
+                )
+                self.assertTrue(payload.startswith(compression.BLOCK_MAGIC))
+                content_type, d = compression.decompress_blocks(payload, content_type)
+                self.assertEqual(d, self.BLOCK_DATA)
+
+    def test_block_compression_of_empty_data(self):
+        content_type, payload = compression.compress_blocks(b"", "zlib")
+        content_type, d = compression.decompress_blocks(payload, content_type)
+        self.assertEqual(d, b"")
+
+    def test_block_decompression_of_invalid_data(self):
+        _content_type, payload = compression.compress_blocks(
+            self.BLOCK_DATA, "zlib", block_size=4096
+        )
+        for invalid in (b"", b"XXXX" + payload[4:], payload[:-1]):
+            with self.assertRaises(Exception) as cm:
+                compression.decompress_blocks(invalid, "zlib")
+            self.assertIn("Invalid block container", str(cm.exception))
+
+    async def test_async_block_compression_roundtrip(self):
+        content_type, payload = await compression.compress_blocks_async(
+            self.BLOCK_DATA, "zlib", block_size=4096, preset=compression.PRESET_FAST
+        )
+        content_type, d = await compression.decompress_blocks_async(
+            payload, content_type
+        )
+        self.assertEqual(d, self.BLOCK_DATA)
+
+        # Blocks created asynchronously can be decompressed synchronously
+        content_type, d = compression.decompress_blocks(payload, content_type)
+        self.assertEqual(d, self.BLOCK_DATA)
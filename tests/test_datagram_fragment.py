@@ -0,0 +1,102 @@
+import time
+import unittest
+import unittest.mock
+from gestalt.datagram import fragment
+
+
+ADDR = ("127.0.0.1", 5000)
+OVERHEAD = fragment.FRAGMENT_OVERHEAD
+
+
+class ReassemblerTestCase(unittest.TestCase):
+    def test_reassembly(self):
+        """ check fragments arriving in any order are reassembled """
+        reassembler = fragment.Reassembler()
+        self.assertIsNone(reassembler.add(ADDR, 1, 2, 3, b"ccc"))
+        self.assertIsNone(reassembler.add(ADDR, 1, 0, 3, memoryview(b"aaa")))
+        # Fragments of another message, and from another sender, are separate
+        self.assertIsNone(reassembler.add(ADDR, 2, 0, 2, b"xxx"))
+        self.assertIsNone(reassembler.add(("127.0.0.2", 5000), 1, 1, 3, b"zzz"))
+        self.assertEqual(reassembler.add(ADDR, 1, 1, 3, b"bbb"), b"aaabbbccc")
+
+        stats = reassembler.stats
+        self.assertEqual(stats["fragments_received"], 5)
+        self.assertEqual(stats["messages_reassembled"], 1)
+        self.assertEqual(stats["partial_messages"], 2)
+        self.assertEqual(stats["partial_bytes"], 6 + 2 * OVERHEAD)
+
+        reassembler.clear()
+        self.assertEqual(reassembler.stats["partial_messages"], 0)
+        self.assertEqual(reassembler.stats["partial_bytes"], 0)
+
+    def test_duplicate_and_inconsistent_fragments(self):
+        """ check duplicate and inconsistent fragments are ignored """
+        reassembler = fragment.Reassembler()
+        self.assertIsNone(reassembler.add(ADDR, 1, 0, 2, b"aaa"))
+        self.assertIsNone(reassembler.add(ADDR, 1, 0, 2, b"AAA"))
+        self.assertIsNone(reassembler.add(ADDR, 1, 1, 3, b"bbb"))
+        self.assertEqual(reassembler.stats["partial_bytes"], 3 + OVERHEAD)
+        self.assertEqual(reassembler.add(ADDR, 1, 1, 2, b"bbb"), b"aaabbb")
+
+    def test_expiry(self):
+        """ check partial messages are discarded after the timeout """
+        reassembler = fragment.Reassembler(timeout=5.0)
+        now = time.monotonic()
+        with unittest.mock.patch.object(fragment.time, "monotonic", return_value=now):
+            self.assertIsNone(reassembler.add(ADDR, 1, 0, 2, b"aaa"))
+        with unittest.mock.patch.object(
+            fragment.time, "monotonic", return_value=now + 6.0
+        ):
+            self.assertIsNone(reassembler.add(ADDR, 1, 1, 2, b"bbb"))
+        stats = reassembler.stats
+        self.assertEqual(stats["messages_expired"], 1)
+        self.assertEqual(stats["messages_reassembled"], 0)
+        self.assertEqual(stats["partial_messages"], 1)
+        self.assertEqual(stats["partial_bytes"], 3 + OVERHEAD)
+
+    def test_memory_caps(self):
+        """ check the message size and total size limits are enforced """
+        reassembler = fragment.Reassembler(
+            max_message_size=10, max_size=8 + 2 * OVERHEAD
+        )
+
+        # The message is too large given the size of its first fragment
+        self.assertIsNone(reassembler.add(ADDR, 1, 0, 4, b"aaaa"))
+        self.assertEqual(reassembler.stats["partial_messages"], 0)
+
+        # The message is too large once its final fragment arrives
+        self.assertIsNone(reassembler.add(ADDR, 2, 1, 2, b"b" * 7))
+        self.assertIsNone(reassembler.add(ADDR, 2, 0, 2, b"b" * 4))
+        self.assertEqual(reassembler.stats["messages_dropped"], 2)
+        self.assertEqual(reassembler.stats["partial_bytes"], 0)
+
+        # The oldest partial messages are discarded to stay within max_size
+        self.assertIsNone(reassembler.add(ADDR, 3, 0, 2, b"ccc"))
+        self.assertIsNone(reassembler.add(ADDR, 4, 0, 2, b"ddd"))
+        self.assertIsNone(reassembler.add(ADDR, 5, 0, 2, b"eee"))
+        stats = reassembler.stats
+        self.assertEqual(stats["messages_dropped"], 3)
+        self.assertEqual(stats["partial_messages"], 2)
+        self.assertEqual(stats["partial_bytes"], 6 + 2 * OVERHEAD)
+        self.assertIsNone(reassembler.add(ADDR, 3, 1, 2, b"ccc"))
+        self.assertEqual(reassembler.add(ADDR, 5, 1, 2, b"eee"), b"eeeeee")
+
+    def test_small_fragments(self):
+        """ check small fragments claiming a large count are limited """
+        # The fragment count is limited by the message and fragment sizes
+        reassembler = fragment.Reassembler(max_message_size=1000, fragment_size=100)
+        self.assertIsNone(reassembler.add(ADDR, 1, 0, 11, b"a"))
+        self.assertEqual(reassembler.stats["messages_dropped"], 1)
+        self.assertEqual(reassembler.stats["partial_messages"], 0)
+        self.assertIsNone(reassembler.add(ADDR, 2, 0, 10, b"a" * 100))
+        self.assertEqual(reassembler.stats["partial_messages"], 1)
+
+        # The per fragment overhead counts towards the memory limit
+        max_size = 100 * (1 + OVERHEAD)
+        reassembler = fragment.Reassembler(max_size=max_size)
+        for message_id in range(1000):
+            reassembler.add(ADDR, message_id, 0, fragment.MAX_FRAGMENTS, b"a")
+        stats = reassembler.stats
+        self.assertLessEqual(stats["partial_bytes"], max_size)
+        self.assertEqual(stats["partial_messages"], 100)
+        self.assertEqual(stats["messages_dropped"], 900)
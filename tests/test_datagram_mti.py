@@ -1,9 +1,23 @@
 import asyncio
 import asynctest
 import logging
+import socket
+import struct
 import unittest.mock
 from gestalt import serialization
-from gestalt.datagram.mti import MtiDatagramEndpoint
+from gestalt.datagram import batch
+from gestalt.datagram.mti import (
+    MtiDatagramEndpoint,
+    MtiFragmentDatagramEndpoint,
+    MtiMulticastReceiver,
+    MtiMulticastSender,
+    MtiReliableDatagramEndpoint,
+)
+from gestalt.datagram.protocols.mti import (
+    MTI_RELIABLE_HEADER_FORMAT,
+    RELIABLE_KIND_DATA,
+    MtiReliableDatagramProtocol,
+)
 
 
 class MtiDatagramEndpointTestCase(asynctest.TestCase):
@@ -406,3 +420,526 @@ class MtiDatagramEndpointTestCase(asynctest.TestCase):
         await receiver_ep.stop()
         self.assertTrue(receiver_on_stopped_mock.called)
         self.assertTrue(receiver_on_peer_unavailable_mock.called)
+
+    async def test_routes(self):
+        """ check messages are dispatched to the handler for their type """
+        receiver_on_message_mock = unittest.mock.Mock()
+        receiver_ep = MtiDatagramEndpoint(
+            on_message=receiver_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        position_handler_mock = unittest.mock.Mock()
+        receiver_ep.route(5, position_handler_mock)
+
+        await receiver_ep.start(local_addr=("127.0.0.1", 0))
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiDatagramEndpoint(content_type=serialization.CONTENT_TYPE_JSON)
+        await sender_ep.start(remote_addr=(address, port))
+        await asyncio.sleep(0.1)
+
+        sender_ep.send({"x": 1}, type_identifier=5)
+        sender_ep.send({"y": 2}, type_identifier=6)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(position_handler_mock.call_count, 1)
+        (args, kwargs) = position_handler_mock.call_args
+        self.assertEqual(args, (receiver_ep, {"x": 1}))
+        self.assertIn("addr", kwargs)
+        self.assertEqual(kwargs["type_identifier"], 5)
+
+        self.assertEqual(receiver_on_message_mock.call_count, 1)
+        (args, kwargs) = receiver_on_message_mock.call_args
+        self.assertEqual(args, (receiver_ep, {"y": 2}))
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+    async def test_batched_sender_receiver_interaction(self):
+        """ check batched endpoints send and receive batches of messages """
+        for use_mmsg in sorted({False, batch.have_mmsg}):
+            with self.subTest(use_mmsg=use_mmsg), unittest.mock.patch.object(
+                batch, "have_mmsg", use_mmsg
+            ):
+                receiver_on_message_mock = unittest.mock.Mock()
+                receiver_on_peer_available_mock = unittest.mock.Mock()
+                receiver_ep = MtiDatagramEndpoint(
+                    on_message=receiver_on_message_mock,
+                    on_peer_available=receiver_on_peer_available_mock,
+                    content_type=serialization.CONTENT_TYPE_JSON,
+                )
+                await receiver_ep.start(local_addr=("127.0.0.1", 0), batch_size=16)
+                self.assertTrue(receiver_on_peer_available_mock.called)
+                address, port = receiver_ep.bindings[0]
+
+                sender_ep = MtiDatagramEndpoint(
+                    content_type=serialization.CONTENT_TYPE_JSON
+                )
+                await sender_ep.start(remote_addr=(address, port), batch_size=16)
+                self.assertEqual(sender_ep.connections[0], (address, port))
+
+                # More messages than the batch size are split into batches
+                messages = [{"i": i} for i in range(40)]
+                sender_ep.send_many(messages, type_identifier=3)
+                sender_ep.send({"i": 40})
+                sender_ep.send_many([], type_identifier=3)
+                await asyncio.sleep(0.1)
+
+                self.assertEqual(receiver_on_message_mock.call_count, 41)
+                received = [
+                    args[1] for args, _ in receiver_on_message_mock.call_args_list
+                ]
+                self.assertEqual(received, messages + [{"i": 40}])
+                (args, kwargs) = receiver_on_message_mock.call_args_list[0]
+                self.assertEqual(kwargs["type_identifier"], 3)
+                self.assertEqual(kwargs["addr"], sender_ep.bindings[0])
+
+                # Replies can be sent to the sender's address
+                sender_on_message_mock = unittest.mock.Mock()
+                sender_ep._on_message_handler = sender_on_message_mock
+                receiver_ep._protocol.send_many(
+                    [b'{"x": 1}', b'{"x": 2}'], addr=kwargs["addr"], type_identifier=4
+                )
+                await asyncio.sleep(0.1)
+                self.assertEqual(sender_on_message_mock.call_count, 2)
+                (args, kwargs) = sender_on_message_mock.call_args
+                self.assertEqual(args[1], {"x": 2})
+                self.assertEqual(kwargs["type_identifier"], 4)
+
+                await sender_ep.stop()
+                await receiver_ep.stop()
+                self.assertEqual(receiver_ep.bindings, [])
+
+    async def test_zero_copy_receive(self):
+        """ check zero copy endpoints pass payloads as pooled buffer views """
+        for use_mmsg in sorted({False, batch.have_mmsg}):
+            with self.subTest(use_mmsg=use_mmsg), unittest.mock.patch.object(
+                batch, "have_mmsg", use_mmsg
+            ):
+                received = []
+                kept = []
+
+                def on_message(ep, data, **kwargs):
+                    self.assertIsInstance(data, memoryview)
+                    received.append(bytes(data))
+                    if data == b"keep":
+                        kept.append(data)
+
+                receiver_ep = MtiDatagramEndpoint(on_message=on_message)
+                await receiver_ep.start(
+                    local_addr=("127.0.0.1", 0), batch_size=4, zero_copy=True
+                )
+                address, port = receiver_ep.bindings[0]
+                pool = receiver_ep._protocol.transport._batch
+
+                sender_ep = MtiDatagramEndpoint()
+                await sender_ep.start(remote_addr=(address, port))
+
+                # Buffers are reused when payloads are not kept
+                messages = [f"message {i}".encode() for i in range(10)]
+                sender_ep.send_many(messages, type_identifier=1)
+                await asyncio.sleep(0.1)
+                self.assertEqual(received, messages)
+                self.assertEqual(pool.buffers_replaced, 0)
+
+                # Kept payloads are not overwritten by later datagrams
+                sender_ep.send(b"keep")
+                await asyncio.sleep(0.1)
+                sender_ep.send_many(messages)
+                await asyncio.sleep(0.1)
+                self.assertEqual(pool.buffers_replaced, 1)
+                self.assertEqual(kept, [b"keep"])
+
+                await sender_ep.stop()
+                await receiver_ep.stop()
+
+    async def test_zero_copy_lazy_message_copy(self):
+        """ check copied lazy messages don't hold pooled buffers """
+        received = []
+
+        receiver_ep = MtiDatagramEndpoint(
+            on_message=lambda ep, msg, **kwargs: received.append(msg.copy()),
+            content_type=serialization.CONTENT_TYPE_JSON,
+            lazy_decode=True,
+        )
+        await receiver_ep.start(local_addr=("127.0.0.1", 0), zero_copy=True)
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiDatagramEndpoint(content_type=serialization.CONTENT_TYPE_JSON)
+        await sender_ep.start(remote_addr=(address, port))
+        sender_ep.send({"x": 1}, type_identifier=2)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(received), 1)
+        msg = received[0]
+        self.assertIsInstance(msg.raw, bytes)
+        self.assertEqual(msg.data, {"x": 1})
+        self.assertEqual(msg.type_identifier, 2)
+        self.assertEqual(receiver_ep._protocol.transport._batch.buffers_replaced, 0)
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+    @unittest.skipUnless(serialization.have_numpy, "requires numpy")
+    async def test_zero_copy_retained_buffers_are_not_reused(self):
+        """ check buffers still referenced by decoded arrays are not reused """
+        np = serialization.np
+        arrays = []
+        receiver_ep = MtiDatagramEndpoint(
+            on_message=lambda ep, data, **kwargs: arrays.append(data),
+            content_type=serialization.CONTENT_TYPE_NUMPY,
+        )
+        await receiver_ep.start(
+            local_addr=("127.0.0.1", 0), batch_size=2, zero_copy=True
+        )
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiDatagramEndpoint(content_type=serialization.CONTENT_TYPE_NUMPY)
+        await sender_ep.start(remote_addr=(address, port))
+        sent = [np.full(8, i, dtype=np.int32) for i in range(6)]
+        for array in sent:
+            sender_ep.send(array)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(arrays), len(sent))
+        for received, expected in zip(arrays, sent):
+            np.testing.assert_array_equal(received, expected)
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+
+class MtiFragmentDatagramEndpointTestCase(asynctest.TestCase):
+    async def test_fragmented_sender_receiver_interaction(self):
+        """ check messages larger than the MTU are fragmented and reassembled """
+        for mtu, size in ((1400, 20000), (8192, 60000)):
+            with self.subTest(mtu=mtu, size=size):
+                receiver_on_message_mock = unittest.mock.Mock()
+                receiver_ep = MtiFragmentDatagramEndpoint(
+                    on_message=receiver_on_message_mock, mtu=mtu
+                )
+                await receiver_ep.start(local_addr=("127.0.0.1", 0))
+                address, port = receiver_ep.bindings[0]
+
+                sender_ep = MtiFragmentDatagramEndpoint(mtu=mtu)
+                await sender_ep.start(remote_addr=(address, port), batch_size=16)
+
+                large = bytes(i % 251 for i in range(size))
+                sender_ep.send(b"small", type_identifier=1)
+                sender_ep.send(large, type_identifier=2)
+                sender_ep.send_many([b"", b"x" * mtu], type_identifier=3)
+                await asyncio.sleep(0.2)
+
+                self.assertEqual(receiver_on_message_mock.call_count, 4)
+                calls = receiver_on_message_mock.call_args_list
+                received = [
+                    (args[1], kwargs["type_identifier"]) for args, kwargs in calls
+                ]
+                self.assertEqual(
+                    received, [(b"small", 1), (large, 2), (b"", 3), (b"x" * mtu, 3)]
+                )
+
+                stats = receiver_ep.reassembly_stats
+                self.assertEqual(stats["messages_reassembled"], 2)
+                self.assertEqual(stats["partial_messages"], 0)
+                self.assertEqual(stats["partial_bytes"], 0)
+
+                await sender_ep.stop()
+                await receiver_ep.stop()
+                self.assertEqual(receiver_ep.reassembly_stats, {})
+
+    async def test_fragment_size_limits(self):
+        """ check the MTU and message size limits are enforced """
+        with self.assertRaises(Exception) as cm:
+            MtiFragmentDatagramEndpoint(mtu=16)._protocol_factory()
+        self.assertIn("MTU must be larger than", str(cm.exception))
+
+        receiver_on_message_mock = unittest.mock.Mock()
+        receiver_ep = MtiFragmentDatagramEndpoint(
+            on_message=receiver_on_message_mock, mtu=1000, max_message_size=5000
+        )
+        await receiver_ep.start(local_addr=("127.0.0.1", 0))
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiFragmentDatagramEndpoint(mtu=1000)
+        await sender_ep.start(remote_addr=(address, port))
+        sender_ep.send(b"x" * 10000)
+        sender_ep.send(b"y" * 4000)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(receiver_on_message_mock.call_count, 1)
+        (args, _kwargs) = receiver_on_message_mock.call_args
+        self.assertEqual(args[1], b"y" * 4000)
+        self.assertGreaterEqual(receiver_ep.reassembly_stats["messages_dropped"], 1)
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+
+def drop_datagrams(ep, should_drop):
+    """ Simulate a lossy link by discarding datagrams received by an endpoint
+    for which should_drop returns True.
+    """
+    prot = ep._protocol
+    datagrams_received = prot.datagrams_received
+
+    def lossy_datagrams_received(datagrams):
+        datagrams_received([(d, a) for d, a in datagrams if not should_drop(d)])
+
+    prot.datagrams_received = lossy_datagrams_received
+
+
+def frame_header(data):
+    return struct.unpack_from(MTI_RELIABLE_HEADER_FORMAT, data)
+
+
+class MtiReliableDatagramEndpointTestCase(asynctest.TestCase):
+    async def test_reliable_delivery_over_lossy_link(self):
+        """ check lost messages are retransmitted and delivered once """
+        for ordered in (True, False):
+            with self.subTest(ordered=ordered):
+                receiver_on_message_mock = unittest.mock.Mock()
+                receiver_ep = MtiReliableDatagramEndpoint(
+                    on_message=receiver_on_message_mock,
+                    content_type=serialization.CONTENT_TYPE_JSON,
+                    ordered=ordered,
+                )
+                await receiver_ep.start(local_addr=("127.0.0.1", 0))
+                address, port = receiver_ep.bindings[0]
+
+                sender_ep = MtiReliableDatagramEndpoint(
+                    content_type=serialization.CONTENT_TYPE_JSON,
+                    ordered=ordered,
+                    window=16,
+                )
+                await sender_ep.start(remote_addr=(address, port))
+
+                # Drop the first transmission of every fifth message, and
+                # every third acknowledgement.
+                dropped = set()
+                acks = []
+
+                def drop_data(data):
+                    sequence = frame_header(data)[3]
+                    if sequence % 5 == 2 and sequence not in dropped:
+                        dropped.add(sequence)
+                        return True
+                    return False
+
+                def drop_acks(data):
+                    acks.append(data)
+                    return len(acks) % 3 == 0
+
+                drop_datagrams(receiver_ep, drop_data)
+                drop_datagrams(sender_ep, drop_acks)
+
+                for i in range(100):
+                    sender_ep.send({"i": i}, type_identifier=i % 2)
+                await asyncio.sleep(1.0)
+
+                self.assertEqual(receiver_on_message_mock.call_count, 100)
+                calls = receiver_on_message_mock.call_args_list
+                for type_identifier in (0, 1):
+                    received = [
+                        args[1]["i"]
+                        for args, kwargs in calls
+                        if kwargs["type_identifier"] == type_identifier
+                    ]
+                    expected = list(range(type_identifier, 100, 2))
+                    if ordered:
+                        self.assertEqual(received, expected)
+                    else:
+                        self.assertEqual(sorted(received), expected)
+
+                sender_stats = sender_ep.reliability_stats
+                self.assertEqual(sender_stats["messages_sent"], 100)
+                self.assertGreaterEqual(sender_stats["retransmits"], len(dropped))
+                self.assertGreater(sender_stats["nacks_received"], 0)
+                self.assertEqual(sender_stats["messages_lost"], 0)
+                peer_stats = sender_stats["peers"][(address, port)]
+                self.assertGreater(peer_stats["srtt"], 0)
+                self.assertEqual(peer_stats["in_flight"], 0)
+                self.assertEqual(peer_stats["backlog"], 0)
+
+                receiver_stats = receiver_ep.reliability_stats
+                self.assertEqual(receiver_stats["messages_delivered"], 100)
+                self.assertGreater(receiver_stats["acks_sent"], 0)
+                self.assertGreater(receiver_stats["nacks_sent"], 0)
+
+                await sender_ep.stop()
+                await receiver_ep.stop()
+                self.assertEqual(receiver_ep.reliability_stats, {})
+
+    async def test_abandoned_messages_are_skipped(self):
+        """ check messages that can't be delivered don't block later ones """
+        receiver_on_message_mock = unittest.mock.Mock()
+        receiver_ep = MtiReliableDatagramEndpoint(
+            on_message=receiver_on_message_mock, delivery_timeout=0.4
+        )
+        await receiver_ep.start(local_addr=("127.0.0.1", 0))
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiReliableDatagramEndpoint(max_retries=2, max_rto=0.1)
+        await sender_ep.start(remote_addr=(address, port))
+
+        # Every transmission of the second message is lost
+        drop_datagrams(
+            receiver_ep,
+            lambda data: frame_header(data)[3] == 1
+            and frame_header(data)[5] == RELIABLE_KIND_DATA,
+        )
+        sender_ep.send(b"a", type_identifier=1)
+        sender_ep.send(b"b", type_identifier=1)
+        sender_ep.send(b"c", type_identifier=1)
+        sender_ep.send(b"x", type_identifier=2)
+        await asyncio.sleep(0.1)
+
+        # Messages of other types are not delayed by the missing message
+        received = [
+            args[1] for args, _kwargs in receiver_on_message_mock.call_args_list
+        ]
+        self.assertEqual(received, [b"a", b"x"])
+
+        await asyncio.sleep(1.0)
+        received = [
+            args[1] for args, _kwargs in receiver_on_message_mock.call_args_list
+        ]
+        self.assertEqual(received, [b"a", b"x", b"c"])
+        self.assertEqual(sender_ep.reliability_stats["messages_lost"], 1)
+        self.assertEqual(receiver_ep.reliability_stats["messages_skipped"], 1)
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+    def test_send_before_connection_made(self):
+        """ check messages sent by an unconnected protocol are discarded """
+        prot = MtiReliableDatagramProtocol()
+        with self.assertLogs("gestalt.datagram.protocols.mti", level=logging.ERROR):
+            prot.send_many([b"a", b"b"], addr=("127.0.0.1", 9999))
+        self.assertEqual(prot.stats["messages_sent"], 0)
+        self.assertEqual(prot.stats["peers"], {})
+
+
+class MtiMulticastTestCase(asynctest.TestCase):
+    async def test_multicast_sender_receivers(self):
+        """ check multicast messages are delivered to every receiver """
+        group = "239.255.10.1"
+        on_message_mocks = [unittest.mock.Mock() for _ in range(3)]
+        receivers = [
+            MtiMulticastReceiver(
+                group,
+                0,
+                interfaces=["127.0.0.1"],
+                on_message=on_message_mocks[0],
+                content_type=serialization.CONTENT_TYPE_JSON,
+            )
+        ]
+        await receivers[0].start()
+        self.assertTrue(receivers[0].running)
+        _address, port = receivers[0].bindings[0]
+        for mock in on_message_mocks[1:]:
+            receiver = MtiMulticastReceiver(
+                group,
+                port,
+                interfaces=["127.0.0.1"],
+                on_message=mock,
+                content_type=serialization.CONTENT_TYPE_JSON,
+            )
+            await receiver.start()
+            self.assertTrue(receiver.running)
+            receivers.append(receiver)
+        self.assertEqual(receivers[0].memberships, {(group, "127.0.0.1", None)})
+
+        sender_ep = MtiMulticastSender(
+            group,
+            port,
+            interface="127.0.0.1",
+            ttl=1,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        await sender_ep.start()
+        self.assertTrue(sender_ep.running)
+        self.assertEqual(sender_ep.connections[0], (group, port))
+
+        sender_ep.send({"x": 1}, type_identifier=3)
+        await asyncio.sleep(0.1)
+
+        for mock in on_message_mocks:
+            self.assertEqual(mock.call_count, 1)
+            (args, kwargs) = mock.call_args
+            self.assertEqual(args[1], {"x": 1})
+            self.assertEqual(kwargs["type_identifier"], 3)
+
+        # A receiver that leaves the group stops receiving its messages
+        receivers[2].leave(group, "127.0.0.1")
+        self.assertEqual(receivers[2].memberships, set())
+        sender_ep.send_many([{"x": 2}, {"x": 3}])
+        await asyncio.sleep(0.1)
+        self.assertEqual(on_message_mocks[0].call_count, 3)
+        self.assertEqual(on_message_mocks[2].call_count, 1)
+
+        await sender_ep.stop()
+        for receiver in receivers:
+            await receiver.stop()
+            self.assertEqual(receiver.memberships, set())
+
+    async def test_source_specific_multicast(self):
+        """ check receivers only get datagrams from the sources they joined """
+        group = "232.1.1.1"
+        on_message_mock = unittest.mock.Mock()
+        receiver_ep = MtiMulticastReceiver(
+            group,
+            0,
+            interfaces=["127.0.0.1"],
+            sources=["127.0.0.1"],
+            on_message=on_message_mock,
+        )
+        await receiver_ep.start(batch_size=8)
+        self.assertTrue(receiver_ep.running)
+        _address, port = receiver_ep.bindings[0]
+
+        sender_ep = MtiMulticastSender(group, port, interface="127.0.0.1")
+        await sender_ep.start(local_addr=("127.0.0.1", 0))
+        other_sender_ep = MtiMulticastSender(group, port, interface="127.0.0.1")
+        await other_sender_ep.start(local_addr=("127.0.0.2", 0))
+
+        sender_ep.send(b"from source")
+        other_sender_ep.send(b"from another source")
+        await asyncio.sleep(0.1)
+        self.assertEqual(on_message_mock.call_count, 1)
+        self.assertEqual(on_message_mock.call_args[0][1], b"from source")
+
+        # Datagrams from a source are received once it is joined
+        receiver_ep.join(group, "127.0.0.1", source="127.0.0.2")
+        other_sender_ep.send(b"from another source")
+        await asyncio.sleep(0.1)
+        self.assertEqual(on_message_mock.call_count, 2)
+        self.assertEqual(on_message_mock.call_args[0][1], b"from another source")
+
+        await other_sender_ep.stop()
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+    async def test_sender_options(self):
+        """ check multicast sender socket options """
+        sender_ep = MtiMulticastSender("239.255.10.3", 9999, ttl=4, loopback=False)
+        await sender_ep.start()
+        sock = sender_ep._protocol.transport.get_extra_info("socket")
+        self.assertEqual(sock.getsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL), 4)
+        self.assertEqual(
+            sock.getsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP), 0
+        )
+        await sender_ep.stop()
+
+    async def test_invalid_group(self):
+        """ check non multicast group addresses are rejected """
+        with self.assertRaises(Exception) as cm:
+            MtiMulticastReceiver("127.0.0.1", 0)
+        self.assertIn("is not a multicast group address", str(cm.exception))
+
+    async def test_sender_ipv4_interface_index(self):
+        """ check IPv4 sender interfaces must be given by their address """
+        sender_ep = MtiMulticastSender("239.255.10.4", 9999, interface=1)
+        await sender_ep.start()
+        self.assertFalse(sender_ep.running)
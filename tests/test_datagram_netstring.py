@@ -3,7 +3,11 @@ import asynctest
 import logging
 import unittest.mock
 from gestalt import serialization
-from gestalt.datagram.netstring import NetstringDatagramEndpoint
+from gestalt.datagram.netstring import (
+    NetstringDatagramEndpoint,
+    NetstringMulticastReceiver,
+    NetstringMulticastSender,
+)
 
 
 class NetstringDatagramEndpointTestCase(asynctest.TestCase):
@@ -283,3 +287,52 @@ class NetstringDatagramEndpointTestCase(asynctest.TestCase):
         await receiver_ep.stop()
         self.assertTrue(receiver_on_stopped_mock.called)
         self.assertTrue(receiver_on_peer_unavailable_mock.called)
+
+    async def test_batched_sender_receiver_interaction(self):
+        """ check batched endpoints send and receive batches of messages """
+        receiver_on_message_mock = unittest.mock.Mock()
+        receiver_ep = NetstringDatagramEndpoint(
+            on_message=receiver_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_TEXT,
+        )
+        await receiver_ep.start(local_addr=("127.0.0.1", 0), batch_size=8)
+        address, port = receiver_ep.bindings[0]
+
+        sender_ep = NetstringDatagramEndpoint(
+            content_type=serialization.CONTENT_TYPE_TEXT
+        )
+        await sender_ep.start(remote_addr=(address, port), batch_size=8)
+
+        messages = [f"message {i}" for i in range(20)]
+        sender_ep.send_many(messages)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(receiver_on_message_mock.call_count, len(messages))
+        received = [args[1] for args, _ in receiver_on_message_mock.call_args_list]
+        self.assertEqual(received, messages)
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
+
+    async def test_multicast_sender_receiver(self):
+        """ check netstring multicast sender and receiver interactions """
+        group = "239.255.10.2"
+        receiver_on_message_mock = unittest.mock.Mock()
+        receiver_ep = NetstringMulticastReceiver(
+            group, 0, interfaces=["127.0.0.1"], on_message=receiver_on_message_mock
+        )
+        await receiver_ep.start(zero_copy=True)
+        _address, port = receiver_ep.bindings[0]
+
+        sender_ep = NetstringMulticastSender(group, port, interface="127.0.0.1")
+        await sender_ep.start(batch_size=8)
+        sender_ep.send_many([b"one", b"two"])
+        await asyncio.sleep(0.1)
+
+        received = [
+            bytes(args[1]) for args, _ in receiver_on_message_mock.call_args_list
+        ]
+        self.assertEqual(received, [b"one", b"two"])
+
+        await sender_ep.stop()
+        await receiver_ep.stop()
@@ -0,0 +1,111 @@
+import unittest
+from gestalt.datagram import reliable
+
+
+class ReliableTestCase(unittest.TestCase):
+    def test_unwrap(self):
+        """ check uint32 sequence numbers are extended across wrap around """
+        self.assertEqual(reliable.unwrap(5, 3), 5)
+        self.assertEqual(reliable.unwrap(1, 3), 1)
+        self.assertEqual(reliable.unwrap(2, 0xFFFFFFFE), 0x100000002)
+        self.assertEqual(reliable.unwrap(0xFFFFFFFE, 0x100000002), 0xFFFFFFFE)
+
+    def test_sequencer(self):
+        """ check items are put back into sequence """
+        sequencer = reliable.Sequencer()
+        self.assertEqual(sequencer.add(0, "a", 0.0), ["a"])
+        self.assertEqual(sequencer.add(2, "c", 0.0), [])
+        self.assertEqual(sequencer.add(3, "d", 0.0), [])
+        self.assertIn(0, sequencer)
+        self.assertIn(3, sequencer)
+        self.assertNotIn(1, sequencer)
+        self.assertEqual(sequencer.add(1, "b", 0.0), ["b", "c", "d"])
+        self.assertEqual(sequencer.next, 4)
+        self.assertEqual(sequencer.held, {})
+
+    def test_sequencer_expiry(self):
+        """ check missing items are skipped after the timeout """
+        sequencer = reliable.Sequencer()
+        sequencer.add(2, "c", 1.0)
+        sequencer.add(5, "f", 3.0)
+        self.assertEqual(sequencer.expire(2.0, 5.0), ([], 0))
+        self.assertEqual(sequencer.expire(6.5, 5.0), (["c"], 2))
+        self.assertEqual(sequencer.next, 3)
+        self.assertEqual(sequencer.expire(8.0, 5.0), (["f"], 2))
+        self.assertEqual(sequencer.next, 6)
+        self.assertEqual(sequencer.add(6, "g", 8.0), ["g"])
+
+    def test_send_window(self):
+        """ check messages beyond the window wait in the backlog """
+        state = reliable.SendState(window=2)
+        self.assertEqual(state.allocate(1, ordered=True), (0, 0))
+        self.assertEqual(state.allocate(2, ordered=True), (1, 0))
+        self.assertEqual(state.allocate(1, ordered=True), (2, 1))
+        self.assertEqual(state.allocate(1, ordered=False), (3, 0))
+        for sequence in range(4):
+            state.backlog.append((sequence, bytes([sequence])))
+
+        self.assertEqual(state.release(0.0), [b"\x00", b"\x01"])
+        self.assertEqual(state.stats["in_flight"], 2)
+        self.assertEqual(state.stats["backlog"], 2)
+
+        # Acknowledge message 1 using the bitmap
+        self.assertEqual(state.acknowledge(0, 0b1, 0.1), (1, []))
+        self.assertAlmostEqual(state.srtt, 0.1)
+        self.assertEqual(state.release(0.1), [b"\x02"])
+        self.assertEqual(state.acknowledge(3, 0, 0.2), (2, []))
+        self.assertEqual(state.release(0.2), [b"\x03"])
+
+    def test_rtt_estimate(self):
+        """ check the retransmission timeout follows the round trip time """
+        state = reliable.SendState(min_rto=0.05, max_rto=2.0)
+        state.update_rtt(0.1)
+        self.assertAlmostEqual(state.srtt, 0.1)
+        self.assertAlmostEqual(state.rttvar, 0.05)
+        self.assertAlmostEqual(state.rto, 0.3)
+        for _ in range(50):
+            state.update_rtt(0.001)
+        self.assertEqual(state.rto, 0.05)
+        state.update_rtt(10.0)
+        self.assertEqual(state.rto, 2.0)
+
+    def test_loss_detection(self):
+        """ check messages are retransmitted when later ones are acknowledged """
+        state = reliable.SendState()
+        for sequence in range(5):
+            state.allocate(0, ordered=False)
+            state.backlog.append((sequence, bytes([sequence])))
+        state.release(0.0)
+
+        # Message 0 is lost once message 3 is acknowledged
+        self.assertEqual(state.acknowledge(0, 0b1, 0.1), (1, []))
+        self.assertEqual(state.acknowledge(0, 0b11, 0.1), (1, []))
+        self.assertEqual(state.acknowledge(0, 0b111, 0.1), (1, [b"\x00"]))
+        self.assertEqual(list(state.pending), [0, 4])
+        # A retransmitted message is not lost again until a message sent
+        # after it is acknowledged.
+        self.assertEqual(state.acknowledge(0, 0b1111, 0.2), (1, []))
+        state.backlog.append((5, b"\x05"))
+        state.release(0.3)
+        self.assertEqual(state.acknowledge(0, 0b11111, 0.4), (1, [b"\x00"]))
+
+    def test_retransmission_timeout(self):
+        """ check timeouts send probes, back off and abandon messages """
+        state = reliable.SendState(min_rto=0.1, max_rto=1.0)
+        for sequence in range(4):
+            state.allocate(0, ordered=False)
+            state.backlog.append((sequence, bytes([sequence])))
+        state.release(0.0)
+        rto = state.rto
+
+        self.assertEqual(state.expire(rto / 2, max_retries=2), ([], 0))
+        frames, abandoned = state.expire(rto, max_retries=2)
+        self.assertEqual(frames, [b"\x00", b"\x01"])
+        self.assertEqual(abandoned, 0)
+        # The timeout of every expired message is backed off
+        self.assertEqual(state.expire(rto * 2, max_retries=2), ([], 0))
+        frames, abandoned = state.expire(rto * 3, max_retries=2)
+        self.assertEqual(len(frames), 2)
+        frames, abandoned = state.expire(rto * 10, max_retries=2)
+        self.assertEqual((frames, abandoned), ([], 4))
+        self.assertEqual(len(state.pending), 0)
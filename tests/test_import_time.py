@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import unittest
+from gestalt import serialization
+
+
+# Optional libraries that must not be imported until they are used
+LAZY_MODULES = (
+    "aio_pika",
+    "avro.io",
+    "fastavro",
+    "google.protobuf.message",
+    "msgpack",
+    "numpy",
+    "yaml",
+    "yarl",
+)
+
+
+def import_times(statement: str) -> dict:
+    """ Run a statement in a new interpreter and return the cumulative
+    import time, in microseconds, of every module it imported.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.decode().splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def is_imported(times: dict, name: str) -> bool:
+    """ Check whether a module, or any of its submodules, was imported.
+
+    Modules that are loaded lazily, or using importlib, are not reported by
+    importtime themselves but the modules they import are.
+    """
+    return any(n == name or n.startswith(f"{name}.") for n in times)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime requires Python 3.7")
+class ImportTimeTestCase(unittest.TestCase):
+    def test_import_does_not_load_optional_libraries(self):
+        """ check importing gestalt does not import optional libraries """
+        times = import_times(
+            "import gestalt.amq, gestalt.serialization, gestalt.stream.netstring"
+        )
+        for name in LAZY_MODULES:
+            with self.subTest(f"Check {name} is not imported"):
+                self.assertFalse(is_imported(times, name))
+
+    @unittest.skipUnless(serialization.have_msgpack, "requires msgpack")
+    def test_library_is_imported_on_first_use(self):
+        """ check an optional library is imported when its codec is used """
+        times = import_times(
+            "from gestalt import serialization\n"
+            "assert 'msgpack' in serialization.registry.serializers\n"
+            "data = serialization.dumps({'a': 1}, 'msgpack')[2]\n"
+            "assert serialization.loads(data, 'msgpack', None) == {'a': 1}\n"
+        )
+        self.assertTrue(is_imported(times, "msgpack"))
+        self.assertFalse(is_imported(times, "yaml"))
+
+    def test_amq_submodules_are_imported_on_first_use(self):
+        """ check gestalt.amq submodules are imported when accessed """
+        times = import_times("import gestalt.amq\ngestalt.amq.utils")
+        self.assertTrue(is_imported(times, "yarl"))
+        self.assertFalse(is_imported(times, "aio_pika"))
@@ -1,6 +1,15 @@
+import json
 import unittest
+import unittest.mock
 from gestalt import serialization
 
+try:
+    import numpy
+
+    have_numpy = True
+except ImportError:
+    have_numpy = False
+
 
 class SerializationTestCase(unittest.TestCase):
     def tearDown(self):
@@ -265,3 +274,560 @@ class SerializationTestCase(unittest.TestCase):
             type_identifier=type_identifier,
         )
         self.assertEqual(protobuf_data, recovered_data)
+
+    @unittest.skipUnless(serialization.have_protobuf, "requires google protobuf")
+    def test_protobuf_object_registry_caches_classes(self):
+        from position_pb2 import Position
+
+        serializer = serialization.registry.get_serializer("protobuf")
+        object_registry = type(serializer.registry)()
+
+        # Messages can be registered using a class or an instance
+        type_identifier = object_registry.register_message(Position())
+        self.assertIs(object_registry.get_class_by_id(type_identifier), Position)
+        self.assertEqual(
+            object_registry.get_id_for_object(Position(latitude=1.0)), type_identifier
+        )
+        self.assertIsInstance(
+            object_registry.get_object_by_id(type_identifier), Position
+        )
+
+        with self.assertRaises(KeyError):
+            object_registry.get_object_by_id(type_identifier + 1)
+
+    @unittest.skipUnless(serialization.have_protobuf, "requires google protobuf")
+    def test_protobuf_requires_type_identifier(self):
+        from position_pb2 import Position
+
+        _ct, _ce, payload = serialization.dumps(Position(latitude=1.0), "protobuf")
+        for loads in (serialization.loads, serialization.loads_many):
+            with self.subTest(loads.__name__):
+                with self.assertRaises(Exception) as cm:
+                    loads(payload, serialization.CONTENT_TYPE_PROTOBUF, "binary")
+                self.assertIn("requires a type_identifier", str(cm.exception))
+
+    @unittest.skipUnless(serialization.have_protobuf, "requires google protobuf")
+    def test_protobuf_message_reuse(self):
+        from position_pb2 import Position
+
+        default_serializer = serialization.registry.get_serializer("protobuf")
+        object_registry = type(default_serializer.registry)()
+        type_identifier = object_registry.register_message(Position)
+        serializer = type(default_serializer)(
+            object_registry=object_registry, reuse_messages=True
+        )
+
+        first = Position(latitude=130.0, longitude=-30.0, status=Position.SIMULATED)
+        second = Position(altitude=50.0)
+
+        obj1 = serializer.decode(
+            serializer.encode(first), type_identifier=type_identifier
+        )
+        self.assertEqual(obj1, first)
+
+        obj2 = serializer.decode(
+            serializer.encode(second), type_identifier=type_identifier
+        )
+        # The same message object is reused and fields from the previous
+        # message are cleared.
+        self.assertIs(obj1, obj2)
+        self.assertEqual(obj2, second)
+
+        # Without reuse a new message object is returned for every message
+        serializer.reuse_messages = False
+        obj3 = serializer.decode(
+            serializer.encode(first), type_identifier=type_identifier
+        )
+        self.assertIsNot(obj3, obj2)
+        self.assertEqual(obj3, first)
+
+    def test_loads_from_memoryview_slices(self):
+        data = {
+            "string": "The quick brown fox jumps over the lazy dog",
+            "int": 10,
+            "list": ["george", "jerry", "elaine", "cosmo"],
+        }
+        names = [
+            name
+            for name in ("text", "json", "msgpack", "yaml")
+            if name in serialization.registry.serializers
+        ]
+        for name in names:
+            with self.subTest(f"Check {name} decodes a memoryview slice"):
+                value = str(data) if name == "text" else data
+                content_type, content_encoding, payload = serialization.dumps(
+                    value, name
+                )
+                # Embed the payload in a larger buffer, as a receive path would
+                view = memoryview(b"head" + payload + b"tail")[4:-4]
+                recovered_data = serialization.loads(
+                    view, content_type=content_type, content_encoding=content_encoding
+                )
+                self.assertEqual(value, recovered_data)
+
+    def test_dumps_buffer_objects(self):
+        binary_data = b"The Quick Brown Fox Jumps Over The Lazy Dog"
+        for value in (bytearray(binary_data), memoryview(binary_data)[4:]):
+            with self.subTest(f"Check {type(value)} is serialized as data"):
+                content_type, content_encoding, payload = serialization.dumps(value)
+                self.assertEqual(content_type, serialization.CONTENT_TYPE_DATA)
+                self.assertEqual(content_encoding, "binary")
+                self.assertEqual(bytes(payload), bytes(value))
+
+    def test_json_backends_roundtrip(self):
+        json_data = {
+            "string": "The quick brown fox jumps over the lazy dog",
+            "int": 10,
+            "float": 3.14159265,
+            "unicode": "Thé quick brown fox jumps over thé lazy dog",
+            "list": ["george", "jerry", "elaine", "cosmo"],
+        }
+        available = {
+            serialization.JSON_BACKEND_ORJSON: serialization.have_orjson,
+            serialization.JSON_BACKEND_UJSON: serialization.have_ujson,
+            serialization.JSON_BACKEND_RAPIDJSON: serialization.have_rapidjson,
+            serialization.JSON_BACKEND_STDLIB: True,
+        }
+        for backend in serialization.JSON_BACKENDS:
+            if not available[backend]:
+                continue
+            with self.subTest(f"Check {backend} JSON backend roundtrip"):
+                reg = serialization.SerializerRegistry()
+                serialization.register_json(reg, backend=backend)
+                serializer = reg.get_serializer(serialization.CONTENT_TYPE_JSON)
+                self.assertEqual(serializer.backend, backend)
+
+                content_type, content_encoding, payload = reg.dumps(json_data, "json")
+                self.assertIsInstance(payload, bytes)
+                self.assertEqual(content_type, serialization.CONTENT_TYPE_JSON)
+                self.assertEqual(content_encoding, "utf-8")
+
+                # The stdlib decoder must understand every backend's output
+                self.assertEqual(json.loads(payload), json_data)
+
+                for data in (payload, bytearray(payload), memoryview(payload)):
+                    recovered_data = reg.loads(data, content_type, content_encoding)
+                    self.assertEqual(json_data, recovered_data)
+
+    def test_json_default_backend_is_fastest_available(self):
+        serializer = serialization.registry.get_serializer("json")
+        if serialization.have_orjson:
+            self.assertEqual(serializer.backend, serialization.JSON_BACKEND_ORJSON)
+        self.assertIn(serializer.backend, serialization.JSON_BACKENDS)
+
+    def test_json_unavailable_backend(self):
+        reg = serialization.SerializerRegistry()
+        with self.assertRaises(Exception) as cm:
+            serialization.register_json(reg, backend="invalid")
+        self.assertIn("JSON backend 'invalid' is not available", str(cm.exception))
+
+    @unittest.skipUnless(have_numpy, "requires numpy")
+    def test_json_numpy_option(self):
+        data = {"array": numpy.arange(4), "scalar": numpy.float64(1.5)}
+        for backend in (
+            serialization.JSON_BACKEND_ORJSON,
+            serialization.JSON_BACKEND_STDLIB,
+        ):
+            if backend == "orjson" and not serialization.have_orjson:
+                continue
+            with self.subTest(f"Check {backend} JSON backend numpy support"):
+                reg = serialization.SerializerRegistry()
+                serialization.register_json(reg, backend=backend, numpy=True)
+                _ct, _ce, payload = reg.dumps(data, "json")
+                recovered_data = reg.loads(
+                    payload, serialization.CONTENT_TYPE_JSON, "utf-8"
+                )
+                self.assertEqual(recovered_data, {"array": [0, 1, 2, 3], "scalar": 1.5})
+
+    def test_bind_codec(self):
+        data = {"string": "The quick brown fox jumps over the lazy dog", "int": 10}
+        codec = serialization.registry.bind("json")
+        self.assertIs(codec, serialization.registry.bind("json"))
+        self.assertEqual(codec.name, "json")
+        self.assertEqual(codec.content_type, serialization.CONTENT_TYPE_JSON)
+        self.assertEqual(codec.content_encoding, "utf-8")
+        self.assertIs(codec.serializer, serialization.registry.get_serializer("json"))
+
+        by_type = serialization.registry.bind(serialization.CONTENT_TYPE_JSON)
+        self.assertEqual(by_type.name, "json")
+
+        payload = codec.encode(data)
+        _ct, _ce, expected_payload = serialization.dumps(data, "json")
+        self.assertEqual(payload, expected_payload)
+        self.assertEqual(codec.decode(payload), data)
+
+        with self.assertRaises(Exception) as cm:
+            serialization.registry.bind("invalid")
+        self.assertIn("Invalid serializer", str(cm.exception))
+
+    def test_bind_none_codec_uses_best_guess(self):
+        codec = serialization.registry.bind(serialization.CONTENT_TYPE_DATA)
+        self.assertIsNone(codec.name)
+        self.assertEqual(codec.encode(b"\x00\x01"), b"\x00\x01")
+        self.assertEqual(codec.encode("text"), b"text")
+        self.assertEqual(codec.decode(b"\x00\x01"), b"\x00\x01")
+
+    def test_bind_cache_is_cleared_on_register(self):
+        reg = serialization.SerializerRegistry()
+        serialization.register_json(reg, backend=serialization.JSON_BACKEND_STDLIB)
+        codec = reg.bind("json")
+        serialization.register_json(reg, backend=serialization.JSON_BACKEND_STDLIB)
+        self.assertIsNot(codec, reg.bind("json"))
+        self.assertIs(reg.bind("json").serializer, reg.get_serializer("json"))
+
+    def test_avro_backends_roundtrip(self):
+        message_schema = {
+            "namespace": "unittest.serialization",
+            "type": "record",
+            "name": "Backend",
+            "fields": [
+                {"name": "string", "type": "string"},
+                {"name": "int", "type": ["int", "null"]},
+                {"name": "list", "type": {"type": "array", "items": "string"}},
+            ],
+        }
+        avro_data = {
+            "string": "The quick brown fox jumps over the lazy dog",
+            "int": 10,
+            "list": ["george", "jerry", "elaine", "cosmo"],
+        }
+        available = {
+            serialization.AVRO_BACKEND_FASTAVRO: serialization.have_fastavro,
+            serialization.AVRO_BACKEND_AVRO: serialization.have_avro,
+        }
+        payloads = []
+        for backend, is_available in available.items():
+            if not is_available:
+                continue
+            with self.subTest(f"Check {backend} Avro backend roundtrip"):
+                reg = serialization.SerializerRegistry()
+                serialization.register_avro(reg, backend=backend)
+                serializer = reg.get_serializer("avro")
+                self.assertEqual(serializer.backend, backend)
+                type_identifier = serializer.registry.register_message(message_schema)
+
+                _ct, _ce, payload = reg.dumps(
+                    avro_data, "avro", type_identifier=type_identifier
+                )
+                payloads.append(payload)
+                for data in (payload, memoryview(payload)):
+                    recovered_data = reg.loads(
+                        data,
+                        serialization.CONTENT_TYPE_AVRO,
+                        "binary",
+                        type_identifier=type_identifier,
+                    )
+                    self.assertEqual(avro_data, recovered_data)
+
+                with self.assertRaises(KeyError):
+                    reg.loads(
+                        payload,
+                        serialization.CONTENT_TYPE_AVRO,
+                        "binary",
+                        type_identifier=type_identifier + 1,
+                    )
+
+        # The backends produce the same wire format
+        self.assertEqual(len(set(payloads)), 1)
+
+    @unittest.skipUnless(serialization.have_avro, "requires avro")
+    def test_avro_datum_writers_and_readers_are_cached(self):
+        message_schema = {"type": "record", "name": "Cached", "fields": []}
+        reg = serialization.SerializerRegistry()
+        serialization.register_avro(reg, backend=serialization.AVRO_BACKEND_AVRO)
+        schema_registry = reg.get_serializer("avro").registry
+        type_identifier = schema_registry.register_message(message_schema)
+
+        writer = schema_registry.get_datum_writer(type_identifier)
+        reader = schema_registry.get_datum_reader(type_identifier)
+        self.assertIs(writer, schema_registry.get_datum_writer(type_identifier))
+        self.assertIs(reader, schema_registry.get_datum_reader(type_identifier))
+
+        # Registering a schema again discards the cached objects
+        schema_registry.register_message(message_schema, type_identifier)
+        self.assertIsNot(writer, schema_registry.get_datum_writer(type_identifier))
+        self.assertIsNot(reader, schema_registry.get_datum_reader(type_identifier))
+
+    def test_avro_unavailable_backend(self):
+        if not (serialization.have_avro or serialization.have_fastavro):
+            self.skipTest("requires avro or fastavro")
+        reg = serialization.SerializerRegistry()
+        with self.assertRaises(Exception) as cm:
+            serialization.register_avro(reg, backend="invalid")
+        self.assertIn("Avro backend 'invalid' is not available", str(cm.exception))
+
+    def test_avro_requires_type_identifier(self):
+        if not (serialization.have_avro or serialization.have_fastavro):
+            self.skipTest("requires avro or fastavro")
+        with self.assertRaises(Exception) as cm:
+            serialization.dumps({"name": "test"}, "avro")
+        self.assertIn("requires a type_identifier", str(cm.exception))
+
+    def test_dumps_many_loads_many_roundtrip(self):
+        items = [
+            {"string": "The quick brown fox", "int": i, "list": ["george", "jerry"]}
+            for i in range(5)
+        ]
+        names = [
+            name
+            for name in ("json", "msgpack", "yaml")
+            if name in serialization.registry.serializers
+        ]
+        for name in names:
+            with self.subTest(f"Check {name} batch roundtrip"):
+                content_type, content_encoding, payload = serialization.dumps_many(
+                    items, name
+                )
+                self.assertEqual(
+                    content_type, serialization.registry.name_to_type[name]
+                )
+                self.assertIsInstance(payload, bytes)
+                for data in (payload, memoryview(b"head" + payload)[4:]):
+                    recovered_items = serialization.loads_many(
+                        data, content_type, content_encoding
+                    )
+                    self.assertEqual(items, recovered_items)
+
+                # Truncated batches are detected
+                with self.assertRaises(Exception):
+                    serialization.loads_many(
+                        payload[:-1], content_type, content_encoding
+                    )
+
+        # Other serializers use the default length prefixed batch format
+        payloads = [b"\x00\x01", b"", b"\x02" * 300]
+        content_type, content_encoding, payload = serialization.dumps_many(
+            payloads, serialization.CONTENT_TYPE_DATA
+        )
+        recovered_items = serialization.loads_many(
+            payload, content_type, content_encoding
+        )
+        self.assertEqual(payloads, [bytes(item) for item in recovered_items])
+
+        # The default serializer is used when none is specified
+        content_type, _ce, payload = serialization.dumps_many(items)
+        self.assertEqual(content_type, serialization.CONTENT_TYPE_JSON)
+        self.assertEqual(serialization.loads_many(b"", content_type, _ce), [])
+
+        codec = serialization.registry.bind("json")
+        self.assertEqual(codec.decode_many(codec.encode_many(items)), items)
+
+    def test_avro_dumps_many_loads_many_roundtrip(self):
+        if not (serialization.have_avro or serialization.have_fastavro):
+            self.skipTest("requires avro or fastavro")
+        message_schema = {
+            "type": "record",
+            "name": "Batch",
+            "fields": [
+                {"name": "string", "type": "string"},
+                {"name": "int", "type": "int"},
+            ],
+        }
+        items = [{"string": "The quick brown fox", "int": i} for i in range(5)]
+        available = {
+            serialization.AVRO_BACKEND_FASTAVRO: serialization.have_fastavro,
+            serialization.AVRO_BACKEND_AVRO: serialization.have_avro,
+        }
+        payloads = []
+        for backend, is_available in available.items():
+            if not is_available:
+                continue
+            with self.subTest(f"Check {backend} Avro batch roundtrip"):
+                reg = serialization.SerializerRegistry()
+                serialization.register_avro(reg, backend=backend)
+                serializer = reg.get_serializer("avro")
+                type_identifier = serializer.registry.register_message(message_schema)
+                content_type, content_encoding, payload = reg.dumps_many(
+                    items, "avro", type_identifier=type_identifier
+                )
+                payloads.append(payload)
+                recovered_items = reg.loads_many(
+                    payload,
+                    content_type,
+                    content_encoding,
+                    type_identifier=type_identifier,
+                )
+                self.assertEqual(items, recovered_items)
+
+        # Batches are consecutive datums, the same for both backends
+        self.assertEqual(len(set(payloads)), 1)
+
+    @unittest.skipUnless(serialization.have_protobuf, "requires google protobuf")
+    def test_protobuf_dumps_many_loads_many_roundtrip(self):
+        from position_pb2 import Position
+
+        serializer = serialization.registry.get_serializer("protobuf")
+        type_identifier = serializer.registry.register_message(
+            Position, type_identifier=1
+        )
+        items = [
+            Position(latitude=float(i), longitude=-30.0, status=Position.SIMULATED)
+            for i in range(5)
+        ]
+        content_type, content_encoding, payload = serialization.dumps_many(
+            items, "protobuf"
+        )
+        recovered_items = serialization.loads_many(
+            payload, content_type, content_encoding, type_identifier=type_identifier
+        )
+        self.assertEqual(items, recovered_items)
+
+        with self.assertRaises(Exception) as cm:
+            serialization.loads_many(
+                payload, content_type, content_encoding, type_identifier=99
+            )
+        self.assertIn("Unable to load '99'", str(cm.exception))
+
+    def test_struct_serialization_roundtrip(self):
+        position_layout = {
+            "name": "Position",
+            "fields": [
+                ("latitude", "f"),
+                ("longitude", "f"),
+                ("altitude", "f"),
+                ("status", "B"),
+            ],
+        }
+        serializer = serialization.registry.get_serializer("struct")
+        type_identifier = serializer.registry.register_message(position_layout)
+
+        class SlotsPosition:
+            __slots__ = ("latitude", "longitude", "altitude", "status")
+
+            def __init__(self, latitude, longitude, altitude, status):
+                self.latitude = latitude
+                self.longitude = longitude
+                self.altitude = altitude
+                self.status = status
+
+        expected = (130.0, -30.0, 50.0, 2)
+        records = (
+            expected,
+            dict(latitude=130.0, longitude=-30.0, altitude=50.0, status=2),
+            SlotsPosition(130.0, -30.0, 50.0, 2),
+        )
+        for record in records:
+            with self.subTest(f"Check {type(record).__name__} records roundtrip"):
+                content_type, content_encoding, payload = serialization.dumps(
+                    record, "struct", type_identifier=type_identifier
+                )
+                self.assertEqual(content_type, serialization.CONTENT_TYPE_STRUCT)
+                self.assertEqual(content_encoding, "binary")
+                self.assertEqual(len(payload), 13)
+                recovered_data = serialization.loads(
+                    memoryview(payload),
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                    type_identifier=type_identifier,
+                )
+                self.assertEqual(type(recovered_data).__name__, "Position")
+                self.assertEqual(recovered_data, expected)
+                self.assertEqual(recovered_data.status, 2)
+
+        # Batches of records are packed back to back
+        content_type, content_encoding, payload = serialization.dumps_many(
+            records, "struct", type_identifier=type_identifier
+        )
+        self.assertEqual(len(payload), 13 * len(records))
+        recovered_items = serialization.loads_many(
+            payload, content_type, content_encoding, type_identifier=type_identifier
+        )
+        self.assertEqual(recovered_items, [expected] * len(records))
+
+        with self.assertRaises(Exception) as cm:
+            serialization.loads(
+                payload, content_type, content_encoding, type_identifier=999
+            )
+        self.assertIn("No struct layout registered for '999'", str(cm.exception))
+
+        with self.assertRaises(Exception) as cm:
+            serializer.registry.register_message(
+                {"name": "Invalid", "fields": [("value", "Z")]}
+            )
+        self.assertIn("Invalid struct format 'Z' for field 'value'", str(cm.exception))
+
+    @unittest.skipUnless(serialization.have_numpy, "requires numpy")
+    def test_numpy_serialization_roundtrip(self):
+        import numpy as np
+
+        arrays = [
+            np.arange(12, dtype="<i4").reshape(3, 4),
+            np.asfortranarray(np.arange(6.0).reshape(2, 3)),
+            np.arange(20)[::3],
+            np.zeros(3, dtype=[("id", "<u2"), ("position", ">f8", (3,))]),
+            np.float32(1.5),
+        ]
+        for array in arrays:
+            with self.subTest(f"Check {array.dtype} array roundtrip"):
+                content_type, content_encoding, payload = serialization.dumps(
+                    array, "numpy"
+                )
+                self.assertEqual(content_type, serialization.CONTENT_TYPE_NUMPY)
+                self.assertEqual(content_encoding, "binary")
+                recovered_data = serialization.loads(
+                    payload, content_type, content_encoding
+                )
+                self.assertIsInstance(recovered_data, np.ndarray)
+                self.assertEqual(recovered_data.dtype, array.dtype)
+                self.assertEqual(recovered_data.shape, array.shape)
+                self.assertTrue(np.array_equal(recovered_data, array))
+
+        # The Fortran order is preserved
+        self.assertTrue(recovered_data.flags.c_contiguous)
+        content_type, content_encoding, payload = serialization.dumps(
+            arrays[1], "numpy"
+        )
+        recovered_data = serialization.loads(payload, content_type, content_encoding)
+        self.assertTrue(recovered_data.flags.f_contiguous)
+
+        # Decoding does not copy the received buffer
+        buffer = bytearray(payload)
+        recovered_data = serialization.loads(buffer, content_type, content_encoding)
+        self.assertTrue(np.shares_memory(recovered_data, np.frombuffer(buffer, "u1")))
+
+        # Batches of arrays
+        content_type, content_encoding, payload = serialization.dumps_many(
+            arrays, "numpy"
+        )
+        recovered_items = serialization.loads_many(
+            payload, content_type, content_encoding
+        )
+        self.assertEqual(len(recovered_items), len(arrays))
+        for array, recovered_data in zip(arrays, recovered_items):
+            self.assertTrue(np.array_equal(recovered_data, array))
+
+        with self.assertRaises(Exception) as cm:
+            serialization.dumps(np.array([object()]), "numpy")
+        self.assertIn("Can't serialize arrays containing objects", str(cm.exception))
+
+        _ct, _ce, payload = serialization.dumps(arrays[0], "numpy")
+        with self.assertRaises(Exception) as cm:
+            serialization.loads(payload[:-8], content_type, content_encoding)
+        self.assertIn("truncated", str(cm.exception))
+
+    def test_lazy_message(self):
+        data = {"string": "The quick brown fox jumps over the lazy dog"}
+        _ct, _ce, payload = serialization.dumps(data, "json")
+        codec = serialization.registry.bind("json")
+        decode_mock = unittest.mock.Mock(wraps=codec.decode)
+
+        message = serialization.LazyMessage(
+            payload, decode_mock, type_identifier=7, metadata={"peer_id": b"1"}
+        )
+        self.assertIs(message.raw, payload)
+        self.assertEqual(message.type_identifier, 7)
+        self.assertEqual(message.metadata, {"peer_id": b"1"})
+        self.assertFalse(message.decoded)
+        self.assertFalse(decode_mock.called)
+        self.assertIn("decoded=False", repr(message))
+
+        # Data is decoded once, on first access
+        self.assertEqual(message.data, data)
+        self.assertEqual(message.data, data)
+        self.assertTrue(message.decoded)
+        decode_mock.assert_called_once_with(payload, type_identifier=7)
+
+        # Empty payloads are not decoded
+        message = serialization.LazyMessage(b"", decode_mock)
+        self.assertEqual(message.data, b"")
+        self.assertEqual(decode_mock.call_count, 1)
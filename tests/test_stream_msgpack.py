@@ -0,0 +1,93 @@
+import asyncio
+import asynctest
+import socket
+import unittest
+
+from gestalt import serialization
+from gestalt.stream.msgpack import MsgpackStreamClient, MsgpackStreamServer
+
+
+@unittest.skipUnless(serialization.have_msgpack, "requires msgpack")
+class MsgpackStreamEndpointTestCase(asynctest.TestCase):
+    async def test_client_server_interaction(self):
+        """ check msgpack client server interactions """
+
+        server_on_message_mock = asynctest.CoroutineMock()
+        server_on_started_mock = asynctest.CoroutineMock()
+        server_on_stopped_mock = asynctest.CoroutineMock()
+        server_on_peer_available_mock = asynctest.CoroutineMock()
+        server_on_peer_unavailable_mock = asynctest.CoroutineMock()
+
+        server_ep = MsgpackStreamServer(
+            on_message=server_on_message_mock,
+            on_started=server_on_started_mock,
+            on_stopped=server_on_stopped_mock,
+            on_peer_available=server_on_peer_available_mock,
+            on_peer_unavailable=server_on_peer_unavailable_mock,
+        )
+        self.assertEqual(server_ep.content_type, serialization.CONTENT_TYPE_MSGPACK)
+
+        await server_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        self.assertTrue(server_on_started_mock.called)
+
+        address, port = server_ep.bindings[0]
+
+        client_on_message_mock = asynctest.CoroutineMock()
+        client_on_started_mock = asynctest.CoroutineMock()
+        client_on_stopped_mock = asynctest.CoroutineMock()
+        client_on_peer_available_mock = asynctest.CoroutineMock()
+        client_on_peer_unavailable_mock = asynctest.CoroutineMock()
+
+        client_ep = MsgpackStreamClient(
+            on_message=client_on_message_mock,
+            on_started=client_on_started_mock,
+            on_stopped=client_on_stopped_mock,
+            on_peer_available=client_on_peer_available_mock,
+            on_peer_unavailable=client_on_peer_unavailable_mock,
+        )
+
+        await client_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        self.assertTrue(client_on_started_mock.called)
+        self.assertTrue(client_on_peer_available_mock.called)
+        self.assertTrue(server_on_peer_available_mock.called)
+
+        self.assertEqual(len(client_ep.connections), 1)
+
+        test_msgs_in = [
+            dict(latitude=130.0, longitude=-30.0, altitude=50.0),
+            "Hello World",
+            b"\x00\x01",
+            None,
+        ]
+
+        # Send msgs from client to server
+        for test_msg_in in test_msgs_in:
+            client_ep.send(test_msg_in)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(server_on_message_mock.call_count, len(test_msgs_in))
+        received_msgs = []
+        for args, kwargs in server_on_message_mock.call_args_list:
+            _svr, received_msg = args
+            received_msgs.append(received_msg)
+        sender_id = kwargs["peer_id"]
+        self.assertEqual(received_msgs, test_msgs_in)
+
+        # Send a msg from server to client
+        server_ep.send(test_msgs_in[0], peer_id=sender_id)
+        await asyncio.sleep(0.1)
+        (args, kwargs) = client_on_message_mock.call_args_list[0]
+        _cli, received_msg = args
+        self.assertEqual(received_msg, test_msgs_in[0])
+
+        await client_ep.stop()
+        await asyncio.sleep(0.1)
+
+        self.assertTrue(client_on_stopped_mock.called)
+        self.assertTrue(client_on_peer_unavailable_mock.called)
+        self.assertTrue(server_on_peer_unavailable_mock.called)
+
+        await server_ep.stop()
+        self.assertTrue(server_on_stopped_mock.called)
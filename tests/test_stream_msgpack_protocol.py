@@ -0,0 +1,87 @@
+import logging
+import unittest
+import unittest.mock
+
+from gestalt.stream.protocols import msgpack as msgpack_protocol
+
+try:
+    import msgpack
+except ImportError:
+    pass
+
+
+@unittest.skipUnless(msgpack_protocol.have_msgpack, "requires msgpack")
+class MsgpackStreamProtocolTestCase(unittest.TestCase):
+    def test_message_received_in_worst_case_delivery_scenario(self):
+        on_message_mock = unittest.mock.Mock()
+
+        p = msgpack_protocol.MsgpackStreamProtocol(on_message=on_message_mock)
+
+        test_msg = dict(latitude=130.0, longitude=-30.0, name="position")
+        packed_msg = msgpack.packb(test_msg, use_bin_type=True)
+
+        # Send the test message 1 byte at a time
+        for b in packed_msg:
+            p.data_received(bytes([b]))
+
+        self.assertEqual(on_message_mock.call_count, 1)
+        (args, _kwargs) = on_message_mock.call_args
+        _prot, _identity, received_msg = args
+        self.assertEqual(received_msg, test_msg)
+
+    def test_multiple_messages_received_at_once(self):
+        on_message_mock = unittest.mock.Mock()
+
+        p = msgpack_protocol.MsgpackStreamProtocol(on_message=on_message_mock)
+
+        test_msgs = [{"a": 1}, "text", b"\x00\x01", None, [1, 2, 3], 0]
+        packed_msgs = b"".join(
+            msgpack.packb(msg, use_bin_type=True) for msg in test_msgs
+        )
+
+        # Deliver all of the messages and part of another one
+        p.data_received(packed_msgs + b"\x92")
+        received_msgs = [args[2] for args, _kwargs in on_message_mock.call_args_list]
+        self.assertEqual(received_msgs, test_msgs)
+
+        # Complete the partial message
+        p.data_received(b"\x01\x02")
+        self.assertEqual(on_message_mock.call_count, len(test_msgs) + 1)
+        (args, _kwargs) = on_message_mock.call_args
+        self.assertEqual(args[2], [1, 2])
+
+    def test_invalid_data_closes_connection(self):
+        on_message_mock = unittest.mock.Mock()
+        close_mock = unittest.mock.Mock()
+
+        p = msgpack_protocol.MsgpackStreamProtocol(on_message=on_message_mock)
+        p.close = close_mock
+
+        # 0xc1 is never used in the msgpack format
+        with self.assertLogs(
+            "gestalt.stream.protocols.msgpack", level=logging.ERROR
+        ) as log:
+            p.data_received(b"\xc1")
+        self.assertIn("Invalid msgpack data", log.output[0])
+
+        self.assertFalse(on_message_mock.called)
+        self.assertTrue(close_mock.called)
+
+    def test_message_exceeding_maximum_size_closes_connection(self):
+        on_message_mock = unittest.mock.Mock()
+        close_mock = unittest.mock.Mock()
+
+        p = msgpack_protocol.MsgpackStreamProtocol(
+            on_message=on_message_mock, max_buffer_size=64
+        )
+        p.close = close_mock
+
+        packed_msg = msgpack.packb(b"\x00" * 128, use_bin_type=True)
+        with self.assertLogs(
+            "gestalt.stream.protocols.msgpack", level=logging.ERROR
+        ) as log:
+            p.data_received(packed_msg)
+        self.assertIn("exceeds maximum msg size", log.output[0])
+
+        self.assertFalse(on_message_mock.called)
+        self.assertTrue(close_mock.called)
@@ -1,10 +1,13 @@
 import asyncio
 import asynctest
+import concurrent.futures
 import logging
 import socket
+import threading
 import unittest.mock
 from gestalt import serialization
 from gestalt.stream.mti import MtiStreamClient, MtiStreamServer
+from gestalt.stream.netstring import NetstringStreamServer
 
 
 class MtiStreamEndpointTestCase(asynctest.TestCase):
@@ -482,3 +485,349 @@ class MtiStreamEndpointTestCase(asynctest.TestCase):
 
         await server_ep.stop()
         self.assertTrue(server_on_stopped_mock.called)
+
+    async def test_struct_client_server_interaction_with_msg_id(self):
+        """ check struct client server interactions with message identifiers """
+
+        server_on_message_mock = asynctest.CoroutineMock()
+        server_ep = MtiStreamServer(
+            on_message=server_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_STRUCT,
+        )
+        await server_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        address, port = server_ep.bindings[0]
+
+        client_on_message_mock = asynctest.CoroutineMock()
+        client_ep = MtiStreamClient(
+            on_message=client_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_STRUCT,
+        )
+        await client_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        self.assertEqual(len(client_ep.connections), 1)
+
+        type_identifier = 1
+        position_layout = {
+            "name": "Position",
+            "fields": [
+                ("latitude", "f"),
+                ("longitude", "f"),
+                ("altitude", "f"),
+                ("status", "B"),
+            ],
+        }
+        server_ep.register_message(type_identifier, position_layout)
+        client_ep.register_message(type_identifier, position_layout)
+
+        test_msg_in = dict(latitude=130.0, longitude=-30.0, altitude=50.0, status=2)
+
+        # Send a msg with identifier from client to server
+        client_ep.send(test_msg_in, type_identifier=type_identifier)
+        await asyncio.sleep(0.1)
+
+        self.assertTrue(server_on_message_mock.called)
+        (args, kwargs) = server_on_message_mock.call_args_list[0]
+        _svr, received_msg = args
+        received_msg_id = kwargs["type_identifier"]
+        sender_id = kwargs["peer_id"]
+        self.assertEqual(received_msg._asdict(), test_msg_in)
+        self.assertEqual(received_msg_id, type_identifier)
+
+        # Send the received record from server to client
+        server_ep.send(received_msg, type_identifier=received_msg_id, peer_id=sender_id)
+        await asyncio.sleep(0.1)
+        (args, kwargs) = client_on_message_mock.call_args_list[0]
+        _cli, received_msg = args
+        self.assertEqual(received_msg._asdict(), test_msg_in)
+
+        await client_ep.stop()
+        await server_ep.stop()
+
+    async def test_lazy_decode(self):
+        """ check lazy decoding only decodes messages when their data is used """
+        server_on_message_mock = unittest.mock.Mock()
+        server_ep = MtiStreamServer(
+            on_message=server_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+            lazy_decode=True,
+        )
+
+        test_msg_in = dict(latitude=130.0, longitude=-30.0, altitude=50.0)
+        payload = server_ep.codec.encode(test_msg_in)
+        decode_mock = unittest.mock.Mock(wraps=server_ep.codec.decode)
+        server_ep.codec = server_ep.codec._replace(decode=decode_mock)
+
+        server_ep.on_message(None, b"peer", payload, type_identifier=3)
+
+        self.assertTrue(server_on_message_mock.called)
+        (args, kwargs) = server_on_message_mock.call_args
+        _svr, received_msg = args
+        self.assertIsInstance(received_msg, serialization.LazyMessage)
+        self.assertEqual(kwargs["peer_id"], b"peer")
+        self.assertEqual(received_msg.type_identifier, 3)
+        self.assertIs(received_msg.raw, payload)
+        self.assertFalse(decode_mock.called)
+
+        self.assertEqual(received_msg.data, test_msg_in)
+        self.assertEqual(decode_mock.call_count, 1)
+
+    async def test_relay_frames_between_peers(self):
+        """ check a server can relay frames between peers without decoding """
+
+        hub_on_message_mock = unittest.mock.Mock()
+        hub_ep = MtiStreamServer(
+            on_message=hub_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        await hub_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        address, port = hub_ep.bindings[0]
+
+        publisher_ep = MtiStreamClient(content_type=serialization.CONTENT_TYPE_JSON)
+        subscriber_on_message_mock = unittest.mock.Mock()
+        subscriber_ep = MtiStreamClient(
+            on_message=subscriber_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        await publisher_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await subscriber_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        self.assertEqual(len(hub_ep._peers), 2)
+
+        # Relay frames with a type identifier of 1 to the other peers
+        header_filter_mock = unittest.mock.Mock(
+            side_effect=lambda peer_id, type_identifier, msg_len: type_identifier == 1
+        )
+        hub_ep.start_relay(header_filter=header_filter_mock)
+
+        test_msg_in = dict(latitude=130.0, longitude=-30.0, altitude=50.0)
+        publisher_ep.send(test_msg_in, type_identifier=1)
+        await asyncio.sleep(0.1)
+
+        self.assertTrue(header_filter_mock.called)
+        self.assertFalse(hub_on_message_mock.called)
+        (args, kwargs) = subscriber_on_message_mock.call_args
+        _cli, received_msg = args
+        self.assertEqual(received_msg, test_msg_in)
+        self.assertEqual(kwargs["type_identifier"], 1)
+
+        # Frames rejected by the filter are handled by the hub
+        subscriber_on_message_mock.reset_mock()
+        publisher_ep.send(test_msg_in, type_identifier=2)
+        await asyncio.sleep(0.1)
+        self.assertFalse(subscriber_on_message_mock.called)
+        (args, kwargs) = hub_on_message_mock.call_args
+        _svr, received_msg = args
+        self.assertEqual(received_msg, test_msg_in)
+
+        # Stopping the relay returns to normal message handling
+        hub_on_message_mock.reset_mock()
+        hub_ep.stop_relay()
+        publisher_ep.send(test_msg_in, type_identifier=1)
+        await asyncio.sleep(0.1)
+        self.assertTrue(hub_on_message_mock.called)
+        self.assertFalse(subscriber_on_message_mock.called)
+
+        await publisher_ep.stop()
+        await subscriber_ep.stop()
+        await hub_ep.stop()
+
+    async def test_relay_frames_to_another_endpoint(self):
+        """ check frames can be relayed to the peers of another endpoint """
+
+        ingress_ep = MtiStreamServer()
+        egress_ep = MtiStreamServer()
+        await ingress_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        await egress_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        ingress_ep.start_relay(target=egress_ep)
+
+        publisher_ep = MtiStreamClient()
+        subscriber_on_message_mock = unittest.mock.Mock()
+        subscriber_ep = MtiStreamClient(on_message=subscriber_on_message_mock)
+        address, port = ingress_ep.bindings[0]
+        await publisher_ep.start(addr=address, port=port, family=socket.AF_INET)
+        address, port = egress_ep.bindings[0]
+        await subscriber_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        publisher_ep.send(b"Hello World", type_identifier=5)
+        await asyncio.sleep(0.1)
+
+        (args, kwargs) = subscriber_on_message_mock.call_args
+        _cli, received_msg = args
+        self.assertEqual(received_msg, b"Hello World")
+        self.assertEqual(kwargs["type_identifier"], 5)
+
+        with self.assertRaises(Exception) as cm:
+            ingress_ep.start_relay(target=NetstringStreamServer())
+        self.assertIn("Relay target must use the same protocol", str(cm.exception))
+
+        await publisher_ep.stop()
+        await subscriber_ep.stop()
+        await ingress_ep.stop()
+        await egress_ep.stop()
+
+    async def test_relay_continues_after_peer_send_error(self):
+        """ check a failed send to one peer does not stop a relayed frame """
+        hub_ep = MtiStreamServer()
+        failing_prot = unittest.mock.Mock()
+        failing_prot.send.side_effect = Exception("Send failed")
+        working_prot = unittest.mock.Mock()
+        hub_ep._peers = {b"a": failing_prot, b"b": working_prot}
+        hub_ep.start_relay()
+
+        frame = b"frame"
+        with self.assertLogs("gestalt.stream.endpoint", level="ERROR"):
+            relayed = hub_ep.on_frame(None, b"c", frame, type_identifier=1)
+
+        # The frame counts as relayed so it is not also passed to on_message
+        self.assertTrue(relayed)
+        failing_prot.send.assert_called_once_with(frame, add_frame_header=False)
+        working_prot.send.assert_called_once_with(frame, add_frame_header=False)
+        self.assertEqual(list(hub_ep.peers), [b"a", b"b"])
+
+    async def test_routes(self):
+        """ check messages are dispatched to the handler for their type """
+        server_on_message_mock = unittest.mock.Mock()
+        server_ep = MtiStreamServer(
+            on_message=server_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        tick_handler_mock = unittest.mock.Mock()
+        text_handler_mock = asynctest.CoroutineMock()
+        server_ep.route(1, tick_handler_mock)
+        server_ep.route(
+            2, text_handler_mock, content_type=serialization.CONTENT_TYPE_TEXT
+        )
+
+        server_ep.on_message(None, b"peer", b'{"price": 1.5}', type_identifier=1)
+        self.assertTrue(tick_handler_mock.called)
+        (args, kwargs) = tick_handler_mock.call_args
+        self.assertEqual(args, (server_ep, {"price": 1.5}))
+        self.assertEqual(kwargs["peer_id"], b"peer")
+        self.assertEqual(kwargs["type_identifier"], 1)
+
+        # Routes can use their own serializer
+        server_ep.on_message(None, b"peer", b"hello", type_identifier=2)
+        await asyncio.sleep(0)
+        text_handler_mock.assert_awaited_once()
+        (args, kwargs) = text_handler_mock.call_args
+        self.assertEqual(args, (server_ep, "hello"))
+
+        # Unrouted messages are passed to the default handler
+        self.assertFalse(server_on_message_mock.called)
+        server_ep.on_message(None, b"peer", b"[1, 2]", type_identifier=3)
+        (args, kwargs) = server_on_message_mock.call_args
+        self.assertEqual(args, (server_ep, [1, 2]))
+
+        server_ep.unroute(1)
+        server_ep.on_message(None, b"peer", b"{}", type_identifier=1)
+        self.assertEqual(tick_handler_mock.call_count, 1)
+        self.assertEqual(server_on_message_mock.call_count, 2)
+
+        with self.assertRaises(Exception):
+            server_ep.route(4, text_handler_mock, concurrency=0)
+
+    async def test_route_empty_message(self):
+        """ check messages with no payload are dispatched to their route """
+        server_on_message_mock = unittest.mock.Mock()
+        server_ep = MtiStreamServer(on_message=server_on_message_mock)
+        heartbeat_handler_mock = unittest.mock.Mock()
+        server_ep.route(4, heartbeat_handler_mock)
+        await server_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        address, port = server_ep.bindings[0]
+
+        client_ep = MtiStreamClient()
+        await client_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        client_ep.send(b"", type_identifier=4)
+        await asyncio.sleep(0.1)
+
+        self.assertFalse(server_on_message_mock.called)
+        self.assertTrue(heartbeat_handler_mock.called)
+        (args, kwargs) = heartbeat_handler_mock.call_args
+        self.assertEqual(args, (server_ep, b""))
+        self.assertEqual(kwargs["type_identifier"], 4)
+
+        await client_ep.stop()
+        await server_ep.stop()
+
+    async def test_route_concurrency_and_executor(self):
+        """ check routes limit concurrency and can run in an executor """
+        server_ep = MtiStreamServer(content_type=serialization.CONTENT_TYPE_JSON)
+
+        running = []
+        max_running = []
+
+        async def slow_handler(ep, data, **kwargs):
+            running.append(data)
+            max_running.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(data)
+
+        server_ep.route(1, slow_handler, concurrency=2)
+        for i in range(6):
+            server_ep.on_message(None, b"peer", str(i).encode(), type_identifier=1)
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(max_running), 6)
+        self.assertEqual(max(max_running), 2)
+
+        threads = []
+
+        def blocking_handler(ep, data, **kwargs):
+            threads.append(threading.get_ident())
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            server_ep.route(2, blocking_handler, executor=executor)
+            server_ep.on_message(None, b"peer", b"1", type_identifier=2)
+            await asyncio.sleep(0.1)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+        with self.assertRaises(Exception):
+            server_ep.route(3, slow_handler, executor=executor)
+
+    async def test_per_type_serializers(self):
+        """ check message types can use different serializers on one endpoint """
+        server_on_message_mock = unittest.mock.Mock()
+        server_ep = MtiStreamServer(
+            on_message=server_on_message_mock,
+            content_type=serialization.CONTENT_TYPE_JSON,
+        )
+        await server_ep.start(addr="127.0.0.1", family=socket.AF_INET)
+        address, port = server_ep.bindings[0]
+
+        client_ep = MtiStreamClient(content_type=serialization.CONTENT_TYPE_JSON)
+        await client_ep.start(addr=address, port=port, family=socket.AF_INET)
+        await asyncio.sleep(0.3)
+
+        tick_layout = {"name": "Tick", "fields": [("price", "d"), ("size", "I")]}
+        for ep in (server_ep, client_ep):
+            ep.register_message(
+                10, tick_layout, content_type=serialization.CONTENT_TYPE_STRUCT
+            )
+            ep.register_message(11, content_type=serialization.CONTENT_TYPE_TEXT)
+
+        self.assertEqual(
+            server_ep.codec_for(10).content_type, serialization.CONTENT_TYPE_STRUCT
+        )
+        self.assertIs(server_ep.codec_for(12), server_ep.codec)
+
+        client_ep.send(dict(price=1.5, size=100), type_identifier=10)
+        client_ep.send("restart", type_identifier=11)
+        client_ep.send({"admin": True}, type_identifier=12)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(server_on_message_mock.call_count, 3)
+        calls = server_on_message_mock.call_args_list
+        (args, kwargs) = calls[0]
+        self.assertEqual(args[1]._asdict(), dict(price=1.5, size=100))
+        (args, kwargs) = calls[1]
+        self.assertEqual(args[1], "restart")
+        (args, kwargs) = calls[2]
+        self.assertEqual(args[1], {"admin": True})
+
+        await client_ep.stop()
+        await server_ep.stop()
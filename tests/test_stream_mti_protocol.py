@@ -63,3 +63,43 @@ class MtiStreamProtocolTestCase(unittest.TestCase):
 
         self.assertTrue(on_message_mock.called)
         self.assertEqual(on_message_mock.call_count, 1)
+
+    def test_frames_offered_to_frame_handler(self):
+        on_message_mock = unittest.mock.Mock()
+        frames = []
+
+        def on_frame(prot, identity, frame, type_identifier, msg_len):
+            # Keep a copy as the frame is a view onto the protocol's buffer
+            frames.append((bytes(frame), type_identifier, msg_len))
+            # Only accept frames with an identifier of 42
+            return type_identifier == 42
+
+        p = MtiStreamProtocol(on_message=on_message_mock, on_frame=on_frame)
+
+        mti_msgs = [
+            create_mti_message(42, b"Hello World"),
+            create_mti_message(42, b""),
+            create_mti_message(7, b"Not Relayed"),
+        ]
+        p.data_received(b"".join(mti_msgs))
+
+        self.assertEqual(
+            frames, [(mti_msgs[0], 42, 11), (mti_msgs[1], 42, 0), (mti_msgs[2], 7, 11)],
+        )
+
+        # Frames that were not handled are passed to the message handler
+        self.assertEqual(on_message_mock.call_count, 1)
+        (args, kwargs) = on_message_mock.call_args
+        self.assertEqual(args[2], b"Not Relayed")
+        self.assertEqual(kwargs["type_identifier"], 7)
+
+    def test_preformed_frame_can_be_sent(self):
+        p = MtiStreamProtocol()
+        transport_mock = unittest.mock.Mock()
+        p.transport = transport_mock
+
+        mti_msg = create_mti_message(42, b"Hello World")
+        p.send(memoryview(mti_msg), add_frame_header=False)
+
+        (args, _kwargs) = transport_mock.write.call_args
+        self.assertEqual(bytes(args[0]), mti_msg)